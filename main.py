@@ -9,10 +9,17 @@ import logging
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-from src.db import get_engine, get_psycopg2_connection # pylint: disable=wrong-import-position
-from src.ingest import ingest_all # pylint: disable=wrong-import-position
-from src.transform import run_silver, run_gold # pylint: disable=wrong-import-position
-from src.report import export_views_to_excel # pylint: disable=wrong-import-position
+# Only the modules every step needs are imported here (psycopg2 based); each step imports its own
+# (pandas, pyarrow, SQLAlchemy, openpyxl) so short step runs do not pay for the others, see
+# `python -m src.benchmark --startup`
+from src.db import get_psycopg2_connection # pylint: disable=wrong-import-position
+from src.export import EXPORTS, COMPRESSIONS # pylint: disable=wrong-import-position
+from src.cache import REPORT_CACHE_DIR # pylint: disable=wrong-import-position
+from src.preview import PREVIEW_REPORT_FILE, SAMPLE_METHODS # pylint: disable=wrong-import-position
+from src.metrics import RunMetrics, relation_stats # pylint: disable=wrong-import-position
+from src.checkpoint import ( # pylint: disable=wrong-import-position
+    ensure_checkpoints, load_checkpoints, mark_completed, reset_checkpoints
+)
 
 
 logging.basicConfig(
@@ -24,8 +31,45 @@ logger = logging.getLogger(__name__)
 
 
 
-def step_ingest(data_dir:str) -> None:
-    """Ingest CSV files from the given directory into the olap_bronze schema"""
+def load_completed_steps(resume:bool, fresh:bool) -> set:
+    """
+    Return the steps completed by the previous run when resuming
+    - fresh=True (an ingest-bearing run without --resume) starts a new run and forgets every
+      checkpoint of the previous one; other runs (e.g. --step report) keep them for a later --resume
+    """
+    conn = get_psycopg2_connection()
+    try:
+        ensure_checkpoints(conn)
+        if resume:
+            return {name for name, checkpoint in load_checkpoints(conn, "step").items()
+                    if checkpoint["completed"]}
+        if fresh:
+            reset_checkpoints(conn)
+        return set()
+    finally:
+        conn.close()
+
+
+def complete_step(step:str) -> None:
+    """Record a pipeline step as completed"""
+    conn = get_psycopg2_connection()
+    try:
+        mark_completed(conn, "step", step)
+    finally:
+        conn.close()
+
+
+def step_ingest(data_dir:str, **options) -> dict:
+    """
+    Ingest CSV files from the given directory into the olap_bronze schema
+    (options are forwarded to ingest_all: loader, batch_size, workers, ...)
+    - Returns the result of each file (see ingest_all)
+    - The engine connects on first use, a failure there is raised as RuntimeError
+    """
+    from sqlalchemy.exc import SQLAlchemyError # pylint: disable=import-outside-toplevel
+    from src.db import get_engine # pylint: disable=import-outside-toplevel
+    from src.ingest import ingest_all # pylint: disable=import-outside-toplevel
+
     try:
         engine = get_engine()
     except RuntimeError as e:
@@ -39,28 +83,61 @@ def step_ingest(data_dir:str) -> None:
         raise
 
     try:
-        ingest_all(conn, data_dir, engine)
+        results = ingest_all(conn, data_dir, engine, **options)
+        mark_completed(conn, "step", "ingest")
         logger.info("Ingestion step completed successfully")
-    except RuntimeError as e:
+        return results
+    except (RuntimeError, SQLAlchemyError) as e:
         logger.error("Ingestion failed: %s", e, exc_info=True)
-        raise
+        raise RuntimeError(str(e)) from e
     finally:
         conn.close()
         engine.dispose()
 
 
-def step_transform() -> None:
-    """Run Silver and Gold transformation steps using a PostgreSQL connection"""
+def step_transform(completed:frozenset=frozenset(), workers:int=1, incremental:bool=False,
+                   profile:bool=False, explain:bool=False) -> dict:
+    """
+    Run Silver and Gold transformation steps using a PostgreSQL connection
+    - layers listed in completed were built by the resumed run and are skipped
+    - workers > 1 runs independent SQL units concurrently on a pool of connections
+    - incremental=True merges only the bronze files loaded since the last silver build
+    - Each layer is indexed and analyzed once it is loaded (see src/indexes.py)
+    - profile=True times every SQL unit and records the rows and size of each relation
+    - explain=True captures EXPLAIN (ANALYZE, BUFFERS) of the materialized gold views
+    - Returns {layer: {"units", "indexes", "relations", "explain"}} for the layers built
+    """
+    from src.transform import run_silver, run_gold, explain_gold_views # pylint: disable=import-outside-toplevel
+    from src.indexes import build_indexes # pylint: disable=import-outside-toplevel
+
     try:
         conn = get_psycopg2_connection()
     except RuntimeError as e:
         logger.error("Database connection failed: %s", e, exc_info=True)
         raise
 
+    layers = {}
     try:
-        run_silver(conn)
-        run_gold(conn)
+        if "silver" in completed:
+            logger.info("Skipping 'silver' layer: completed by the resumed run")
+        else:
+            layers["silver"] = {"units": run_silver(conn, workers=workers, incremental=incremental,
+                                                    per_unit=profile)}
+            layers["silver"]["indexes"] = build_indexes(conn, "olap_silver")
+            mark_completed(conn, "step", "silver")
+        if "gold" in completed:
+            logger.info("Skipping 'gold' layer: completed by the resumed run")
+        else:
+            layers["gold"] = {"units": run_gold(conn, workers=workers, per_unit=profile)}
+            layers["gold"]["indexes"] = build_indexes(conn, "olap_gold")
+            mark_completed(conn, "step", "gold")
+            if explain:
+                layers["gold"]["explain"] = explain_gold_views(conn)
+        if profile:
+            for layer, stats in layers.items():
+                stats["relations"] = relation_stats(conn, f"olap_{layer}")
         logger.info("Transform step completed successfully")
+        return layers
     except RuntimeError as e:
         logger.error("Transformation failed: %s", e, exc_info=True)
         raise
@@ -68,8 +145,78 @@ def step_transform() -> None:
         conn.close()
 
 
-def step_report(reports_dir:str) -> None:
-    """Generate Excel and PDF reports from the 'olap_gold' views"""
+def step_preview(percent:float, method:str="bernoulli", seed:int=42) -> dict:
+    """
+    Build approximate silver and gold layers in olap_preview from a sample of the bronze facts
+    (olap_silver, olap_gold and the checkpoints are left untouched, see src/preview.py)
+    - Returns the sampled rows and the time of each step (see run_preview)
+    """
+    from src.preview import run_preview # pylint: disable=import-outside-toplevel
+
+    try:
+        conn = get_psycopg2_connection()
+    except RuntimeError as e:
+        logger.error("Database connection failed: %s", e, exc_info=True)
+        raise
+
+    try:
+        result = run_preview(conn, percent, method, seed)
+        logger.info("Preview transform step completed successfully")
+        return result
+    except (RuntimeError, ValueError) as e:
+        logger.error("Preview transformation failed: %s", e, exc_info=True)
+        raise RuntimeError(str(e)) from e
+    finally:
+        conn.close()
+
+
+def _preview_options(engine) -> dict:
+    """Return the export_views_to_excel options of an approximate report read from the preview schema"""
+    from src.preview import PREVIEW_SCHEMA, sample_note # pylint: disable=import-outside-toplevel
+
+    raw_conn = engine.raw_connection()
+    try:
+        note = sample_note(raw_conn)
+    finally:
+        raw_conn.close()
+    if note is None:
+        raise RuntimeError("No preview was built yet: run --step transform --sample PERCENT first")
+    return {"schema": PREVIEW_SCHEMA, "note": note, "excel_name": PREVIEW_REPORT_FILE}
+
+
+def _report_cache(engine, cache_dir:str):
+    """Return the report cache of the current gold build version (None when gold has no version yet)"""
+    from src.transform import gold_version # pylint: disable=import-outside-toplevel
+    from src.cache import ReportCache # pylint: disable=import-outside-toplevel
+
+    raw_conn = engine.raw_connection()
+    try:
+        version = gold_version(raw_conn)
+    finally:
+        raw_conn.close()
+    if version is None:
+        logger.info("Gold has no build version yet: the report cache is not used")
+        return None
+    return ReportCache(cache_dir, version)
+
+
+def step_report(reports_dir:str, streaming:bool=False, workers:int=1, cache_dir:str=None,
+                preview:bool=False) -> dict:
+    """
+    Generate Excel and PDF reports from the 'olap_gold' views
+    - streaming=True streams the rows through server-side cursors into a write-only workbook
+    - workers > 1 fetches the views concurrently, in one snapshot, while the workbook is written
+    - cache_dir: report cache directory; the views are served from it while the gold build
+      version is unchanged (None always queries the views)
+    - preview=True reports the approximate olap_preview views instead, in a separate workbook
+      whose first sheet describes the sample (the cache is not used)
+    - Returns the statistics of each view (see export_views_to_excel)
+    - The engine connects on first use, a failure there is raised as RuntimeError
+    """
+    from sqlalchemy.exc import SQLAlchemyError # pylint: disable=import-outside-toplevel
+    from src.db import get_engine # pylint: disable=import-outside-toplevel
+    from src.report import export_views_to_excel # pylint: disable=import-outside-toplevel
+
     try:
         engine = get_engine()
     except RuntimeError as e:
@@ -77,49 +224,299 @@ def step_report(reports_dir:str) -> None:
         raise
 
     try:
-        export_views_to_excel(engine, reports_dir)
+        if preview:
+            options = _preview_options(engine)
+        else:
+            options = {"cache": _report_cache(engine, cache_dir) if cache_dir else None}
+        stats = export_views_to_excel(engine, reports_dir, streaming=streaming, workers=workers, **options)
         logger.info("Report generation completed successfully")
-    except RuntimeError as e:
+        return stats
+    except (RuntimeError, SQLAlchemyError) as e:
         logger.error("Report generation failed: %s", e, exc_info=True)
-        raise
+        raise RuntimeError(str(e)) from e
     finally:
         engine.dispose()
 
 
+def step_export(export_dir:str, names:list=None, reuse:bool=True, **options) -> dict:
+    """
+    Export silver/gold relations to Parquet datasets (all exportable relations by default)
+    - reuse=True keeps the gold exports written for the current gold build version
+    - options: compression, row_group_size (see src/export.py)
+    - Returns the result of each relation (see export_parquet)
+    """
+    from src.export import export_parquet # pylint: disable=import-outside-toplevel
+
+    try:
+        conn = get_psycopg2_connection()
+    except RuntimeError as e:
+        logger.error("Database connection failed: %s", e, exc_info=True)
+        raise
+
+    try:
+        results = export_parquet(conn, export_dir, names, reuse=reuse, **options)
+        logger.info("Parquet export completed successfully")
+        return results
+    except (RuntimeError, ValueError) as e:
+        logger.error("Parquet export failed: %s", e, exc_info=True)
+        raise RuntimeError(str(e)) from e
+    finally:
+        conn.close()
+
+
+def _file_bytes(path:str) -> int:
+    """Size of a file in bytes (0 when it was not written)"""
+    return os.path.getsize(path) if os.path.isfile(path) else 0
+
+
+def _record_ingest(stage:dict, results:dict, data_dir:str) -> None:
+    """Add the rows, bytes and per-file results of the ingest step to its metrics"""
+    stage["files"] = {
+        name: {**{k: v for k, v in result.items() if k != "fingerprint"},
+               "bytes": _file_bytes(os.path.join(data_dir, name))}
+        for name, result in results.items()
+    }
+    stage["rows"] = sum(f["rows"] for f in stage["files"].values())
+    stage["bytes"] = sum(f["bytes"] for f in stage["files"].values())
+
+
+def _record_report(stage:dict, stats:dict, reports_dir:str, excel_name:str=None) -> None:
+    """Add the rows, workbook bytes and per-view timings of the report step to its metrics"""
+    from src.report import REPORT_FILE # pylint: disable=import-outside-toplevel
+    stage["views"] = stats
+    stage["rows"] = sum(view["rows"] for view in stats.values())
+    stage["bytes"] = _file_bytes(os.path.join(reports_dir, excel_name or REPORT_FILE))
+
+
+def run_duckdb_pipeline(step:str, data_dir:str, reports_dir:str, database:str,
+                        metrics:RunMetrics=None) -> None:
+    """
+    Run the pipeline steps in an embedded DuckDB database (--engine duckdb)
+    - ingest, transform and report run in process on one connection, without a server
+    - Every run is a full build: no checkpoints, incremental loads or Parquet export
+    """
+    from src.db import get_duckdb_connection # pylint: disable=import-outside-toplevel
+    from src.ingest import ingest_duckdb # pylint: disable=import-outside-toplevel
+    from src.transform import run_duckdb_layers # pylint: disable=import-outside-toplevel
+    from src.report import export_views_to_excel # pylint: disable=import-outside-toplevel
+
+    metrics = metrics or RunMetrics()
+    try:
+        con = get_duckdb_connection(database)
+    except RuntimeError as e:
+        logger.error("DuckDB connection failed: %s", e, exc_info=True)
+        raise
+
+    try:
+        if step in ("ingest", "all"):
+            logger.info("Starting ingestion step (Bronze layer, DuckDB)")
+            with metrics.stage("ingest") as stage:
+                stage["tables"] = ingest_duckdb(con, data_dir)
+                stage["rows"] = sum(table["rows"] for table in stage["tables"].values())
+        if step in ("transform", "all"):
+            logger.info("Starting transformation step (DuckDB)")
+            with metrics.stage("transform") as stage:
+                stage["layers"] = run_duckdb_layers(con)
+        if step in ("report", "all"):
+            logger.info("Starting report generation step (DuckDB)")
+            with metrics.stage("report") as stage:
+                stats = export_views_to_excel(None, reports_dir, reader=lambda query: con.execute(query).df())
+                _record_report(stage, stats, reports_dir)
+        logger.info("DuckDB pipeline completed successfully")
+    except RuntimeError as e:
+        logger.error("DuckDB pipeline failed: %s", e, exc_info=True)
+        raise
+    finally:
+        con.close()
+
+
+def run_steps(args:argparse.Namespace, metrics:RunMetrics) -> None:
+    """
+    Run the selected PostgreSQL pipeline steps, each measured as a stage of the run metrics
+    - Raises RuntimeError when a step fails (the following steps are not run)
+    """
+    try:
+        # A --sample preview neither reads nor resets the checkpoints of the real runs
+        completed = set() if args.sample else load_completed_steps(args.resume,
+                                                                   fresh=args.step in ("ingest", "all"))
+    except RuntimeError as e:
+        logger.error("Checkpoint initialization failed: %s", e, exc_info=True)
+        raise
+    if completed:
+        logger.info("Resuming run: completed steps %s", ", ".join(sorted(completed)))
+
+    if args.step in ("ingest", "all"):
+        _run_ingest(args, metrics, completed)
+    if args.step in ("transform", "all"):
+        _run_transform(args, metrics, completed)
+    if args.step in ("report", "all"):
+        _run_report(args, metrics, completed)
+    if args.step == "export":
+        _run_export(args, metrics)
+
+
+def _run_ingest(args:argparse.Namespace, metrics:RunMetrics, completed:set) -> None:
+    """Run the ingestion stage of run_steps (skipped when completed by the resumed run)"""
+    if "ingest" in completed:
+        logger.info("Skipping ingestion step: completed by the resumed run")
+        metrics.skip("ingest", "completed by the resumed run")
+        return
+    logger.info("Starting ingestion step (Bronze layer)")
+    with metrics.stage("ingest") as stage:
+        results = step_ingest(args.data_dir, loader=args.loader, batch_size=args.batch_size,
+                              workers=args.ingest_workers, incremental=args.incremental,
+                              csv_engine=args.csv_engine, pipeline_depth=args.pipeline_depth,
+                              strategy=args.load_strategy, resume=args.resume,
+                              memory_budget=args.memory_budget * 2**20 or None)
+        _record_ingest(stage, results, args.data_dir)
+
+
+def _run_transform(args:argparse.Namespace, metrics:RunMetrics, completed:set) -> None:
+    """Run the transformation stage of run_steps (the approximate preview with --sample)"""
+    if args.sample:
+        logger.info("Starting approximate preview transformation (%g%% %s sample)", args.sample, args.sample_method)
+        with metrics.stage("transform") as stage:
+            stage["preview"] = step_preview(args.sample, args.sample_method, args.sample_seed)
+        return
+    logger.info("Starting transformation step")
+    with metrics.stage("transform") as stage:
+        stage["layers"] = step_transform(frozenset(completed), workers=args.transform_workers,
+                                         incremental=args.incremental,
+                                         profile=bool(args.metrics_file), explain=args.explain_gold)
+
+
+def _run_report(args:argparse.Namespace, metrics:RunMetrics, completed:set) -> None:
+    """Run the report stage of run_steps (a preview report is not checkpointed)"""
+    if "report" in completed:
+        logger.info("Skipping report generation step: completed by the resumed run")
+        metrics.skip("report", "completed by the resumed run")
+        return
+    logger.info("Starting report generation step")
+    with metrics.stage("report") as stage:
+        stats = step_report(args.reports_dir, streaming=args.report_mode == "streaming",
+                            workers=args.report_workers,
+                            cache_dir=None if args.no_cache else args.report_cache_dir,
+                            preview=bool(args.sample))
+        _record_report(stage, stats, args.reports_dir, PREVIEW_REPORT_FILE if args.sample else None)
+    if not args.sample:
+        complete_step("report")
+
+
+def _run_export(args:argparse.Namespace, metrics:RunMetrics) -> None:
+    """Run the Parquet export stage of run_steps"""
+    logger.info("Starting Parquet export step")
+    with metrics.stage("export") as stage:
+        stage["relations"] = step_export(args.export_dir, args.export_tables, reuse=not args.no_cache,
+                                         compression=args.parquet_compression,
+                                         row_group_size=args.row_group_size)
+        stage["rows"] = sum(r["rows"] for r in stage["relations"].values())
+        stage["bytes"] = sum(r["bytes"] for r in stage["relations"].values())
+
+
 def main() -> None:
     """Parse CLI arguments and execute the selected pipeline steps"""
     parser = argparse.ArgumentParser(description="Liquor distribution pipeline")
-    parser.add_argument("--step", choices=["ingest", "transform", "report", "all"],
-                        default="all", help="Pipeline step to run (all by default)")
+    parser.add_argument("--step", choices=["ingest", "transform", "report", "export", "all"],
+                        default="all", help="Pipeline step to run (all by default: ingest, transform, report)")
     parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "./data"),
                         help="Directory containing the CSV files")
     parser.add_argument("--reports-dir", default=os.getenv("REPORTS_DIR", "./reports"),
                         help="Directory to save generated reports")
+    parser.add_argument("--loader", choices=["insert", "copy"],
+                        default=os.getenv("LOADER", "insert"),
+                        help="Bronze loader: multi-row INSERT or COPY FROM STDIN (insert by default)")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("BATCH_SIZE", "10000")),
+                        help="Rows read from each CSV and written per batch (bounds ingest memory)")
+    parser.add_argument("--ingest-workers", type=int, default=int(os.getenv("INGEST_WORKERS", "1")),
+                        help="Number of files loaded concurrently, each in its own process")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Keep bronze and reload only files whose fingerprint changed, "
+                             "then merge only those files into silver")
+    parser.add_argument("--csv-engine", choices=["pyarrow", "c"],
+                        default=os.getenv("CSV_ENGINE", "pyarrow"),
+                        help="CSV parser used for typed bronze parsing (pyarrow by default)")
+    parser.add_argument("--pipeline-depth", type=int, default=int(os.getenv("PIPELINE_DEPTH", "0")),
+                        help="Batches queued between the CSV parser and the database writer "
+                             "(0 disables pipelining)")
+    parser.add_argument("--load-strategy", choices=["direct", "swap"],
+                        default=os.getenv("LOAD_STRATEGY", "direct"),
+                        help="Load bronze tables directly or via UNLOGGED staging tables swapped in atomically")
+    parser.add_argument("--memory-budget", type=int, default=int(os.getenv("MEMORY_BUDGET_MB", "0")),
+                        help="MiB allowed for in-flight ingest batches; batch sizes are adapted to it "
+                             "from the measured bytes per row (0 keeps the fixed --batch-size)")
+    parser.add_argument("--transform-workers", type=int,
+                        default=int(os.getenv("TRANSFORM_WORKERS", "1")),
+                        help="Connections used to run independent silver/gold SQL units concurrently "
+                             "(1 runs each SQL file as a single script)")
+    parser.add_argument("--report-mode", choices=["pandas", "streaming"],
+                        default=os.getenv("REPORT_MODE", "pandas"),
+                        help="Load each view into pandas, or stream rows in batches into a "
+                             "constant-memory workbook (pandas by default)")
+    parser.add_argument("--report-workers", type=int, default=int(os.getenv("REPORT_WORKERS", "1")),
+                        help="Pooled connections fetching the report views concurrently "
+                             "from one exported snapshot (1 reads them one at a time)")
+    parser.add_argument("--report-cache-dir", default=os.getenv("REPORT_CACHE_DIR", REPORT_CACHE_DIR),
+                        help="Parquet cache of the report views, reused until gold is rebuilt")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always query the database: neither serve reports from the report cache "
+                             "nor keep unchanged gold Parquet exports")
+    parser.add_argument("--export-dir", default=os.getenv("EXPORT_DIR", "./exports"),
+                        help="Directory of the Parquet datasets written by --step export")
+    parser.add_argument("--export-tables", type=lambda value: [n.strip() for n in value.split(",") if n.strip()],
+                        default=None, help=f"Comma-separated relations to export (all by default: {', '.join(EXPORTS)})")
+    parser.add_argument("--parquet-compression", choices=COMPRESSIONS,
+                        default=os.getenv("PARQUET_COMPRESSION", "snappy"),
+                        help="Parquet compression codec (snappy by default)")
+    parser.add_argument("--row-group-size", type=int, default=int(os.getenv("ROW_GROUP_SIZE", "100000")),
+                        help="Rows per Parquet row group")
+    parser.add_argument("--engine", choices=["postgres", "duckdb"], default=os.getenv("ENGINE", "postgres"),
+                        help="Run the pipeline against PostgreSQL, or in process in an embedded "
+                             "DuckDB database (postgres by default)")
+    parser.add_argument("--duckdb-path", default=os.getenv("DUCKDB_PATH", "./olap.duckdb"),
+                        help="DuckDB database file used by --engine duckdb (':memory:' keeps nothing)")
+    parser.add_argument("--metrics-file", default=os.getenv("METRICS_FILE"),
+                        help="Write the run metrics (wall/CPU time, rows, bytes, peak memory per step, "
+                             "time per SQL unit) to this JSON file, or to a new file per run in this "
+                             "directory when it ends with '/'")
+    parser.add_argument("--explain-gold", action="store_true",
+                        help="Also capture EXPLAIN (ANALYZE, BUFFERS) of the materialized gold views "
+                             "in the run metrics (runs their queries once more)")
+    parser.add_argument("--sample", type=float, default=None, metavar="PERCENT",
+                        help="Approximate preview: build silver/gold in olap_preview from a PERCENT sample "
+                             "of the bronze facts (measures scaled back up) and report from it")
+    parser.add_argument("--sample-method", choices=SAMPLE_METHODS, default="bernoulli",
+                        help="TABLESAMPLE method: bernoulli samples rows, system whole blocks (faster, clustered)")
+    parser.add_argument("--sample-seed", type=int, default=42,
+                        help="TABLESAMPLE REPEATABLE seed (the same seed gives the same sample)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue a failed run from its checkpoints (completed steps, "
+                             "tables and files are skipped, partial files continue)")
     args = parser.parse_args()
 
     logger.info("Pipeline started with step='%s', data_dir='%s', reports_dir='%s'",
                 args.step, args.data_dir, args.reports_dir)
 
-    try:
-        if args.step in ("ingest", "all"):
-            logger.info("Starting ingestion step (Bronze layer)")
-            step_ingest(args.data_dir)
-    except RuntimeError:
+    if args.engine == "duckdb" and (args.step == "export" or args.resume or args.incremental):
+        logger.error("--engine duckdb does not support --step export, --resume or --incremental")
         sys.exit(1)
 
-    try:
-        if args.step in ("transform", "all"):
-            logger.info("Starting transformation step")
-            step_transform()
-    except RuntimeError:
+    if args.sample is not None and (not 0 < args.sample <= 100 or args.engine == "duckdb"
+                                    or args.step == "export" or args.resume or args.incremental):
+        logger.error("--sample PERCENT (0 < PERCENT <= 100) previews the PostgreSQL transform and report "
+                     "steps; it cannot be combined with --step export, --resume or --incremental")
         sys.exit(1)
 
+    metrics = RunMetrics(vars(args))
     try:
-        if args.step in ("report", "all"):
-            logger.info("Starting report generation step")
-            step_report(args.reports_dir)
+        if args.engine == "duckdb":
+            run_duckdb_pipeline(args.step, args.data_dir, args.reports_dir, args.duckdb_path, metrics)
+        else:
+            run_steps(args, metrics)
     except RuntimeError:
         sys.exit(1)
+    finally:
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
 
     logger.info("Pipeline completed successfully")
 
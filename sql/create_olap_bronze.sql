@@ -17,7 +17,8 @@ CREATE TABLE olap_bronze.sales (
     classification      INTEGER,
     excise_tax          NUMERIC(12,4),
     vendor_no           INTEGER,
-    vendor_name         TEXT
+    vendor_name         TEXT,
+    source_file         TEXT
 );
 
 
@@ -32,7 +33,8 @@ CREATE TABLE olap_bronze.beg_inventory (
     size            TEXT,
     on_hand         INTEGER,
     price           NUMERIC(12,2),
-    start_date      DATE
+    start_date      DATE,
+    source_file     TEXT
 );
 
 
@@ -47,7 +49,8 @@ CREATE TABLE olap_bronze.end_inventory (
     size            TEXT,
     on_hand         INTEGER,
     price           NUMERIC(12,2),
-    end_date        DATE
+    end_date        DATE,
+    source_file     TEXT
 );
 
 
@@ -69,7 +72,8 @@ CREATE TABLE olap_bronze.purchases (
     purchase_price      NUMERIC(12,4),
     quantity            INTEGER,
     dollars             NUMERIC(12,2),
-    classification      INTEGER
+    classification      INTEGER,
+    source_file         TEXT
 );
 
 
@@ -85,7 +89,8 @@ CREATE TABLE olap_bronze.invoice_purchases (
     quantity        INTEGER,
     dollars         NUMERIC(12,2),
     freight         NUMERIC(12,2),
-    approval        TEXT
+    approval        TEXT,
+    source_file     TEXT
 );
 
 
@@ -100,5 +105,32 @@ CREATE TABLE olap_bronze.purchase_prices (
     classification      INTEGER,
     purchase_price      NUMERIC(12,4),
     vendor_number       INTEGER,
-    vendor_name         TEXT
+    vendor_name         TEXT,
+    source_file         TEXT
+);
+
+
+------------------ Per-file Lookups ------------------
+-- source_file locates the rows of one file (file replacement and incremental silver refresh)
+-- without scanning the table. B-tree rather than BRIN: concurrent ingest workers interleave
+-- the pages of their files, so BRIN ranges would cover every file (deduplication keeps the
+-- b-tree small, there are few distinct values)
+CREATE INDEX sales_source_file_idx ON olap_bronze.sales (source_file);
+CREATE INDEX beg_inventory_source_file_idx ON olap_bronze.beg_inventory (source_file);
+CREATE INDEX end_inventory_source_file_idx ON olap_bronze.end_inventory (source_file);
+CREATE INDEX purchases_source_file_idx ON olap_bronze.purchases (source_file);
+CREATE INDEX invoice_purchases_source_file_idx ON olap_bronze.invoice_purchases (source_file);
+CREATE INDEX purchase_prices_source_file_idx ON olap_bronze.purchase_prices (source_file);
+
+
+------------------ Ingestion Manifest ------------------
+DROP TABLE IF EXISTS olap_bronze.ingest_manifest CASCADE;
+CREATE TABLE olap_bronze.ingest_manifest (
+    file_path       TEXT PRIMARY KEY,
+    table_name      TEXT NOT NULL,
+    file_size       BIGINT NOT NULL,
+    file_mtime      DOUBLE PRECISION NOT NULL,
+    content_hash    TEXT NOT NULL,
+    row_count       BIGINT NOT NULL,
+    loaded_at       TIMESTAMPTZ NOT NULL DEFAULT now()
 );
\ No newline at end of file
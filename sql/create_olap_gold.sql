@@ -1,137 +1,418 @@
 CREATE SCHEMA IF NOT EXISTS olap_gold;
 
----------------- Product-level P&L ----------------
-DROP TABLE IF EXISTS olap_gold.product_pnl CASCADE;
-CREATE TABLE olap_gold.product_pnl AS
-WITH sales_agg AS (
+-- Earlier layouts used tables and plain reporting views under the names now taken by
+-- materialized views and views: drop them once so they can be recreated
+DO $$
+DECLARE r RECORD;
+BEGIN
+    FOR r IN SELECT c.relname, c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+             WHERE n.nspname = 'olap_gold' AND (
+                 (c.relkind = 'r' AND c.relname IN ('pnl_cube', 'product_pnl', 'brand_pnl'))
+                 OR (c.relkind = 'v' AND c.relname LIKE 'vw\_%'
+                     AND to_regclass('olap_gold.mv' || substr(c.relname, 3)) IS NULL))
+    LOOP
+        EXECUTE format('DROP %s IF EXISTS olap_gold.%I CASCADE',
+                       CASE r.relkind WHEN 'r' THEN 'TABLE' ELSE 'VIEW' END, r.relname);
+    END LOOP;
+END $$;
+
+-- Silver state (max olap_silver.load_watermark.refreshed_at of its units) each materialized view was refreshed for
+-- definition_hash: md5 of the view's SQL unit, a changed unit drops the view to recreate it (src/transform.py)
+CREATE TABLE IF NOT EXISTS olap_gold.refresh_state (
+    view_name       TEXT PRIMARY KEY,
+    upstream_at     TIMESTAMPTZ,
+    refreshed_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+    definition_hash TEXT
+);
+ALTER TABLE olap_gold.refresh_state ADD COLUMN IF NOT EXISTS definition_hash TEXT;
+
+-- Version of the gold build recorded by run_gold (src/transform.py): it changes whenever a materialized
+-- view is refreshed or the gold SQL changes, and keys the on-disk report cache (src/cache.py)
+CREATE TABLE IF NOT EXISTS olap_gold.build_version (
+    id              BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version         TEXT NOT NULL,
+    built_at        TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Factor of the additive measures of the cube (quantities, dollars, excise tax): 1 here, 100 / percent
+-- in the approximate preview built from a sample of the facts (src/preview.py)
+CREATE OR REPLACE FUNCTION olap_gold.measure_scale()
+RETURNS NUMERIC LANGUAGE sql STABLE AS $$
+    SELECT 1::NUMERIC
+$$;
+
+
+-- @unit pnl_cube
+------------------- P&L Cube -------------------
+-- Every grain (product, brand, vendor, store, month) is aggregated in a single pass over the facts:
+-- sales and purchases are streamed as one set of movements and grouped with GROUPING SETS.
+-- The cube only stores keys and measures; one row per (grain, grain_key), the other keys are NULL.
+-- Materialized views are created empty and populated/refreshed by run_gold (src/transform.py), which drops
+-- them first when their unit changed (IF NOT EXISTS would keep the previous definition).
+CREATE MATERIALIZED VIEW IF NOT EXISTS olap_gold.pnl_cube AS
+WITH movements AS (
     SELECT
-        s.brand,
-        s.description,
-        s.size,
-        SUM(s.sales_dollars) AS total_revenue,
-        SUM(s.sales_quantity) AS total_qty_sold,
-        SUM(s.excise_tax) AS total_excise_tax,
-        AVG(s.sales_price) AS avg_sales_price,
-        MAX(s.vendor_no) AS vendor_number
+        s.product_key,
+        s.store_key,
+        s.vendor_key,
+        date_trunc('month', s.sales_date)::DATE AS month,
+        TRUE AS is_sale,
+        s.sales_dollars AS revenue,
+        s.sales_quantity AS qty_sold,
+        s.excise_tax,
+        s.sales_price,
+        NULL::NUMERIC AS cogs,
+        NULL::INTEGER AS qty_purchased,
+        NULL::NUMERIC AS purchase_price
     FROM olap_silver.fact_sales s
-    GROUP BY s.brand, s.description, s.size
-),
-purchase_agg AS (
+    UNION ALL
     SELECT
-        p.brand,
-        p.description,
-        p.size,
-        SUM(p.dollars) AS total_cogs,
-        SUM(p.quantity) AS total_qty_purchased,
-        AVG(p.purchase_price) AS avg_purchase_price,
-        MAX(p.vendor_number) AS vendor_number
+        p.product_key,
+        p.store_key,
+        p.vendor_key,
+        date_trunc('month', p.receiving_date)::DATE,
+        FALSE,
+        NULL, NULL, NULL, NULL,
+        p.dollars,
+        p.quantity,
+        p.purchase_price
     FROM olap_silver.fact_purchases p
-    GROUP BY p.brand, p.description, p.size
+),
+cube AS (
+    SELECT
+        CASE
+            WHEN GROUPING(m.product_key) = 0 THEN 'product'
+            WHEN GROUPING(m.vendor_key) = 0 THEN 'vendor'
+            WHEN GROUPING(m.store_key) = 0 THEN 'store'
+            ELSE 'month'
+        END AS grain,
+        m.product_key,
+        d.brand,
+        m.vendor_key,
+        m.store_key,
+        m.month,
+        COALESCE(SUM(m.revenue), 0) * olap_gold.measure_scale() AS total_revenue,
+        COALESCE(SUM(m.cogs), 0) * olap_gold.measure_scale() AS total_cogs,
+        COALESCE(SUM(m.excise_tax), 0) * olap_gold.measure_scale() AS total_excise_tax,
+        ROUND(COALESCE(SUM(m.qty_sold), 0) * olap_gold.measure_scale())::BIGINT AS total_qty_sold,
+        ROUND(COALESCE(SUM(m.qty_purchased), 0) * olap_gold.measure_scale())::BIGINT AS total_qty_purchased,
+        SUM(m.sales_price) AS sum_sales_price,
+        COUNT(m.sales_price) AS count_sales_price,
+        SUM(m.purchase_price) AS sum_purchase_price,
+        COUNT(m.purchase_price) AS count_purchase_price,
+        -- Representative vendor of a product: the highest purchasing vendor number, else the highest selling one
+        COALESCE(MAX(v.vendor_number) FILTER (WHERE NOT m.is_sale),
+                 MAX(v.vendor_number) FILTER (WHERE m.is_sale)) AS main_vendor_number,
+        COUNT(DISTINCT m.product_key) FILTER (WHERE m.is_sale) AS distinct_skus
+    FROM movements m
+    JOIN olap_silver.dim_product d
+        ON d.product_key = m.product_key
+    LEFT JOIN olap_silver.dim_vendor v
+        ON v.vendor_key = m.vendor_key
+    GROUP BY GROUPING SETS ((m.product_key, d.brand), (m.vendor_key), (m.store_key), (m.month))
+),
+-- The brand grain rolls up the products that were sold (purchases of unsold products are left out),
+-- counts its SKUs by description and takes the vendor with the highest name among its products
+brands AS (
+    SELECT
+        'brand' AS grain,
+        NULL::INTEGER AS product_key,
+        c.brand,
+        NULL::INTEGER AS vendor_key,
+        NULL::INTEGER AS store_key,
+        NULL::DATE AS month,
+        SUM(c.total_revenue),
+        SUM(c.total_cogs),
+        SUM(c.total_excise_tax),
+        SUM(c.total_qty_sold)::BIGINT,
+        SUM(c.total_qty_purchased)::BIGINT,
+        SUM(c.sum_sales_price),
+        SUM(c.count_sales_price),
+        SUM(c.sum_purchase_price),
+        SUM(c.count_purchase_price),
+        (ARRAY_AGG(c.main_vendor_number ORDER BY COALESCE(v.vendor_name, 'UNKNOWN') DESC))[1],
+        COUNT(DISTINCT d.description)
+    FROM cube c
+    JOIN olap_silver.dim_product d
+        ON d.product_key = c.product_key
+    LEFT JOIN olap_silver.dim_vendor v
+        ON v.vendor_number = c.main_vendor_number
+    WHERE c.grain = 'product'
+    AND c.total_qty_sold > 0
+    GROUP BY c.brand
+),
+grains AS (
+    SELECT * FROM cube
+    UNION ALL
+    SELECT * FROM brands
 )
 SELECT
-    s.brand,
-    s.description,
-    s.size,
-    COALESCE(v.vendor_name, 'UNKNOWN') AS vendor_name,
-    ROUND(s.total_revenue, 2) AS total_revenue,
-    ROUND(COALESCE(p.total_cogs, 0), 2) AS total_cogs, 
-    ROUND(s.total_excise_tax, 4) AS total_excise_tax,
-    ROUND(s.total_revenue - COALESCE(p.total_cogs, 0) - s.total_excise_tax, 2) AS gross_profit,
-    CASE 
-        WHEN s.total_revenue > 0 
-        THEN ROUND((s.total_revenue - COALESCE(p.total_cogs, 0) - s.total_excise_tax) / s.total_revenue * 100, 2)
-        ELSE 0 
-    END AS gross_margin_pct,
-    s.total_qty_sold,
-    ROUND(s.avg_sales_price, 2) AS avg_sales_price,
-    ROUND(COALESCE(p.avg_purchase_price, 0), 2) AS avg_purchase_price
-FROM sales_agg s
-LEFT JOIN purchase_agg p
-    ON s.brand = p.brand 
-    AND s.description = p.description 
-    AND s.size = p.size
-LEFT JOIN olap_silver.dim_vendor v
-    ON COALESCE(p.vendor_number, s.vendor_number) = v.vendor_number;
-
-
----------------- Brand-level P&L ----------------
-DROP TABLE IF EXISTS olap_gold.brand_pnl CASCADE;
-CREATE TABLE olap_gold.brand_pnl AS
-SELECT
+    grain,
+    CASE grain
+        WHEN 'product' THEN product_key
+        WHEN 'brand' THEN COALESCE(brand, -1)
+        WHEN 'vendor' THEN vendor_key
+        WHEN 'store' THEN store_key
+        ELSE COALESCE(TO_CHAR(month, 'YYYYMM')::INTEGER, -1)
+    END AS grain_key,
+    product_key,
     brand,
-    MAX(vendor_name) AS vendor_name,
-    ROUND(SUM(total_revenue), 2) AS total_revenue,
-    ROUND(SUM(total_cogs), 2) AS total_cogs,
-    ROUND(SUM(total_excise_tax), 4) AS total_excise_tax,
-    ROUND(SUM(gross_profit), 2) AS gross_profit,
+    vendor_key,
+    store_key,
+    month,
+    ROUND(total_revenue, 2) AS total_revenue,
+    ROUND(total_cogs, 2) AS total_cogs,
+    ROUND(total_excise_tax, 4) AS total_excise_tax,
+    ROUND(total_revenue - total_cogs - total_excise_tax, 2) AS gross_profit,
     CASE
-        WHEN SUM(total_revenue) > 0
-        THEN ROUND(SUM(gross_profit) / SUM(total_revenue) * 100, 2)
+        WHEN total_revenue > 0
+        THEN ROUND((total_revenue - total_cogs - total_excise_tax) / total_revenue * 100, 2)
         ELSE 0
     END AS gross_margin_pct,
-    SUM(total_qty_sold) AS total_qty_sold,
-    COUNT(DISTINCT description) AS distinct_skus
-FROM olap_gold.product_pnl
-GROUP BY brand;
+    total_qty_sold,
+    total_qty_purchased,
+    ROUND(sum_sales_price / NULLIF(count_sales_price, 0), 2) AS avg_sales_price,
+    ROUND(COALESCE(sum_purchase_price / NULLIF(count_purchase_price, 0), 0), 2) AS avg_purchase_price,
+    main_vendor_number,
+    distinct_skus::INTEGER AS distinct_skus
+FROM grains
+WITH NO DATA;
+
+-- Unique key required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS pnl_cube_grain_key ON olap_gold.pnl_cube (grain, grain_key);
+
+
+------------------- Grain Views -------------------
+-- Each grain reads its slice of the cube and joins the dimension attributes of its rows only
+-- @unit product_pnl
+-- @depends_on pnl_cube
+CREATE OR REPLACE VIEW olap_gold.product_pnl AS
+SELECT
+    c.product_key,
+    d.brand,
+    d.description,
+    d.size,
+    COALESCE(v.vendor_name, 'UNKNOWN') AS vendor_name,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.avg_sales_price,
+    c.avg_purchase_price
+FROM olap_gold.pnl_cube c
+JOIN olap_silver.dim_product d ON d.product_key = c.product_key
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = c.main_vendor_number
+WHERE c.grain = 'product'
+AND c.total_qty_sold > 0; -- Products that were sold
+
+-- @unit brand_pnl
+-- @depends_on pnl_cube
+CREATE OR REPLACE VIEW olap_gold.brand_pnl AS
+SELECT
+    c.brand,
+    COALESCE(v.vendor_name, 'UNKNOWN') AS vendor_name,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.distinct_skus
+FROM olap_gold.pnl_cube c
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = c.main_vendor_number
+WHERE c.grain = 'brand'
+AND c.total_qty_sold > 0;
+
+-- @unit vendor_pnl
+-- @depends_on pnl_cube
+CREATE OR REPLACE VIEW olap_gold.vendor_pnl AS
+SELECT
+    v.vendor_number,
+    COALESCE(v.vendor_name, 'UNKNOWN') AS vendor_name,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.total_qty_purchased,
+    c.distinct_skus
+FROM olap_gold.pnl_cube c
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_key = c.vendor_key
+WHERE c.grain = 'vendor';
+
+-- @unit store_pnl
+-- @depends_on pnl_cube
+CREATE OR REPLACE VIEW olap_gold.store_pnl AS
+SELECT
+    s.store_id,
+    s.city,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.total_qty_purchased,
+    c.distinct_skus
+FROM olap_gold.pnl_cube c
+LEFT JOIN olap_silver.dim_store s ON s.store_key = c.store_key
+WHERE c.grain = 'store';
+
+-- @unit monthly_pnl
+-- @depends_on pnl_cube
+CREATE OR REPLACE VIEW olap_gold.monthly_pnl AS
+SELECT
+    c.month,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.total_qty_purchased,
+    c.distinct_skus
+FROM olap_gold.pnl_cube c
+WHERE c.grain = 'month';
 
 
 ------------------- Reporting Views -------------------
-DROP VIEW IF EXISTS olap_gold.vw_top_10_products_profit;
-CREATE VIEW olap_gold.vw_top_10_products_profit AS
+-- Each report is a materialized view (mv_*) holding its filtered rows, keyed for concurrent refresh;
+-- the vw_* views read by the reports only sort those few rows
+-- @unit mv_top_10_products_profit
+-- @depends_on product_pnl
+CREATE MATERIALIZED VIEW IF NOT EXISTS olap_gold.mv_top_10_products_profit AS
 SELECT
-    brand, description, size, vendor_name, total_revenue, total_cogs,
+    product_key, brand, description, size, vendor_name, total_revenue, total_cogs,
     gross_profit, gross_margin_pct, total_qty_sold
 FROM olap_gold.product_pnl
 WHERE gross_profit > 0
 AND total_qty_sold >= 100 -- Arbitrary (exclude low-volume products)
-ORDER BY gross_profit DESC LIMIT 10;
+AND product_key <> -1 -- Unknown product (unresolved fact rows)
+ORDER BY gross_profit DESC LIMIT 10
+WITH NO DATA;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_top_10_products_profit_key ON olap_gold.mv_top_10_products_profit (product_key);
 
-DROP VIEW IF EXISTS olap_gold.vw_top_10_products_margin;
-CREATE VIEW olap_gold.vw_top_10_products_margin AS
+-- @unit vw_top_10_products_profit
+-- @depends_on mv_top_10_products_profit
+CREATE OR REPLACE VIEW olap_gold.vw_top_10_products_profit AS
 SELECT
     brand, description, size, vendor_name, total_revenue, total_cogs,
     gross_profit, gross_margin_pct, total_qty_sold
+FROM olap_gold.mv_top_10_products_profit
+ORDER BY gross_profit DESC;
+
+-- @unit mv_top_10_products_margin
+-- @depends_on product_pnl
+CREATE MATERIALIZED VIEW IF NOT EXISTS olap_gold.mv_top_10_products_margin AS
+SELECT
+    product_key, brand, description, size, vendor_name, total_revenue, total_cogs,
+    gross_profit, gross_margin_pct, total_qty_sold
 FROM olap_gold.product_pnl
 WHERE gross_margin_pct > 0
 AND total_qty_sold >= 100 -- Arbitrary (exclude low-volume products)
-ORDER BY gross_margin_pct DESC LIMIT 10;
+AND product_key <> -1 -- Unknown product (unresolved fact rows)
+ORDER BY gross_margin_pct DESC LIMIT 10
+WITH NO DATA;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_top_10_products_margin_key ON olap_gold.mv_top_10_products_margin (product_key);
+
+-- @unit vw_top_10_products_margin
+-- @depends_on mv_top_10_products_margin
+CREATE OR REPLACE VIEW olap_gold.vw_top_10_products_margin AS
+SELECT
+    brand, description, size, vendor_name, total_revenue, total_cogs,
+    gross_profit, gross_margin_pct, total_qty_sold
+FROM olap_gold.mv_top_10_products_margin
+ORDER BY gross_margin_pct DESC;
 
-DROP VIEW IF EXISTS olap_gold.vw_top_10_brands_profit;
-CREATE VIEW olap_gold.vw_top_10_brands_profit AS
+-- @unit mv_top_10_brands_profit
+-- @depends_on brand_pnl
+CREATE MATERIALIZED VIEW IF NOT EXISTS olap_gold.mv_top_10_brands_profit AS
 SELECT
     brand, vendor_name, total_revenue, total_cogs, gross_profit,
     gross_margin_pct, total_qty_sold, distinct_skus
 FROM olap_gold.brand_pnl
 WHERE gross_profit > 0
 AND total_qty_sold >= 200 -- Arbitrary (exclude low-volume brands)
-ORDER BY gross_profit DESC LIMIT 10;
+AND brand IS NOT NULL -- Unknown brand (unresolved fact rows)
+ORDER BY gross_profit DESC LIMIT 10
+WITH NO DATA;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_top_10_brands_profit_key ON olap_gold.mv_top_10_brands_profit (brand) NULLS NOT DISTINCT;
+
+-- @unit vw_top_10_brands_profit
+-- @depends_on mv_top_10_brands_profit
+CREATE OR REPLACE VIEW olap_gold.vw_top_10_brands_profit AS
+SELECT
+    brand, vendor_name, total_revenue, total_cogs, gross_profit,
+    gross_margin_pct, total_qty_sold, distinct_skus
+FROM olap_gold.mv_top_10_brands_profit
+ORDER BY gross_profit DESC;
 
-DROP VIEW IF EXISTS olap_gold.vw_top_10_brands_margin;
-CREATE VIEW olap_gold.vw_top_10_brands_margin AS
+-- @unit mv_top_10_brands_margin
+-- @depends_on brand_pnl
+CREATE MATERIALIZED VIEW IF NOT EXISTS olap_gold.mv_top_10_brands_margin AS
 SELECT
     brand, vendor_name, total_revenue, total_cogs, gross_profit,
     gross_margin_pct, total_qty_sold, distinct_skus
 FROM olap_gold.brand_pnl
 WHERE gross_margin_pct > 0
 AND total_qty_sold >= 200 -- Arbitrary (exclude low-volume brands)
-ORDER BY gross_margin_pct DESC LIMIT 10;
+AND brand IS NOT NULL -- Unknown brand (unresolved fact rows)
+ORDER BY gross_margin_pct DESC LIMIT 10
+WITH NO DATA;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_top_10_brands_margin_key ON olap_gold.mv_top_10_brands_margin (brand) NULLS NOT DISTINCT;
 
-DROP VIEW IF EXISTS olap_gold.vw_drop_candidates_products;
-CREATE VIEW olap_gold.vw_drop_candidates_products AS
+-- @unit vw_top_10_brands_margin
+-- @depends_on mv_top_10_brands_margin
+CREATE OR REPLACE VIEW olap_gold.vw_top_10_brands_margin AS
 SELECT
-    brand, description, size, vendor_name, total_revenue, total_cogs,
+    brand, vendor_name, total_revenue, total_cogs, gross_profit,
+    gross_margin_pct, total_qty_sold, distinct_skus
+FROM olap_gold.mv_top_10_brands_margin
+ORDER BY gross_margin_pct DESC;
+
+-- @unit mv_drop_candidates_products
+-- @depends_on product_pnl
+CREATE MATERIALIZED VIEW IF NOT EXISTS olap_gold.mv_drop_candidates_products AS
+SELECT
+    product_key, brand, description, size, vendor_name, total_revenue, total_cogs,
     gross_profit, gross_margin_pct, total_qty_sold
 FROM olap_gold.product_pnl
 WHERE gross_profit < 0
 AND total_qty_sold >= 100 -- Arbitrary (exclude low-volume products to avoid noise)
+AND product_key <> -1 -- Unknown product (unresolved fact rows)
+WITH NO DATA;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_drop_candidates_products_key ON olap_gold.mv_drop_candidates_products (product_key);
+
+-- @unit vw_drop_candidates_products
+-- @depends_on mv_drop_candidates_products
+CREATE OR REPLACE VIEW olap_gold.vw_drop_candidates_products AS
+SELECT
+    brand, description, size, vendor_name, total_revenue, total_cogs,
+    gross_profit, gross_margin_pct, total_qty_sold
+FROM olap_gold.mv_drop_candidates_products
 ORDER BY gross_profit ASC;
 
-DROP VIEW IF EXISTS olap_gold.vw_drop_candidates_brands;
-CREATE VIEW olap_gold.vw_drop_candidates_brands AS
+-- @unit mv_drop_candidates_brands
+-- @depends_on brand_pnl
+CREATE MATERIALIZED VIEW IF NOT EXISTS olap_gold.mv_drop_candidates_brands AS
 SELECT
     brand, vendor_name, total_revenue, total_cogs, gross_profit,
     gross_margin_pct, total_qty_sold, distinct_skus
 FROM olap_gold.brand_pnl
 WHERE gross_profit < 0
 AND total_qty_sold >= 200 -- Arbitrary (exclude low-volume brands to avoid noise)
-ORDER BY gross_profit ASC;
\ No newline at end of file
+AND brand IS NOT NULL -- Unknown brand (unresolved fact rows)
+WITH NO DATA;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_drop_candidates_brands_key ON olap_gold.mv_drop_candidates_brands (brand) NULLS NOT DISTINCT;
+
+-- @unit vw_drop_candidates_brands
+-- @depends_on mv_drop_candidates_brands
+CREATE OR REPLACE VIEW olap_gold.vw_drop_candidates_brands AS
+SELECT
+    brand, vendor_name, total_revenue, total_cogs, gross_profit,
+    gross_margin_pct, total_qty_sold, distinct_skus
+FROM olap_gold.mv_drop_candidates_brands
+ORDER BY gross_profit ASC;
@@ -0,0 +1,14 @@
+CREATE SCHEMA IF NOT EXISTS olap_meta;
+
+
+---------------- Pipeline Checkpoints ----------------
+-- scope: 'step' (ingest, silver, gold, report), 'table' (bronze tables) or 'file' (CSV files)
+CREATE TABLE IF NOT EXISTS olap_meta.checkpoint (
+    scope           TEXT NOT NULL,
+    name            TEXT NOT NULL,
+    content_hash    TEXT,
+    rows_committed  BIGINT NOT NULL DEFAULT 0,
+    completed       BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (scope, name)
+);
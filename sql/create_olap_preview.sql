@@ -0,0 +1,16 @@
+CREATE SCHEMA IF NOT EXISTS olap_preview;
+
+
+---------------- Approximate Preview ----------------
+-- Sample the preview was last built from (src/preview.py): the silver and gold objects of olap_preview
+-- are built by the silver/gold SQL from a TABLESAMPLE of olap_bronze.sales and olap_bronze.purchases,
+-- whose additive measures are multiplied by scale_factor (100 / percent)
+CREATE TABLE IF NOT EXISTS olap_preview.sample_info (
+    id              BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    percent         NUMERIC NOT NULL,
+    method          TEXT NOT NULL,
+    seed            INTEGER NOT NULL,
+    scale_factor    NUMERIC NOT NULL,
+    sampled_rows    JSONB NOT NULL,
+    built_at        TIMESTAMPTZ NOT NULL DEFAULT now()
+);
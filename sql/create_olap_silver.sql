@@ -1,8 +1,113 @@
 CREATE SCHEMA IF NOT EXISTS olap_silver;
 
+-- Latest ingest manifest load time (olap_bronze.ingest_manifest.loaded_at) merged by each unit
+-- refreshed_at: when the unit last rewrote rows (the gold layer refreshes what depends on it)
+CREATE TABLE IF NOT EXISTS olap_silver.load_watermark (
+    unit_name       TEXT PRIMARY KEY,
+    loaded_at       TIMESTAMPTZ NOT NULL,
+    refreshed_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+ALTER TABLE olap_silver.load_watermark ADD COLUMN IF NOT EXISTS refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+-- Name of the partition of a fact table holding a date: '<parent>_YYYY_MM' ('<parent>_default' for NULL)
+CREATE OR REPLACE FUNCTION olap_silver.month_partition(parent TEXT, day DATE)
+RETURNS TEXT LANGUAGE sql IMMUTABLE AS $$
+    SELECT parent || COALESCE(to_char(day, '_YYYY_MM'), '_default')
+$$;
+
+-- Create the missing monthly partitions '<parent>_YYYY_MM' of a fact table covering [first_date, last_date]
+CREATE OR REPLACE FUNCTION olap_silver.create_month_partitions(parent TEXT, first_date DATE, last_date DATE)
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    bound           DATE := date_trunc('month', first_date)::DATE;
+    partition_name  TEXT;
+    created         INTEGER := 0;
+BEGIN
+    WHILE bound <= last_date LOOP
+        partition_name := olap_silver.month_partition(parent, bound);
+        IF to_regclass(format('olap_silver.%I', partition_name)) IS NULL THEN
+            EXECUTE format('CREATE TABLE olap_silver.%I PARTITION OF olap_silver.%I FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, parent, bound, (bound + INTERVAL '1 month')::DATE);
+            created := created + 1;
+        END IF;
+        bound := (bound + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- Partitions holding the rows of each source file of a partitioned fact, so that replacing a file
+-- (incremental refresh) deletes from those partitions only instead of probing every month
+CREATE TABLE IF NOT EXISTS olap_silver.file_partitions (
+    fact_table      TEXT NOT NULL,
+    source_file     TEXT NOT NULL,
+    partition_name  TEXT NOT NULL,
+    PRIMARY KEY (fact_table, source_file, partition_name)
+);
+
+-- md5 of the DDL each silver table was created from (see reset_table)
+CREATE TABLE IF NOT EXISTS olap_silver.table_layout (
+    table_name      TEXT PRIMARY KEY,
+    layout_hash     TEXT NOT NULL
+);
 
+-- Empty a silver table for a full build (TRUNCATE, identities restarted), so the gold views built on it
+-- survive; the table is dropped with its dependents (CASCADE) and recreated only when it is missing or
+-- its DDL changed. Secondary indexes (not backing a constraint) are dropped so that the reload does not
+-- maintain them: src/indexes.py builds them after the load. Returns TRUE when the table was (re)created
+CREATE OR REPLACE FUNCTION olap_silver.reset_table(name TEXT, ddl TEXT)
+RETURNS BOOLEAN LANGUAGE plpgsql AS $$
+DECLARE
+    index_name  TEXT;
+BEGIN
+    IF to_regclass(format('olap_silver.%I', name)) IS NOT NULL
+       AND (SELECT layout_hash FROM olap_silver.table_layout WHERE table_name = name) = md5(ddl) THEN
+        EXECUTE format('TRUNCATE olap_silver.%I RESTART IDENTITY', name);
+        FOR index_name IN
+            SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = format('olap_silver.%I', name)::regclass
+            AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)
+        LOOP
+            EXECUTE format('DROP INDEX olap_silver.%I', index_name);
+        END LOOP;
+        RETURN FALSE;
+    END IF;
+    EXECUTE format('DROP TABLE IF EXISTS olap_silver.%I CASCADE', name);
+    EXECUTE ddl;
+    INSERT INTO olap_silver.table_layout VALUES (name, md5(ddl))
+    ON CONFLICT (table_name) DO UPDATE SET layout_hash = EXCLUDED.layout_hash;
+    RETURN TRUE;
+END;
+$$;
+
+-- Delete the rows of the given source files from the partitions recorded for them (and forget them)
+CREATE OR REPLACE FUNCTION olap_silver.delete_file_rows(parent TEXT, files TEXT[])
+RETURNS BIGINT LANGUAGE plpgsql AS $$
+DECLARE
+    target      TEXT;
+    deleted     BIGINT := 0;
+    affected    BIGINT;
+BEGIN
+    FOR target IN
+        SELECT DISTINCT partition_name FROM olap_silver.file_partitions
+        WHERE fact_table = parent AND source_file = ANY(files)
+    LOOP
+        IF to_regclass(format('olap_silver.%I', target)) IS NOT NULL THEN
+            EXECUTE format('DELETE FROM olap_silver.%I WHERE source_file = ANY($1)', target) USING files;
+            GET DIAGNOSTICS affected = ROW_COUNT;
+            deleted := deleted + affected;
+        END IF;
+    END LOOP;
+    DELETE FROM olap_silver.file_partitions WHERE fact_table = parent AND source_file = ANY(files);
+    RETURN deleted;
+END;
+$$;
+
+
+-- @unit dim_product
 ---------------- Dimension: Products ----------------
-DROP TABLE IF EXISTS olap_silver.dim_product CASCADE;
+-- product_key -1 is the unknown member, referenced by facts whose natural key does not resolve
+SELECT olap_silver.reset_table('dim_product', $ddl$
 CREATE TABLE olap_silver.dim_product (
     product_key     SERIAL PRIMARY KEY,
     brand           INTEGER,
@@ -11,190 +116,330 @@ CREATE TABLE olap_silver.dim_product (
     volume          TEXT,
     classification  INTEGER,
     vendor_number   INTEGER,
-    vendor_name     TEXT
-);
+    vendor_name     TEXT,
+    CONSTRAINT dim_product_natural_key UNIQUE NULLS NOT DISTINCT (brand, description, size)
+)
+$ddl$);
+
+INSERT INTO olap_silver.dim_product (product_key, description, vendor_name)
+VALUES (-1, 'UNKNOWN', 'UNKNOWN');
+
+---------------------------------------------- Populate dim_product ----------------------------------------------
+INSERT INTO olap_silver.dim_product (brand, description, size, volume, classification, vendor_number, vendor_name)
+SELECT DISTINCT ON (brand, TRIM(description), size)
+    brand,
+    TRIM(description),
+    size,
+    volume::TEXT,
+    classification,
+    vendor_number,
+    TRIM(vendor_name)
+FROM olap_bronze.purchase_prices
+ORDER BY brand, TRIM(description), size, vendor_number
+ON CONFLICT DO NOTHING;
+
+-- Inferred members: products sold, purchased or stocked but missing from the price list
+INSERT INTO olap_silver.dim_product (brand, description, size, volume, classification, vendor_number, vendor_name)
+SELECT brand, description, size, MAX(volume), MAX(classification), MAX(vendor_number), MAX(vendor_name)
+FROM (
+    SELECT brand, TRIM(description) AS description, size, volume::TEXT AS volume, classification,
+           vendor_no AS vendor_number, TRIM(vendor_name) AS vendor_name
+    FROM olap_bronze.sales
+    UNION ALL
+    SELECT brand, TRIM(description), size, NULL, classification, vendor_number, TRIM(vendor_name)
+    FROM olap_bronze.purchases
+    UNION ALL
+    SELECT brand, TRIM(description), size, NULL, NULL, NULL, NULL
+    FROM olap_bronze.beg_inventory
+) seen
+GROUP BY brand, description, size
+ORDER BY brand, description, size -- Same keys as the previous build while bronze is unchanged
+ON CONFLICT DO NOTHING;
 
+INSERT INTO olap_silver.load_watermark
+SELECT 'dim_product', COALESCE(MAX(loaded_at), '-infinity')
+FROM olap_bronze.ingest_manifest WHERE table_name IN ('purchase_prices', 'sales', 'purchases', 'beg_inventory')
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
 
+
+-- @unit dim_store
 ---------------- Dimension: Stores ----------------
-DROP TABLE IF EXISTS olap_silver.dim_store CASCADE;
+-- store_key -1 is the unknown member
+SELECT olap_silver.reset_table('dim_store', $ddl$
 CREATE TABLE olap_silver.dim_store (
     store_key   SERIAL PRIMARY KEY,
     store_id    INTEGER,
-    city        TEXT
-);
+    city        TEXT,
+    CONSTRAINT dim_store_natural_key UNIQUE NULLS NOT DISTINCT (store_id)
+)
+$ddl$);
+
+INSERT INTO olap_silver.dim_store (store_key, store_id, city)
+VALUES (-1, NULL, 'UNKNOWN');
+
+--------------- Populate dim_store ---------------
+INSERT INTO olap_silver.dim_store (store_id, city)
+SELECT DISTINCT ON (store) store, TRIM(city)
+FROM olap_bronze.beg_inventory
+ORDER BY store, TRIM(city)
+ON CONFLICT DO NOTHING;
 
+INSERT INTO olap_silver.load_watermark
+SELECT 'dim_store', COALESCE(MAX(loaded_at), '-infinity')
+FROM olap_bronze.ingest_manifest WHERE table_name = 'beg_inventory'
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
 
+
+-- @unit dim_vendor
 ---------------- Dimension: Vendors ----------------
-DROP TABLE IF EXISTS olap_silver.dim_vendor CASCADE;
+-- vendor_key -1 is the unknown member
+SELECT olap_silver.reset_table('dim_vendor', $ddl$
 CREATE TABLE olap_silver.dim_vendor (
     vendor_key      SERIAL PRIMARY KEY,
     vendor_number   INTEGER,
-    vendor_name     TEXT
-);
+    vendor_name     TEXT,
+    CONSTRAINT dim_vendor_natural_key UNIQUE NULLS NOT DISTINCT (vendor_number)
+)
+$ddl$);
+
+INSERT INTO olap_silver.dim_vendor (vendor_key, vendor_number, vendor_name)
+VALUES (-1, NULL, 'UNKNOWN');
+
+--------------------- Populate dim_vendor ---------------------
+INSERT INTO olap_silver.dim_vendor (vendor_number, vendor_name)
+SELECT DISTINCT ON (vendor_number) vendor_number, TRIM(vendor_name)
+FROM olap_bronze.purchases
+ORDER BY vendor_number, TRIM(vendor_name)
+ON CONFLICT DO NOTHING;
 
+INSERT INTO olap_silver.load_watermark
+SELECT 'dim_vendor', COALESCE(MAX(loaded_at), '-infinity')
+FROM olap_bronze.ingest_manifest WHERE table_name = 'purchases'
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
 
+
+-- @unit dim_date
 ----------------- Dimension: Date -----------------
-DROP TABLE IF EXISTS olap_silver.dim_date CASCADE;
+-- date_key is the YYYYMMDD integer of full_date (-1: unknown member for missing dates)
+SELECT olap_silver.reset_table('dim_date', $ddl$
 CREATE TABLE olap_silver.dim_date (
-    date_key    DATE PRIMARY KEY,
+    date_key    INTEGER PRIMARY KEY,
+    full_date   DATE UNIQUE,
     year        INTEGER,
     quarter     INTEGER,
     month       INTEGER,
     week        INTEGER,
     day_of_week INTEGER
-);
+)
+$ddl$);
 
+INSERT INTO olap_silver.dim_date (date_key) VALUES (-1);
+
+-- Whole calendar years covering the sales and purchase dates (current year when bronze is empty)
 INSERT INTO olap_silver.dim_date
 SELECT
+    TO_CHAR(d, 'YYYYMMDD')::INTEGER,
     d::DATE,
     EXTRACT(YEAR  FROM d)::INTEGER,
     EXTRACT(QUARTER FROM d)::INTEGER,
     EXTRACT(MONTH FROM d)::INTEGER,
     EXTRACT(WEEK  FROM d)::INTEGER,
     EXTRACT(DOW   FROM d)::INTEGER
-FROM generate_series('2016-01-01'::DATE, '2016-12-31'::DATE, '1 day'::INTERVAL) d
+FROM (
+    SELECT MIN(first_date) AS first_date, MAX(last_date) AS last_date
+    FROM (
+        SELECT MIN(sales_date) AS first_date, MAX(sales_date) AS last_date FROM olap_bronze.sales
+        UNION ALL
+        SELECT MIN(receiving_date), MAX(receiving_date) FROM olap_bronze.purchases
+    ) ranges
+) r,
+generate_series(
+    date_trunc('year', COALESCE(r.first_date, CURRENT_DATE)),
+    date_trunc('year', COALESCE(r.last_date, CURRENT_DATE)) + INTERVAL '1 year' - INTERVAL '1 day',
+    '1 day'::INTERVAL
+) d
 ON CONFLICT DO NOTHING;
 
-
----------------------------------------------- Populate dim_product ----------------------------------------------
-INSERT INTO olap_silver.dim_product (brand, description, size, volume, classification, vendor_number, vendor_name)
-SELECT DISTINCT
-    brand,
-    description,
-    size,
-    volume::TEXT,
-    classification,
-    vendor_number,
-    TRIM(vendor_name)
-FROM olap_bronze.purchase_prices
-ON CONFLICT DO NOTHING;
-
-
---------------- Populate dim_store ---------------
-INSERT INTO olap_silver.dim_store (store_id, city)
-SELECT DISTINCT store, TRIM(city)
-FROM olap_bronze.beg_inventory
-ON CONFLICT DO NOTHING;
-
-
---------------------- Populate dim_vendor ---------------------
-INSERT INTO olap_silver.dim_vendor (vendor_number, vendor_name)
-SELECT DISTINCT vendor_number, TRIM(vendor_name)
-FROM olap_bronze.purchases
-ON CONFLICT DO NOTHING;
+INSERT INTO olap_silver.load_watermark
+SELECT 'dim_date', COALESCE(MAX(loaded_at), '-infinity')
+FROM olap_bronze.ingest_manifest WHERE table_name IN ('sales', 'purchases')
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
 
 
+-- @unit fact_sales
+-- @depends_on dim_product, dim_store, dim_vendor, dim_date
 -------------------- Fact: Sales --------------------
-DROP TABLE IF EXISTS olap_silver.fact_sales CASCADE;
+-- Dimensions are referenced by integer surrogate keys (-1 when the natural key does not resolve);
+-- monthly range partitions on sales_date (rows without a date go to the default partition)
+SELECT olap_silver.reset_table('fact_sales', $ddl$
 CREATE TABLE olap_silver.fact_sales (
-    sale_id         BIGSERIAL PRIMARY KEY,
+    sale_id         BIGSERIAL,
     inventory_id    TEXT,
-    store_id        INTEGER,
-    brand           INTEGER,
-    description     TEXT,
-    size            TEXT,
+    product_key     INTEGER NOT NULL,
+    store_key       INTEGER NOT NULL,
+    vendor_key      INTEGER NOT NULL,
+    date_key        INTEGER NOT NULL,
     sales_date      DATE,
     sales_quantity  INTEGER,
     sales_dollars   NUMERIC(12,2),
     sales_price     NUMERIC(12,2),
     excise_tax      NUMERIC(12,4),
-    volume          INTEGER,
-    classification  INTEGER,
-    vendor_no       INTEGER
-);
+    source_file     TEXT
+) PARTITION BY RANGE (sales_date)
+$ddl$);
+
+CREATE TABLE IF NOT EXISTS olap_silver.fact_sales_default PARTITION OF olap_silver.fact_sales DEFAULT;
+
+-- Months of each file (one scan of bronze): partitions to create and the per-file lineage
+CREATE TEMP TABLE sales_file_months ON COMMIT DROP AS
+SELECT source_file, date_trunc('month', sales_date)::DATE AS month
+FROM olap_bronze.sales
+WHERE sales_dollars IS NOT NULL AND sales_quantity > 0
+GROUP BY 1, 2;
+
+SELECT olap_silver.create_month_partitions('fact_sales', MIN(month), MAX(month))
+FROM sales_file_months;
 
 INSERT INTO olap_silver.fact_sales (
-    inventory_id, store_id, brand, description, size,
-    sales_date, sales_quantity, sales_dollars, sales_price,
-    excise_tax, volume, classification, vendor_no
+    inventory_id, product_key, store_key, vendor_key, date_key,
+    sales_date, sales_quantity, sales_dollars, sales_price, excise_tax, source_file
 )
 SELECT
-    inventory_id,
-    store,
-    brand,
-    TRIM(description),
-    size,
-    sales_date,
-    sales_quantity,
-    sales_dollars,
-    sales_price,
-    excise_tax,
-    volume,
-    classification,
-    vendor_no
-FROM olap_bronze.sales
-WHERE sales_dollars IS NOT NULL AND sales_quantity > 0;
+    s.inventory_id,
+    COALESCE(p.product_key, -1),
+    COALESCE(st.store_key, -1),
+    COALESCE(v.vendor_key, -1),
+    COALESCE(d.date_key, -1),
+    s.sales_date,
+    s.sales_quantity,
+    s.sales_dollars,
+    s.sales_price,
+    s.excise_tax,
+    s.source_file
+FROM olap_bronze.sales s
+LEFT JOIN olap_silver.dim_product p
+    ON p.brand = s.brand AND p.description = TRIM(s.description) AND p.size = s.size
+LEFT JOIN olap_silver.dim_store st ON st.store_id = s.store
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = s.vendor_no
+LEFT JOIN olap_silver.dim_date d ON d.full_date = s.sales_date
+WHERE s.sales_dollars IS NOT NULL AND s.sales_quantity > 0;
+
+DELETE FROM olap_silver.file_partitions WHERE fact_table = 'fact_sales';
+INSERT INTO olap_silver.file_partitions
+SELECT DISTINCT 'fact_sales', source_file, olap_silver.month_partition('fact_sales', month)
+FROM sales_file_months
+WHERE source_file IS NOT NULL;
 
+INSERT INTO olap_silver.load_watermark
+SELECT 'fact_sales', COALESCE(MAX(loaded_at), '-infinity')
+FROM olap_bronze.ingest_manifest WHERE table_name = 'sales'
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
 
+
+-- @unit fact_purchases
+-- @depends_on dim_product, dim_store, dim_vendor, dim_date
 -------------------- Fact: Purchases --------------------
-DROP TABLE IF EXISTS olap_silver.fact_purchases CASCADE;
+-- Monthly range partitions on receiving_date (rows without a date go to the default partition)
+SELECT olap_silver.reset_table('fact_purchases', $ddl$
 CREATE TABLE olap_silver.fact_purchases (
-    purchase_id     BIGSERIAL PRIMARY KEY,
+    purchase_id     BIGSERIAL,
     inventory_id    TEXT,
-    store_id        INTEGER,
-    brand           INTEGER,
-    description     TEXT,
-    size            TEXT,
-    vendor_number   INTEGER,
+    product_key     INTEGER NOT NULL,
+    store_key       INTEGER NOT NULL,
+    vendor_key      INTEGER NOT NULL,
+    date_key        INTEGER NOT NULL,
     po_number       INTEGER,
     receiving_date  DATE,
     purchase_price  NUMERIC(12,4),
     quantity        INTEGER,
     dollars         NUMERIC(12,2),
-    classification  INTEGER
-);
+    source_file     TEXT
+) PARTITION BY RANGE (receiving_date)
+$ddl$);
+
+CREATE TABLE IF NOT EXISTS olap_silver.fact_purchases_default PARTITION OF olap_silver.fact_purchases DEFAULT;
+
+CREATE TEMP TABLE purchases_file_months ON COMMIT DROP AS
+SELECT source_file, date_trunc('month', receiving_date)::DATE AS month
+FROM olap_bronze.purchases
+WHERE dollars IS NOT NULL AND quantity > 0
+GROUP BY 1, 2;
+
+SELECT olap_silver.create_month_partitions('fact_purchases', MIN(month), MAX(month))
+FROM purchases_file_months;
 
 INSERT INTO olap_silver.fact_purchases (
-    inventory_id, store_id, brand, description, size,
-    vendor_number, po_number, receiving_date,
-    purchase_price, quantity, dollars, classification
+    inventory_id, product_key, store_key, vendor_key, date_key,
+    po_number, receiving_date, purchase_price, quantity, dollars, source_file
 )
 SELECT
-    inventory_id,
-    store,
-    brand,
-    TRIM(description),
-    size,
-    vendor_number,
-    po_number,
-    receiving_date,
-    purchase_price,
-    quantity,
-    dollars,
-    classification
-FROM olap_bronze.purchases
-WHERE dollars IS NOT NULL AND quantity > 0;
+    pu.inventory_id,
+    COALESCE(p.product_key, -1),
+    COALESCE(st.store_key, -1),
+    COALESCE(v.vendor_key, -1),
+    COALESCE(d.date_key, -1),
+    pu.po_number,
+    pu.receiving_date,
+    pu.purchase_price,
+    pu.quantity,
+    pu.dollars,
+    pu.source_file
+FROM olap_bronze.purchases pu
+LEFT JOIN olap_silver.dim_product p
+    ON p.brand = pu.brand AND p.description = TRIM(pu.description) AND p.size = pu.size
+LEFT JOIN olap_silver.dim_store st ON st.store_id = pu.store
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = pu.vendor_number
+LEFT JOIN olap_silver.dim_date d ON d.full_date = pu.receiving_date
+WHERE pu.dollars IS NOT NULL AND pu.quantity > 0;
+
+DELETE FROM olap_silver.file_partitions WHERE fact_table = 'fact_purchases';
+INSERT INTO olap_silver.file_partitions
+SELECT DISTINCT 'fact_purchases', source_file, olap_silver.month_partition('fact_purchases', month)
+FROM purchases_file_months
+WHERE source_file IS NOT NULL;
+
+INSERT INTO olap_silver.load_watermark
+SELECT 'fact_purchases', COALESCE(MAX(loaded_at), '-infinity')
+FROM olap_bronze.ingest_manifest WHERE table_name = 'purchases'
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
 
 
+-- @unit fact_inventory
+-- @depends_on dim_product, dim_store
 -------------------- Fact: Inventory --------------------
-DROP TABLE IF EXISTS olap_silver.fact_inventory CASCADE;
+SELECT olap_silver.reset_table('fact_inventory', $ddl$
 CREATE TABLE olap_silver.fact_inventory (
     inventory_id    TEXT,
-    store_id        INTEGER,
-    city            TEXT,
-    brand           INTEGER,
-    description     TEXT,
-    size            TEXT,
+    product_key     INTEGER NOT NULL,
+    store_key       INTEGER NOT NULL,
     on_hand_beg     INTEGER,
     on_hand_end     INTEGER,
     price           NUMERIC(12,2),
     start_date      DATE,
-    end_date        DATE
-);
+    end_date        DATE,
+    source_file     TEXT
+)
+$ddl$);
 
 INSERT INTO olap_silver.fact_inventory
 SELECT
     b.inventory_id,
-    b.store,
-    TRIM(b.city),
-    b.brand,
-    TRIM(b.description),
-    b.size,
+    COALESCE(p.product_key, -1),
+    COALESCE(st.store_key, -1),
     b.on_hand AS on_hand_beg,
     COALESCE(e.on_hand, 0) AS on_hand_end,
     b.price,
     b.start_date,
-    e.end_date
+    e.end_date,
+    b.source_file
 FROM olap_bronze.beg_inventory b
 LEFT JOIN olap_bronze.end_inventory e
-    ON b.inventory_id = e.inventory_id;
\ No newline at end of file
+    ON b.inventory_id = e.inventory_id
+LEFT JOIN olap_silver.dim_product p
+    ON p.brand = b.brand AND p.description = TRIM(b.description) AND p.size = b.size
+LEFT JOIN olap_silver.dim_store st ON st.store_id = b.store;
+
+INSERT INTO olap_silver.load_watermark
+SELECT 'fact_inventory', COALESCE(MAX(loaded_at), '-infinity')
+FROM olap_bronze.ingest_manifest WHERE table_name IN ('beg_inventory', 'end_inventory')
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
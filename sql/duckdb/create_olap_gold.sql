@@ -0,0 +1,286 @@
+-- DuckDB dialect of sql/create_olap_gold.sql (--engine duckdb): the cube is a table rebuilt on
+-- every run, grains and reports are plain views (no materialized views to refresh)
+CREATE SCHEMA IF NOT EXISTS olap_gold;
+
+
+------------------- P&L Cube -------------------
+-- Every grain aggregated in a single pass over the facts (see sql/create_olap_gold.sql)
+CREATE OR REPLACE TABLE olap_gold.pnl_cube AS
+WITH movements AS (
+    SELECT
+        s.product_key,
+        s.store_key,
+        s.vendor_key,
+        date_trunc('month', s.sales_date)::DATE AS month,
+        TRUE AS is_sale,
+        s.sales_dollars AS revenue,
+        s.sales_quantity AS qty_sold,
+        s.excise_tax,
+        s.sales_price,
+        NULL::NUMERIC AS cogs,
+        NULL::INTEGER AS qty_purchased,
+        NULL::NUMERIC AS purchase_price
+    FROM olap_silver.fact_sales s
+    UNION ALL
+    SELECT
+        p.product_key,
+        p.store_key,
+        p.vendor_key,
+        date_trunc('month', p.receiving_date)::DATE,
+        FALSE,
+        NULL, NULL, NULL, NULL,
+        p.dollars,
+        p.quantity,
+        p.purchase_price
+    FROM olap_silver.fact_purchases p
+),
+cube AS (
+    SELECT
+        CASE
+            WHEN GROUPING(m.product_key) = 0 THEN 'product'
+            WHEN GROUPING(m.vendor_key) = 0 THEN 'vendor'
+            WHEN GROUPING(m.store_key) = 0 THEN 'store'
+            ELSE 'month'
+        END AS grain,
+        m.product_key,
+        d.brand,
+        m.vendor_key,
+        m.store_key,
+        m.month,
+        COALESCE(SUM(m.revenue), 0) AS total_revenue,
+        COALESCE(SUM(m.cogs), 0) AS total_cogs,
+        COALESCE(SUM(m.excise_tax), 0) AS total_excise_tax,
+        COALESCE(SUM(m.qty_sold), 0) AS total_qty_sold,
+        COALESCE(SUM(m.qty_purchased), 0) AS total_qty_purchased,
+        SUM(m.sales_price) AS sum_sales_price,
+        COUNT(m.sales_price) AS count_sales_price,
+        SUM(m.purchase_price) AS sum_purchase_price,
+        COUNT(m.purchase_price) AS count_purchase_price,
+        -- Representative vendor of a product: the highest purchasing vendor number, else the highest selling one
+        COALESCE(MAX(v.vendor_number) FILTER (WHERE NOT m.is_sale),
+                 MAX(v.vendor_number) FILTER (WHERE m.is_sale)) AS main_vendor_number,
+        COUNT(DISTINCT m.product_key) FILTER (WHERE m.is_sale) AS distinct_skus
+    FROM movements m
+    JOIN olap_silver.dim_product d
+        ON d.product_key = m.product_key
+    LEFT JOIN olap_silver.dim_vendor v
+        ON v.vendor_key = m.vendor_key
+    GROUP BY GROUPING SETS ((m.product_key, d.brand), (m.vendor_key), (m.store_key), (m.month))
+),
+-- The brand grain rolls up the products that were sold (purchases of unsold products are left out),
+-- counts its SKUs by description and takes the vendor with the highest name among its products
+brands AS (
+    SELECT
+        'brand' AS grain,
+        NULL::INTEGER AS product_key,
+        c.brand,
+        NULL::INTEGER AS vendor_key,
+        NULL::INTEGER AS store_key,
+        NULL::DATE AS month,
+        SUM(c.total_revenue),
+        SUM(c.total_cogs),
+        SUM(c.total_excise_tax),
+        SUM(c.total_qty_sold)::BIGINT,
+        SUM(c.total_qty_purchased)::BIGINT,
+        SUM(c.sum_sales_price),
+        SUM(c.count_sales_price),
+        SUM(c.sum_purchase_price),
+        SUM(c.count_purchase_price),
+        (ARRAY_AGG(c.main_vendor_number ORDER BY COALESCE(v.vendor_name, 'UNKNOWN') DESC))[1],
+        COUNT(DISTINCT d.description)
+    FROM cube c
+    JOIN olap_silver.dim_product d
+        ON d.product_key = c.product_key
+    LEFT JOIN olap_silver.dim_vendor v
+        ON v.vendor_number = c.main_vendor_number
+    WHERE c.grain = 'product'
+    AND c.total_qty_sold > 0
+    GROUP BY c.brand
+),
+grains AS (
+    SELECT * FROM cube
+    UNION ALL
+    SELECT * FROM brands
+)
+SELECT
+    grain,
+    CASE grain
+        WHEN 'product' THEN product_key
+        WHEN 'brand' THEN COALESCE(brand, -1)
+        WHEN 'vendor' THEN vendor_key
+        WHEN 'store' THEN store_key
+        ELSE COALESCE(strftime(month, '%Y%m')::INTEGER, -1)
+    END AS grain_key,
+    product_key,
+    brand,
+    vendor_key,
+    store_key,
+    month,
+    ROUND(total_revenue, 2) AS total_revenue,
+    ROUND(total_cogs, 2) AS total_cogs,
+    ROUND(total_excise_tax, 4) AS total_excise_tax,
+    ROUND(total_revenue - total_cogs - total_excise_tax, 2) AS gross_profit,
+    CASE
+        WHEN total_revenue > 0
+        THEN ROUND((total_revenue - total_cogs - total_excise_tax) / total_revenue * 100, 2)
+        ELSE 0
+    END AS gross_margin_pct,
+    total_qty_sold,
+    total_qty_purchased,
+    ROUND(sum_sales_price / NULLIF(count_sales_price, 0), 2) AS avg_sales_price,
+    ROUND(COALESCE(sum_purchase_price / NULLIF(count_purchase_price, 0), 0), 2) AS avg_purchase_price,
+    main_vendor_number,
+    distinct_skus::INTEGER AS distinct_skus
+FROM grains;
+
+
+------------------- Grain Views -------------------
+-- Each grain reads its slice of the cube and joins the dimension attributes of its rows only
+CREATE OR REPLACE VIEW olap_gold.product_pnl AS
+SELECT
+    c.product_key,
+    d.brand,
+    d.description,
+    d.size,
+    COALESCE(v.vendor_name, 'UNKNOWN') AS vendor_name,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.avg_sales_price,
+    c.avg_purchase_price
+FROM olap_gold.pnl_cube c
+JOIN olap_silver.dim_product d ON d.product_key = c.product_key
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = c.main_vendor_number
+WHERE c.grain = 'product'
+AND c.total_qty_sold > 0; -- Products that were sold
+
+CREATE OR REPLACE VIEW olap_gold.brand_pnl AS
+SELECT
+    c.brand,
+    COALESCE(v.vendor_name, 'UNKNOWN') AS vendor_name,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.distinct_skus
+FROM olap_gold.pnl_cube c
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = c.main_vendor_number
+WHERE c.grain = 'brand'
+AND c.total_qty_sold > 0;
+
+CREATE OR REPLACE VIEW olap_gold.vendor_pnl AS
+SELECT
+    v.vendor_number,
+    COALESCE(v.vendor_name, 'UNKNOWN') AS vendor_name,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.total_qty_purchased,
+    c.distinct_skus
+FROM olap_gold.pnl_cube c
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_key = c.vendor_key
+WHERE c.grain = 'vendor';
+
+CREATE OR REPLACE VIEW olap_gold.store_pnl AS
+SELECT
+    s.store_id,
+    s.city,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.total_qty_purchased,
+    c.distinct_skus
+FROM olap_gold.pnl_cube c
+LEFT JOIN olap_silver.dim_store s ON s.store_key = c.store_key
+WHERE c.grain = 'store';
+
+CREATE OR REPLACE VIEW olap_gold.monthly_pnl AS
+SELECT
+    c.month,
+    c.total_revenue,
+    c.total_cogs,
+    c.total_excise_tax,
+    c.gross_profit,
+    c.gross_margin_pct,
+    c.total_qty_sold,
+    c.total_qty_purchased,
+    c.distinct_skus
+FROM olap_gold.pnl_cube c
+WHERE c.grain = 'month';
+
+
+------------------- Reporting Views -------------------
+CREATE OR REPLACE VIEW olap_gold.vw_top_10_products_profit AS
+SELECT
+    brand, description, size, vendor_name, total_revenue, total_cogs,
+    gross_profit, gross_margin_pct, total_qty_sold
+FROM olap_gold.product_pnl
+WHERE gross_profit > 0
+AND total_qty_sold >= 100 -- Arbitrary (exclude low-volume products)
+AND product_key <> -1 -- Unknown product (unresolved fact rows)
+ORDER BY gross_profit DESC
+LIMIT 10;
+
+CREATE OR REPLACE VIEW olap_gold.vw_top_10_products_margin AS
+SELECT
+    brand, description, size, vendor_name, total_revenue, total_cogs,
+    gross_profit, gross_margin_pct, total_qty_sold
+FROM olap_gold.product_pnl
+WHERE gross_margin_pct > 0
+AND total_qty_sold >= 100 -- Arbitrary (exclude low-volume products)
+AND product_key <> -1 -- Unknown product (unresolved fact rows)
+ORDER BY gross_margin_pct DESC
+LIMIT 10;
+
+CREATE OR REPLACE VIEW olap_gold.vw_top_10_brands_profit AS
+SELECT
+    brand, vendor_name, total_revenue, total_cogs, gross_profit,
+    gross_margin_pct, total_qty_sold, distinct_skus
+FROM olap_gold.brand_pnl
+WHERE gross_profit > 0
+AND total_qty_sold >= 200 -- Arbitrary (exclude low-volume brands)
+AND brand IS NOT NULL -- Unknown brand (unresolved fact rows)
+ORDER BY gross_profit DESC
+LIMIT 10;
+
+CREATE OR REPLACE VIEW olap_gold.vw_top_10_brands_margin AS
+SELECT
+    brand, vendor_name, total_revenue, total_cogs, gross_profit,
+    gross_margin_pct, total_qty_sold, distinct_skus
+FROM olap_gold.brand_pnl
+WHERE gross_margin_pct > 0
+AND total_qty_sold >= 200 -- Arbitrary (exclude low-volume brands)
+AND brand IS NOT NULL -- Unknown brand (unresolved fact rows)
+ORDER BY gross_margin_pct DESC
+LIMIT 10;
+
+CREATE OR REPLACE VIEW olap_gold.vw_drop_candidates_products AS
+SELECT
+    brand, description, size, vendor_name, total_revenue, total_cogs,
+    gross_profit, gross_margin_pct, total_qty_sold
+FROM olap_gold.product_pnl
+WHERE gross_profit < 0
+AND total_qty_sold >= 100 -- Arbitrary (exclude low-volume products to avoid noise)
+AND product_key <> -1 -- Unknown product (unresolved fact rows)
+ORDER BY gross_profit ASC;
+
+CREATE OR REPLACE VIEW olap_gold.vw_drop_candidates_brands AS
+SELECT
+    brand, vendor_name, total_revenue, total_cogs, gross_profit,
+    gross_margin_pct, total_qty_sold, distinct_skus
+FROM olap_gold.brand_pnl
+WHERE gross_profit < 0
+AND total_qty_sold >= 200 -- Arbitrary (exclude low-volume brands to avoid noise)
+AND brand IS NOT NULL -- Unknown brand (unresolved fact rows)
+ORDER BY gross_profit ASC;
@@ -0,0 +1,176 @@
+-- DuckDB dialect of sql/create_olap_silver.sql (--engine duckdb): same tables, keys and rules,
+-- built in full on every run (no partitions, watermarks or incremental refresh)
+CREATE SCHEMA IF NOT EXISTS olap_silver;
+
+
+---------------- Dimension: Products ----------------
+-- product_key -1 is the unknown member; price-list products first, then inferred members
+CREATE OR REPLACE TABLE olap_silver.dim_product AS
+WITH price_list AS (
+    SELECT DISTINCT ON (brand, TRIM(description), size)
+        brand,
+        TRIM(description) AS description,
+        size,
+        volume::TEXT AS volume,
+        classification,
+        vendor_number,
+        TRIM(vendor_name) AS vendor_name
+    FROM olap_bronze.purchase_prices
+    ORDER BY brand, TRIM(description), size, vendor_number
+),
+inferred AS (
+    SELECT brand, description, size, MAX(volume) AS volume, MAX(classification) AS classification,
+           MAX(vendor_number) AS vendor_number, MAX(vendor_name) AS vendor_name
+    FROM (
+        SELECT brand, TRIM(description) AS description, size, volume::TEXT AS volume, classification,
+               vendor_no AS vendor_number, TRIM(vendor_name) AS vendor_name
+        FROM olap_bronze.sales
+        UNION ALL
+        SELECT brand, TRIM(description), size, NULL, classification, vendor_number, TRIM(vendor_name)
+        FROM olap_bronze.purchases
+        UNION ALL
+        SELECT brand, TRIM(description), size, NULL, NULL, NULL, NULL
+        FROM olap_bronze.beg_inventory
+    ) seen
+    WHERE NOT EXISTS (
+        SELECT 1 FROM price_list p
+        WHERE p.brand IS NOT DISTINCT FROM seen.brand
+        AND p.description IS NOT DISTINCT FROM seen.description
+        AND p.size IS NOT DISTINCT FROM seen.size
+    )
+    GROUP BY brand, description, size
+)
+SELECT -1 AS product_key, NULL::INTEGER AS brand, 'UNKNOWN' AS description, NULL::TEXT AS size,
+       NULL::TEXT AS volume, NULL::INTEGER AS classification, NULL::INTEGER AS vendor_number,
+       'UNKNOWN' AS vendor_name
+UNION ALL
+SELECT (ROW_NUMBER() OVER (ORDER BY source, brand, description, size))::INTEGER,
+       brand, description, size, volume, classification, vendor_number, vendor_name
+FROM (
+    SELECT 1 AS source, * FROM price_list
+    UNION ALL
+    SELECT 2, * FROM inferred
+) products;
+
+
+---------------- Dimension: Stores ----------------
+CREATE OR REPLACE TABLE olap_silver.dim_store AS
+SELECT -1 AS store_key, NULL::INTEGER AS store_id, 'UNKNOWN' AS city
+UNION ALL
+SELECT (ROW_NUMBER() OVER (ORDER BY store))::INTEGER, store, city
+FROM (
+    SELECT DISTINCT ON (store) store, TRIM(city) AS city
+    FROM olap_bronze.beg_inventory
+    WHERE store IS NOT NULL
+    ORDER BY store, TRIM(city)
+) stores;
+
+
+---------------- Dimension: Vendors ----------------
+CREATE OR REPLACE TABLE olap_silver.dim_vendor AS
+SELECT -1 AS vendor_key, NULL::INTEGER AS vendor_number, 'UNKNOWN' AS vendor_name
+UNION ALL
+SELECT (ROW_NUMBER() OVER (ORDER BY vendor_number))::INTEGER, vendor_number, vendor_name
+FROM (
+    SELECT DISTINCT ON (vendor_number) vendor_number, TRIM(vendor_name) AS vendor_name
+    FROM olap_bronze.purchases
+    WHERE vendor_number IS NOT NULL
+    ORDER BY vendor_number, TRIM(vendor_name)
+) vendors;
+
+
+----------------- Dimension: Date -----------------
+-- date_key is the YYYYMMDD integer of full_date (-1: unknown member for missing dates)
+CREATE OR REPLACE TABLE olap_silver.dim_date AS
+SELECT -1 AS date_key, NULL::DATE AS full_date, NULL::INTEGER AS year, NULL::INTEGER AS quarter,
+       NULL::INTEGER AS month, NULL::INTEGER AS week, NULL::INTEGER AS day_of_week
+UNION ALL
+SELECT
+    strftime(d, '%Y%m%d')::INTEGER,
+    d::DATE,
+    EXTRACT(YEAR  FROM d)::INTEGER,
+    EXTRACT(QUARTER FROM d)::INTEGER,
+    EXTRACT(MONTH FROM d)::INTEGER,
+    EXTRACT(WEEK  FROM d)::INTEGER,
+    EXTRACT(DOW   FROM d)::INTEGER
+FROM (
+    SELECT MIN(first_date) AS first_date, MAX(last_date) AS last_date
+    FROM (
+        SELECT MIN(sales_date) AS first_date, MAX(sales_date) AS last_date FROM olap_bronze.sales
+        UNION ALL
+        SELECT MIN(receiving_date), MAX(receiving_date) FROM olap_bronze.purchases
+    ) ranges
+) r,
+generate_series(
+    date_trunc('year', COALESCE(r.first_date, CURRENT_DATE)),
+    date_trunc('year', COALESCE(r.last_date, CURRENT_DATE)) + INTERVAL '1 year' - INTERVAL '1 day',
+    INTERVAL '1 day'
+) t(d);
+
+
+-------------------- Fact: Sales --------------------
+CREATE OR REPLACE TABLE olap_silver.fact_sales AS
+SELECT
+    (ROW_NUMBER() OVER ())::BIGINT AS sale_id,
+    s.inventory_id,
+    COALESCE(p.product_key, -1) AS product_key,
+    COALESCE(st.store_key, -1) AS store_key,
+    COALESCE(v.vendor_key, -1) AS vendor_key,
+    COALESCE(d.date_key, -1) AS date_key,
+    s.sales_date,
+    s.sales_quantity,
+    s.sales_dollars,
+    s.sales_price,
+    s.excise_tax,
+    s.source_file
+FROM olap_bronze.sales s
+LEFT JOIN olap_silver.dim_product p
+    ON p.brand = s.brand AND p.description = TRIM(s.description) AND p.size = s.size
+LEFT JOIN olap_silver.dim_store st ON st.store_id = s.store
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = s.vendor_no
+LEFT JOIN olap_silver.dim_date d ON d.full_date = s.sales_date
+WHERE s.sales_dollars IS NOT NULL AND s.sales_quantity > 0;
+
+
+-------------------- Fact: Purchases --------------------
+CREATE OR REPLACE TABLE olap_silver.fact_purchases AS
+SELECT
+    (ROW_NUMBER() OVER ())::BIGINT AS purchase_id,
+    pu.inventory_id,
+    COALESCE(p.product_key, -1) AS product_key,
+    COALESCE(st.store_key, -1) AS store_key,
+    COALESCE(v.vendor_key, -1) AS vendor_key,
+    COALESCE(d.date_key, -1) AS date_key,
+    pu.po_number,
+    pu.receiving_date,
+    pu.purchase_price,
+    pu.quantity,
+    pu.dollars,
+    pu.source_file
+FROM olap_bronze.purchases pu
+LEFT JOIN olap_silver.dim_product p
+    ON p.brand = pu.brand AND p.description = TRIM(pu.description) AND p.size = pu.size
+LEFT JOIN olap_silver.dim_store st ON st.store_id = pu.store
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = pu.vendor_number
+LEFT JOIN olap_silver.dim_date d ON d.full_date = pu.receiving_date
+WHERE pu.dollars IS NOT NULL AND pu.quantity > 0;
+
+
+-------------------- Fact: Inventory --------------------
+CREATE OR REPLACE TABLE olap_silver.fact_inventory AS
+SELECT
+    b.inventory_id,
+    COALESCE(p.product_key, -1) AS product_key,
+    COALESCE(st.store_key, -1) AS store_key,
+    b.on_hand AS on_hand_beg,
+    COALESCE(e.on_hand, 0) AS on_hand_end,
+    b.price,
+    b.start_date,
+    e.end_date,
+    b.source_file
+FROM olap_bronze.beg_inventory b
+LEFT JOIN olap_bronze.end_inventory e
+    ON b.inventory_id = e.inventory_id
+LEFT JOIN olap_silver.dim_product p
+    ON p.brand = b.brand AND p.description = TRIM(b.description) AND p.size = b.size
+LEFT JOIN olap_silver.dim_store st ON st.store_id = b.store;
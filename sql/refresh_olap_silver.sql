@@ -0,0 +1,298 @@
+-- Incremental silver refresh: merge only the bronze files loaded after each unit's watermark
+-- (requires a full build by create_olap_silver.sql)
+-- refreshed_at: when the unit last rewrote rows (the gold layer refreshes what depends on it)
+CREATE TABLE IF NOT EXISTS olap_silver.load_watermark (
+    unit_name       TEXT PRIMARY KEY,
+    loaded_at       TIMESTAMPTZ NOT NULL,
+    refreshed_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+ALTER TABLE olap_silver.load_watermark ADD COLUMN IF NOT EXISTS refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+
+-- @unit dim_product
+---------------- Upsert dim_product ----------------
+CREATE TEMP TABLE new_product_files ON COMMIT DROP AS
+SELECT m.file_path, m.table_name, m.loaded_at
+FROM olap_bronze.ingest_manifest m
+WHERE m.table_name IN ('purchase_prices', 'sales', 'purchases', 'beg_inventory')
+AND m.loaded_at > COALESCE((SELECT loaded_at FROM olap_silver.load_watermark WHERE unit_name = 'dim_product'), '-infinity');
+
+INSERT INTO olap_silver.dim_product (brand, description, size, volume, classification, vendor_number, vendor_name)
+SELECT DISTINCT ON (p.brand, TRIM(p.description), p.size)
+    p.brand,
+    TRIM(p.description),
+    p.size,
+    p.volume::TEXT,
+    p.classification,
+    p.vendor_number,
+    TRIM(p.vendor_name)
+FROM olap_bronze.purchase_prices p
+JOIN new_product_files f ON f.file_path = p.source_file AND f.table_name = 'purchase_prices'
+ORDER BY p.brand, TRIM(p.description), p.size, p.vendor_number
+ON CONFLICT ON CONSTRAINT dim_product_natural_key DO UPDATE SET
+    volume = EXCLUDED.volume,
+    classification = EXCLUDED.classification,
+    vendor_number = EXCLUDED.vendor_number,
+    vendor_name = EXCLUDED.vendor_name;
+
+-- Inferred members for the products of the new sales, purchase and inventory files
+INSERT INTO olap_silver.dim_product (brand, description, size, volume, classification, vendor_number, vendor_name)
+SELECT brand, description, size, MAX(volume), MAX(classification), MAX(vendor_number), MAX(vendor_name)
+FROM (
+    SELECT s.brand, TRIM(s.description) AS description, s.size, s.volume::TEXT AS volume, s.classification,
+           s.vendor_no AS vendor_number, TRIM(s.vendor_name) AS vendor_name
+    FROM olap_bronze.sales s
+    JOIN new_product_files f ON f.file_path = s.source_file AND f.table_name = 'sales'
+    UNION ALL
+    SELECT p.brand, TRIM(p.description), p.size, NULL, p.classification, p.vendor_number, TRIM(p.vendor_name)
+    FROM olap_bronze.purchases p
+    JOIN new_product_files f ON f.file_path = p.source_file AND f.table_name = 'purchases'
+    UNION ALL
+    SELECT b.brand, TRIM(b.description), b.size, NULL, NULL, NULL, NULL
+    FROM olap_bronze.beg_inventory b
+    JOIN new_product_files f ON f.file_path = b.source_file AND f.table_name = 'beg_inventory'
+) seen
+GROUP BY brand, description, size
+ON CONFLICT DO NOTHING;
+
+INSERT INTO olap_silver.load_watermark
+SELECT 'dim_product', MAX(loaded_at) FROM new_product_files HAVING COUNT(*) > 0
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
+
+
+-- @unit dim_store
+---------------- Upsert dim_store ----------------
+CREATE TEMP TABLE new_beg_inventory_files ON COMMIT DROP AS
+SELECT m.file_path, m.loaded_at
+FROM olap_bronze.ingest_manifest m
+WHERE m.table_name = 'beg_inventory'
+AND m.loaded_at > COALESCE((SELECT loaded_at FROM olap_silver.load_watermark WHERE unit_name = 'dim_store'), '-infinity');
+
+INSERT INTO olap_silver.dim_store (store_id, city)
+SELECT DISTINCT ON (b.store) b.store, TRIM(b.city)
+FROM olap_bronze.beg_inventory b
+JOIN new_beg_inventory_files f ON f.file_path = b.source_file
+WHERE b.store IS NOT NULL
+ORDER BY b.store, TRIM(b.city)
+ON CONFLICT ON CONSTRAINT dim_store_natural_key DO UPDATE SET
+    city = EXCLUDED.city;
+
+INSERT INTO olap_silver.load_watermark
+SELECT 'dim_store', MAX(loaded_at) FROM new_beg_inventory_files HAVING COUNT(*) > 0
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
+
+
+-- @unit dim_vendor
+---------------- Upsert dim_vendor ----------------
+CREATE TEMP TABLE new_vendor_files ON COMMIT DROP AS
+SELECT m.file_path, m.loaded_at
+FROM olap_bronze.ingest_manifest m
+WHERE m.table_name = 'purchases'
+AND m.loaded_at > COALESCE((SELECT loaded_at FROM olap_silver.load_watermark WHERE unit_name = 'dim_vendor'), '-infinity');
+
+INSERT INTO olap_silver.dim_vendor (vendor_number, vendor_name)
+SELECT DISTINCT ON (p.vendor_number) p.vendor_number, TRIM(p.vendor_name)
+FROM olap_bronze.purchases p
+JOIN new_vendor_files f ON f.file_path = p.source_file
+WHERE p.vendor_number IS NOT NULL
+ORDER BY p.vendor_number, TRIM(p.vendor_name)
+ON CONFLICT ON CONSTRAINT dim_vendor_natural_key DO UPDATE SET
+    vendor_name = EXCLUDED.vendor_name;
+
+INSERT INTO olap_silver.load_watermark
+SELECT 'dim_vendor', MAX(loaded_at) FROM new_vendor_files HAVING COUNT(*) > 0
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
+
+
+-- @unit dim_date
+---------------- Extend dim_date ----------------
+-- Adds the whole calendar years of the dates found in the new sales and purchase files
+CREATE TEMP TABLE new_dated_files ON COMMIT DROP AS
+SELECT m.file_path, m.table_name, m.loaded_at
+FROM olap_bronze.ingest_manifest m
+WHERE m.table_name IN ('sales', 'purchases')
+AND m.loaded_at > COALESCE((SELECT loaded_at FROM olap_silver.load_watermark WHERE unit_name = 'dim_date'), '-infinity');
+
+INSERT INTO olap_silver.dim_date
+SELECT
+    TO_CHAR(d, 'YYYYMMDD')::INTEGER,
+    d::DATE,
+    EXTRACT(YEAR  FROM d)::INTEGER,
+    EXTRACT(QUARTER FROM d)::INTEGER,
+    EXTRACT(MONTH FROM d)::INTEGER,
+    EXTRACT(WEEK  FROM d)::INTEGER,
+    EXTRACT(DOW   FROM d)::INTEGER
+FROM (
+    SELECT MIN(first_date) AS first_date, MAX(last_date) AS last_date
+    FROM (
+        SELECT MIN(s.sales_date) AS first_date, MAX(s.sales_date) AS last_date
+        FROM olap_bronze.sales s
+        JOIN new_dated_files f ON f.file_path = s.source_file AND f.table_name = 'sales'
+        UNION ALL
+        SELECT MIN(p.receiving_date), MAX(p.receiving_date)
+        FROM olap_bronze.purchases p
+        JOIN new_dated_files f ON f.file_path = p.source_file AND f.table_name = 'purchases'
+    ) ranges
+) r,
+generate_series(
+    date_trunc('year', r.first_date),
+    date_trunc('year', r.last_date) + INTERVAL '1 year' - INTERVAL '1 day',
+    '1 day'::INTERVAL
+) d
+ON CONFLICT DO NOTHING;
+
+INSERT INTO olap_silver.load_watermark
+SELECT 'dim_date', MAX(loaded_at) FROM new_dated_files HAVING COUNT(*) > 0
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
+
+
+-- @unit fact_sales
+-- @depends_on dim_product, dim_store, dim_vendor, dim_date
+---------------- Merge fact_sales ----------------
+CREATE TEMP TABLE new_sales_files ON COMMIT DROP AS
+SELECT m.file_path, m.loaded_at
+FROM olap_bronze.ingest_manifest m
+WHERE m.table_name = 'sales'
+AND m.loaded_at > COALESCE((SELECT loaded_at FROM olap_silver.load_watermark WHERE unit_name = 'fact_sales'), '-infinity');
+
+CREATE TEMP TABLE new_sales_months ON COMMIT DROP AS
+SELECT s.source_file, date_trunc('month', s.sales_date)::DATE AS month
+FROM olap_bronze.sales s
+JOIN new_sales_files f ON f.file_path = s.source_file
+WHERE s.sales_dollars IS NOT NULL AND s.sales_quantity > 0
+GROUP BY 1, 2;
+
+-- Months first seen in the new files get their partitions before the rows are routed to them
+SELECT olap_silver.create_month_partitions('fact_sales', MIN(month), MAX(month))
+FROM new_sales_months;
+
+-- A changed file replaces its previous rows (deleted from the partitions recorded for the file
+-- only), a new file is appended
+SELECT olap_silver.delete_file_rows('fact_sales', ARRAY(SELECT file_path FROM new_sales_files));
+
+INSERT INTO olap_silver.fact_sales (
+    inventory_id, product_key, store_key, vendor_key, date_key,
+    sales_date, sales_quantity, sales_dollars, sales_price, excise_tax, source_file
+)
+SELECT
+    s.inventory_id,
+    COALESCE(p.product_key, -1),
+    COALESCE(st.store_key, -1),
+    COALESCE(v.vendor_key, -1),
+    COALESCE(d.date_key, -1),
+    s.sales_date,
+    s.sales_quantity,
+    s.sales_dollars,
+    s.sales_price,
+    s.excise_tax,
+    s.source_file
+FROM olap_bronze.sales s
+JOIN new_sales_files f ON f.file_path = s.source_file
+LEFT JOIN olap_silver.dim_product p
+    ON p.brand = s.brand AND p.description = TRIM(s.description) AND p.size = s.size
+LEFT JOIN olap_silver.dim_store st ON st.store_id = s.store
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = s.vendor_no
+LEFT JOIN olap_silver.dim_date d ON d.full_date = s.sales_date
+WHERE s.sales_dollars IS NOT NULL AND s.sales_quantity > 0;
+
+INSERT INTO olap_silver.file_partitions
+SELECT DISTINCT 'fact_sales', source_file, olap_silver.month_partition('fact_sales', month)
+FROM new_sales_months
+ON CONFLICT DO NOTHING;
+
+INSERT INTO olap_silver.load_watermark
+SELECT 'fact_sales', MAX(loaded_at) FROM new_sales_files HAVING COUNT(*) > 0
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
+
+
+-- @unit fact_purchases
+-- @depends_on dim_product, dim_store, dim_vendor, dim_date
+---------------- Merge fact_purchases ----------------
+CREATE TEMP TABLE new_purchases_files ON COMMIT DROP AS
+SELECT m.file_path, m.loaded_at
+FROM olap_bronze.ingest_manifest m
+WHERE m.table_name = 'purchases'
+AND m.loaded_at > COALESCE((SELECT loaded_at FROM olap_silver.load_watermark WHERE unit_name = 'fact_purchases'), '-infinity');
+
+CREATE TEMP TABLE new_purchases_months ON COMMIT DROP AS
+SELECT p.source_file, date_trunc('month', p.receiving_date)::DATE AS month
+FROM olap_bronze.purchases p
+JOIN new_purchases_files f ON f.file_path = p.source_file
+WHERE p.dollars IS NOT NULL AND p.quantity > 0
+GROUP BY 1, 2;
+
+SELECT olap_silver.create_month_partitions('fact_purchases', MIN(month), MAX(month))
+FROM new_purchases_months;
+
+SELECT olap_silver.delete_file_rows('fact_purchases', ARRAY(SELECT file_path FROM new_purchases_files));
+
+INSERT INTO olap_silver.fact_purchases (
+    inventory_id, product_key, store_key, vendor_key, date_key,
+    po_number, receiving_date, purchase_price, quantity, dollars, source_file
+)
+SELECT
+    pu.inventory_id,
+    COALESCE(p.product_key, -1),
+    COALESCE(st.store_key, -1),
+    COALESCE(v.vendor_key, -1),
+    COALESCE(d.date_key, -1),
+    pu.po_number,
+    pu.receiving_date,
+    pu.purchase_price,
+    pu.quantity,
+    pu.dollars,
+    pu.source_file
+FROM olap_bronze.purchases pu
+JOIN new_purchases_files f ON f.file_path = pu.source_file
+LEFT JOIN olap_silver.dim_product p
+    ON p.brand = pu.brand AND p.description = TRIM(pu.description) AND p.size = pu.size
+LEFT JOIN olap_silver.dim_store st ON st.store_id = pu.store
+LEFT JOIN olap_silver.dim_vendor v ON v.vendor_number = pu.vendor_number
+LEFT JOIN olap_silver.dim_date d ON d.full_date = pu.receiving_date
+WHERE pu.dollars IS NOT NULL AND pu.quantity > 0;
+
+INSERT INTO olap_silver.file_partitions
+SELECT DISTINCT 'fact_purchases', source_file, olap_silver.month_partition('fact_purchases', month)
+FROM new_purchases_months
+ON CONFLICT DO NOTHING;
+
+INSERT INTO olap_silver.load_watermark
+SELECT 'fact_purchases', MAX(loaded_at) FROM new_purchases_files HAVING COUNT(*) > 0
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
+
+
+-- @unit fact_inventory
+-- @depends_on dim_product, dim_store
+---------------- Rebuild fact_inventory ----------------
+-- Inventory files are snapshots joined on inventory_id: any new file rebuilds the whole fact
+CREATE TEMP TABLE new_inventory_files ON COMMIT DROP AS
+SELECT m.file_path, m.loaded_at
+FROM olap_bronze.ingest_manifest m
+WHERE m.table_name IN ('beg_inventory', 'end_inventory')
+AND m.loaded_at > COALESCE((SELECT loaded_at FROM olap_silver.load_watermark WHERE unit_name = 'fact_inventory'), '-infinity');
+
+DELETE FROM olap_silver.fact_inventory
+WHERE EXISTS (SELECT 1 FROM new_inventory_files);
+
+INSERT INTO olap_silver.fact_inventory
+SELECT
+    b.inventory_id,
+    COALESCE(p.product_key, -1),
+    COALESCE(st.store_key, -1),
+    b.on_hand AS on_hand_beg,
+    COALESCE(e.on_hand, 0) AS on_hand_end,
+    b.price,
+    b.start_date,
+    e.end_date,
+    b.source_file
+FROM olap_bronze.beg_inventory b
+LEFT JOIN olap_bronze.end_inventory e
+    ON b.inventory_id = e.inventory_id
+LEFT JOIN olap_silver.dim_product p
+    ON p.brand = b.brand AND p.description = TRIM(b.description) AND p.size = b.size
+LEFT JOIN olap_silver.dim_store st ON st.store_id = b.store
+WHERE EXISTS (SELECT 1 FROM new_inventory_files);
+
+INSERT INTO olap_silver.load_watermark
+SELECT 'fact_inventory', MAX(loaded_at) FROM new_inventory_files HAVING COUNT(*) > 0
+ON CONFLICT (unit_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at, refreshed_at = now();
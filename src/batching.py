@@ -0,0 +1,72 @@
+"""
+Adaptive batch sizing under a memory budget
+"""
+
+import logging
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 1_000_000
+
+# Weight of the newest chunk in the bytes/row moving average
+SMOOTHING = 0.5
+
+
+class BatchSizer:
+    """
+    Batch size (rows) derived from the measured in-memory bytes per row
+    - memory_budget: bytes allowed for the batches alive at the same time
+    - in_flight: number of batches alive at the same time (the chunk being parsed,
+      the queued ones and the one being written, each with its serialized payload)
+    - observe() is called with every chunk and resizes the next ones
+    """
+
+    def __init__(self, memory_budget:int, initial:int=10000, in_flight:int=2):
+        if memory_budget <= 0:
+            raise ValueError("The memory budget must be a positive number of bytes")
+        self.memory_budget = memory_budget
+        self.in_flight = max(in_flight, 1)
+        self.size = min(max(initial, MIN_BATCH_SIZE), MAX_BATCH_SIZE)
+        self.bytes_per_row = None
+        self.peak_bytes = 0
+        self.sizes = [self.size]
+
+    def observe(self, chunk:pd.DataFrame) -> int:
+        """Measure a chunk and return the size chosen for the next ones"""
+        rows = len(chunk)
+        if not rows:
+            return self.size
+        nbytes = int(chunk.memory_usage(deep=True, index=False).sum())
+        self.peak_bytes = max(self.peak_bytes, nbytes)
+        measured = nbytes / rows
+        if self.bytes_per_row is None:
+            self.bytes_per_row = measured
+        else:
+            self.bytes_per_row += SMOOTHING * (measured - self.bytes_per_row)
+
+        target = int(self.memory_budget / (self.in_flight * max(self.bytes_per_row, 1.0)))
+        size = min(max(target, MIN_BATCH_SIZE), MAX_BATCH_SIZE)
+        if size != self.size:
+            self.size = size
+            self.sizes.append(size)
+        return self.size
+
+    @property
+    def peak_memory(self) -> int:
+        """Estimated peak bytes held by the in-flight batches"""
+        return self.peak_bytes * self.in_flight
+
+    def stats(self) -> dict:
+        """Return the chosen batch sizes, the bytes/row estimate and the peak memory"""
+        return {
+            "batch_sizes": list(self.sizes),
+            "bytes_per_row": round(self.bytes_per_row or 0.0, 1),
+            "peak_memory": self.peak_memory,
+            "memory_budget": self.memory_budget,
+        }
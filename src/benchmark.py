@@ -0,0 +1,266 @@
+"""
+Benchmark the pipeline steps on synthetic datasets and compare them to a stored baseline
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from typing import Optional
+
+from src.db import get_duckdb_connection, get_engine, get_psycopg2_connection
+from src.ingest import ingest_all, ingest_duckdb
+from src.transform import run_silver, run_gold, run_duckdb_layers
+from src.indexes import build_indexes
+from src.report import export_views_to_excel
+from src.metrics import RunMetrics
+from src.synthetic import generate_dataset
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+BENCHMARK_STEPS = ("ingest", "transform", "report")
+ENGINES = ("postgres", "duckdb")
+DEFAULT_TOLERANCE = 0.20    # Slowdown (fraction of the baseline time) reported as a regression
+MIN_SECONDS = 0.05          # Steps faster than this are never flagged (timer noise)
+_DATASET_MARKER = ".complete"
+
+# Modules a `main.py --step <step>` run imports (the CLI, then the step's own imports, see main.py)
+STARTUP_STEPS = {
+    "cli":          ("main",),
+    "ingest":       ("main", "src.ingest"),
+    "transform":    ("main", "src.transform", "src.indexes"),
+    "report":       ("main", "sqlalchemy", "src.report"),
+    "export":       ("main", "src.export", "pyarrow.dataset"),
+}
+# Third-party packages slow to import, reported per step (the CLI and transform need none of them)
+HEAVY_MODULES = ("pandas", "pyarrow", "sqlalchemy", "openpyxl", "tqdm", "numpy", "duckdb")
+_STARTUP_SCRIPT = (
+    "import sys, json, importlib\n"
+    "for module in sys.argv[1:]:\n"
+    "    importlib.import_module(module)\n"
+    "print(json.dumps([m for m in {heavy!r} if m in sys.modules]))\n"
+).format(heavy=list(HEAVY_MODULES))
+
+
+def ensure_dataset(work_dir:str, scale:float, seed:int=42) -> str:
+    """
+    Return the directory of the synthetic dataset of a scale factor, generating it once
+    (a marker file records a complete generation, so an interrupted one is redone)
+    """
+    data_dir = os.path.join(work_dir, f"sf{scale:g}_seed{seed}")
+    marker = os.path.join(data_dir, _DATASET_MARKER)
+    if not os.path.exists(marker):
+        rows = generate_dataset(data_dir, scale, seed)
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+    return data_dir
+
+
+def _run_postgres(data_dir:str, reports_dir:str, metrics:RunMetrics, loader:str) -> None:
+    """Run ingest, transform and report against PostgreSQL (full build), one metrics stage each"""
+    engine = get_engine()
+    conn = get_psycopg2_connection()
+    try:
+        with metrics.stage("ingest") as stage:
+            results = ingest_all(conn, data_dir, engine, loader=loader)
+            stage["rows"] = sum(result["rows"] for result in results.values())
+        with metrics.stage("transform") as stage:
+            stage["units"] = {**run_silver(conn), **run_gold(conn)}
+            build_indexes(conn, "olap_silver")
+            build_indexes(conn, "olap_gold")
+        with metrics.stage("report") as stage:
+            stats = export_views_to_excel(engine, reports_dir)
+            stage["rows"] = sum(view["rows"] for view in stats.values())
+    finally:
+        conn.close()
+        engine.dispose()
+
+
+def _run_duckdb(data_dir:str, reports_dir:str, metrics:RunMetrics) -> None:
+    """Run ingest, transform and report in an in-memory DuckDB database, one metrics stage each"""
+    con = get_duckdb_connection()
+    try:
+        with metrics.stage("ingest") as stage:
+            stage["rows"] = sum(table["rows"] for table in ingest_duckdb(con, data_dir).values())
+        with metrics.stage("transform") as stage:
+            stage["units"] = run_duckdb_layers(con)
+        with metrics.stage("report") as stage:
+            stats = export_views_to_excel(None, reports_dir, reader=lambda query: con.execute(query).df())
+            stage["rows"] = sum(view["rows"] for view in stats.values())
+    finally:
+        con.close()
+
+
+def run_benchmark(scales:list, work_dir:str="benchmarks", engine:str="postgres", repeats:int=1,
+                  seed:int=42, loader:str="copy") -> dict:
+    """
+    Time each pipeline step on the synthetic dataset of every scale factor
+    - Every repetition is a full build; the fastest wall time of each step is kept
+      (with the CPU time and peak memory of that repetition)
+    - Returns {"sf<scale>": {step: {"wall_seconds", "cpu_seconds", "peak_memory_bytes", "rows"}}}
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}' (expected one of {', '.join(ENGINES)})")
+
+    results = {}
+    for scale in scales:
+        data_dir = ensure_dataset(work_dir, scale, seed)
+        reports_dir = os.path.join(work_dir, "reports")
+        best = {}
+        for repeat in range(1, repeats + 1):
+            metrics = RunMetrics({"scale": scale, "engine": engine, "repeat": repeat})
+            if engine == "duckdb":
+                _run_duckdb(data_dir, reports_dir, metrics)
+            else:
+                _run_postgres(data_dir, reports_dir, metrics, loader)
+            for step in BENCHMARK_STEPS:
+                stage = metrics.stages[step]
+                if step not in best or stage["wall_seconds"] < best[step]["wall_seconds"]:
+                    best[step] = {key: stage.get(key) for key in
+                                  ("wall_seconds", "cpu_seconds", "peak_memory_bytes", "rows")}
+        results[f"sf{scale:g}"] = best
+        logger.info("Scale %g (%s): %s", scale, engine, ", ".join(
+            f"{step} {timing['wall_seconds']:.2f}s" for step, timing in best.items()))
+    return results
+
+
+def measure_startup(repeats:int=5, steps:Optional[list]=None) -> dict:
+    """
+    Time the start of each CLI step: a fresh interpreter importing the modules of STARTUP_STEPS
+    - The fastest of `repeats` runs is kept (interpreter start included, as a scheduler sees it)
+    - Returns {"startup": {step: {"wall_seconds", "heavy_modules"}}}, comparable to a baseline
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    for step in steps or STARTUP_STEPS:
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT, *STARTUP_STEPS[step]],
+                                       cwd=root, capture_output=True, text=True, check=False)
+            seconds = time.perf_counter() - start
+            if completed.returncode != 0:
+                raise RuntimeError(f"Startup of step '{step}' failed: {completed.stderr.strip()}")
+            if best is None or seconds < best["wall_seconds"]:
+                best = {"wall_seconds": round(seconds, 4),
+                        "heavy_modules": json.loads(completed.stdout.splitlines()[-1])}
+        results[step] = best
+        logger.info("Startup of %s: %.3fs (%s)", step, best["wall_seconds"],
+                    ", ".join(best["heavy_modules"]) or "no heavy imports")
+    return {"startup": results}
+
+
+def compare_to_baseline(results:dict, baseline:dict, tolerance:float=DEFAULT_TOLERANCE) -> list:
+    """
+    Compare the wall time of each (scale, step) to the baseline results
+    - status: 'regressed' when slower than the baseline by more than `tolerance`,
+      'improved' when faster by more than `tolerance`, 'ok' otherwise, 'new' without a baseline
+    - Steps under MIN_SECONDS in both runs are always 'ok'
+    - Returns one dict per (scale, step): scale, step, baseline, current, ratio, status
+    """
+    rows = []
+    for scale, steps in results.items():
+        for step, timing in steps.items():
+            current = timing["wall_seconds"]
+            before = baseline.get(scale, {}).get(step, {}).get("wall_seconds")
+            row = {"scale": scale, "step": step, "baseline": before, "current": current,
+                   "ratio": None, "status": "new"}
+            if before:
+                row["ratio"] = round(current / before, 3)
+                if max(current, before) < MIN_SECONDS:
+                    row["status"] = "ok"
+                elif current > before * (1 + tolerance):
+                    row["status"] = "regressed"
+                elif current < before * (1 - tolerance):
+                    row["status"] = "improved"
+                else:
+                    row["status"] = "ok"
+            rows.append(row)
+    return rows
+
+
+def _format_comparison(rows:list) -> str:
+    """Render the comparison as a fixed-width table"""
+    lines = [f"{'scale':<8} {'step':<10} {'baseline':>10} {'current':>10} {'ratio':>7}  status"]
+    for row in rows:
+        before = "-" if row["baseline"] is None else f"{row['baseline']:.2f}s"
+        ratio = "-" if row["ratio"] is None else f"{row['ratio']:.2f}"
+        lines.append(f"{row['scale']:<8} {row['step']:<10} {before:>10} {row['current']:>9.2f}s "
+                     f"{ratio:>7}  {row['status']}")
+    return "\n".join(lines)
+
+
+def _load_baseline(path:str) -> Optional[dict]:
+    """Read a baseline file (None when it does not exist yet)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> None:
+    """Command line: python -m src.benchmark --scales 1,10 --engine duckdb (or --startup)"""
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline steps on synthetic data")
+    parser.add_argument("--scales", type=lambda value: [float(s) for s in value.split(",") if s.strip()],
+                        default=[1.0], help="Comma-separated scale factors (1 by default)")
+    parser.add_argument("--engine", choices=ENGINES, default=os.getenv("ENGINE", "postgres"),
+                        help="PostgreSQL from the .env settings (e.g. docker-compose) or embedded DuckDB")
+    parser.add_argument("--startup", action="store_true",
+                        help="Time the start (imports) of each CLI step instead of the pipeline (no database)")
+    parser.add_argument("--repeats", type=int, default=None,
+                        help="Runs per scale or step, the fastest is kept (3 per scale, 10 per startup)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic datasets")
+    parser.add_argument("--loader", choices=["insert", "copy"], default="copy",
+                        help="Bronze loader of the PostgreSQL runs (copy by default)")
+    parser.add_argument("--work-dir", default="./benchmarks",
+                        help="Directory of the generated datasets, reports and results")
+    parser.add_argument("--baseline", default=None,
+                        help="Baseline results file (<work-dir>/baseline_<engine|startup>.json by default)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Slowdown reported as a regression, as a fraction of the baseline time")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store these results as the new baseline")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    kind = "startup" if args.startup else args.engine
+    baseline_path = args.baseline or os.path.join(args.work_dir, f"baseline_{kind}.json")
+    try:
+        if args.startup:
+            results = measure_startup(args.repeats or 10)
+        else:
+            results = run_benchmark(args.scales, args.work_dir, args.engine, args.repeats or 3,
+                                    args.seed, args.loader)
+    except (RuntimeError, ValueError) as e:
+        logger.error("Benchmark failed: %s", e, exc_info=True)
+        sys.exit(1)
+
+    document = {"engine": kind, "seed": args.seed,
+                "created_at": datetime.now(timezone.utc).isoformat(), "results": results}
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    os.makedirs(args.work_dir, exist_ok=True)
+    with open(os.path.join(args.work_dir, f"results_{kind}_{stamp}.json"), "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+
+    baseline = _load_baseline(baseline_path)
+    rows = compare_to_baseline(results, (baseline or {}).get("results", {}), args.tolerance)
+    print(_format_comparison(rows))
+    if args.update_baseline or baseline is None:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+        logger.info("Baseline written to '%s'", baseline_path)
+    elif any(row["status"] == "regressed" for row in rows):
+        logger.error("Performance regression against '%s' (tolerance %.0f%%)", baseline_path, args.tolerance * 100)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
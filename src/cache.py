@@ -0,0 +1,75 @@
+"""
+On-disk cache of the report views, keyed by the gold build version
+"""
+
+import os
+import re
+import shutil
+import logging
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+REPORT_CACHE_DIR = "./.report_cache"
+_VERSION_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ReportCache:
+    """
+    Parquet copy of each report view under '<cache_dir>/<gold version>/<view>.parquet'
+    - A new gold version (see record_gold_version) invalidates the cache: the first view stored
+      for it evicts the directories of every other version
+    - Files are written under a temporary name and renamed, so a reader never sees a partial file
+    - pandas is only imported when the cache is read (this module is imported by the CLI)
+    """
+
+    def __init__(self, cache_dir:str, version:str):
+        if not _VERSION_RE.match(version or ""):
+            raise ValueError(f"Invalid gold build version '{version}'")
+        self.cache_dir = cache_dir
+        self.version = version
+        self._evicted = False
+
+    def path(self, view:str) -> str:
+        """Return the cache file of a view"""
+        return os.path.join(self.cache_dir, self.version, f"{view}.parquet")
+
+    def load(self, views) -> Optional[dict]:
+        """Return {view: DataFrame} when every view is cached for this version, None otherwise"""
+        if not all(os.path.exists(self.path(view)) for view in views):
+            return None
+        import pandas as pd # pylint: disable=import-outside-toplevel
+        try:
+            return {view: pd.read_parquet(self.path(view)) for view in views}
+        except Exception as e: #pylint: disable=broad-exception-caught
+            logger.warning("Ignoring the unreadable report cache '%s': %s", self.cache_dir, e)
+            return None
+
+    def store(self, view:str, df) -> None:
+        """Cache a view (a failure is logged, the report itself does not depend on the cache)"""
+        path = self.path(view)
+        try:
+            self.evict()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.to_parquet(f"{path}.tmp", index=False)
+            os.replace(f"{path}.tmp", path)
+        except Exception as e: #pylint: disable=broad-exception-caught
+            logger.warning("Could not cache view %s in '%s': %s", view, self.cache_dir, e)
+
+    def evict(self) -> list:
+        """Remove the cached data of every other gold version (once per instance), return their versions"""
+        if self._evicted or not os.path.isdir(self.cache_dir):
+            return []
+        self._evicted = True
+        evicted = []
+        for entry in os.listdir(self.cache_dir):
+            if entry != self.version and _VERSION_RE.match(entry):
+                shutil.rmtree(os.path.join(self.cache_dir, entry), ignore_errors=True)
+                evicted.append(entry)
+        if evicted:
+            logger.info("Evicted %d outdated report cache version(s) from '%s'", len(evicted), self.cache_dir)
+        return evicted
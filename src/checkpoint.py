@@ -0,0 +1,141 @@
+"""
+Pipeline checkpoints ('olap_meta.checkpoint') used to resume failed runs
+"""
+
+import os
+import logging
+from typing import Callable, Optional
+import psycopg2
+
+from src.db import execute_sql_file
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+SQL_DIR = os.path.join(os.path.dirname(__file__), "..", "sql")
+
+CHECKPOINT_TABLE = "olap_meta.checkpoint"
+
+
+class CheckpointConflict(RuntimeError):
+    """Raised when a file checkpoint was advanced by someone else (the chunk is rolled back)"""
+
+
+class FileCheckpoint:
+    """
+    Committed-row offset of one CSV file
+    - advance() runs inside the transaction of each chunk, so a chunk and its offset
+      are committed (or rolled back) together and a resumed run never loads a row twice
+    - first_chunk(cur) runs through prepare() in the transaction of the first committed chunk
+      (e.g. deleting the rows the file replaces, so readers never see the file missing)
+    """
+
+    def __init__(self, name:str, content_hash:Optional[str], offset:int=0,
+                 first_chunk:Optional[Callable]=None):
+        self.name = name
+        self.content_hash = content_hash
+        self.offset = offset
+        self.first_chunk = first_chunk
+
+    def start(self, conn) -> None:
+        """Register the file at its current offset (not completed)"""
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    INSERT INTO {CHECKPOINT_TABLE}
+                        (scope, name, content_hash, rows_committed, completed, updated_at)
+                    VALUES ('file', %s, %s, %s, FALSE, now())
+                    ON CONFLICT (scope, name) DO UPDATE SET
+                        content_hash = EXCLUDED.content_hash,
+                        rows_committed = EXCLUDED.rows_committed,
+                        completed = FALSE,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    (self.name, self.content_hash, self.offset),
+                )
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            raise RuntimeError(f"Failed to checkpoint file '{self.name}': {e}") from e
+
+    def prepare(self, cur) -> None:
+        """Run first_chunk in the caller's transaction until a chunk is committed (before its rows are written)"""
+        if self.first_chunk is not None:
+            self.first_chunk(cur)
+
+    def advance(self, cur, rows:int) -> None:
+        """Move the offset past a chunk of rows, in the caller's (uncommitted) transaction"""
+        cur.execute(
+            f"UPDATE {CHECKPOINT_TABLE} SET rows_committed = rows_committed + %s, updated_at = now() "
+            f"WHERE scope = 'file' AND name = %s AND rows_committed = %s",
+            (rows, self.name, self.offset),
+        )
+        if cur.rowcount != 1:
+            raise CheckpointConflict(
+                f"Checkpoint of '{self.name}' is no longer at row {self.offset} (concurrent run?)"
+            )
+
+    def committed(self, rows:int) -> None:
+        """Record in memory that the transaction of the last chunk was committed"""
+        self.offset += rows
+        self.first_chunk = None
+
+
+def ensure_checkpoints(conn) -> None:
+    """Create the checkpoint table if it does not exist"""
+    execute_sql_file(conn, os.path.join(SQL_DIR, "create_olap_meta.sql"))
+
+
+def reset_checkpoints(conn, scopes:tuple=("step", "table", "file")) -> None:
+    """Forget the checkpoints of the given scopes (a new, non-resumed run)"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE scope = ANY(%s)", (list(scopes),))
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to reset checkpoints: {e}") from e
+
+
+def load_checkpoints(conn, scope:str) -> dict:
+    """Return {name: {"content_hash", "rows_committed", "completed"}} for a scope"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT name, content_hash, rows_committed, completed FROM {CHECKPOINT_TABLE} "
+                f"WHERE scope = %s",
+                (scope,),
+            )
+            rows = cur.fetchall()
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to read checkpoints: {e}") from e
+    return {name: {"content_hash": content_hash, "rows_committed": rows_committed, "completed": completed}
+            for name, content_hash, rows_committed, completed in rows}
+
+
+def mark_completed(conn, scope:str, name:str, rows:Optional[int]=None) -> None:
+    """Mark a step, table or file as completed"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO {CHECKPOINT_TABLE} (scope, name, rows_committed, completed, updated_at)
+                VALUES (%s, %s, COALESCE(%s, 0), TRUE, now())
+                ON CONFLICT (scope, name) DO UPDATE SET
+                    rows_committed = COALESCE(%s, checkpoint.rows_committed),
+                    completed = TRUE,
+                    updated_at = EXCLUDED.updated_at
+                """,
+                (scope, name, rows, rows),
+            )
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to checkpoint {scope} '{name}': {e}") from e
+    logger.info("Checkpoint: %s '%s' completed", scope, name)
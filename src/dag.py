@@ -0,0 +1,161 @@
+"""
+Statement-level DAG executor for the silver and gold SQL files
+"""
+
+import re
+import time
+import queue
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Optional, Tuple
+import psycopg2
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+_UNIT_RE = re.compile(r"^--\s*@unit\s+(\w+)\s*$")
+_DEPENDS_RE = re.compile(r"^--\s*@depends_on\s+(.+?)\s*$")
+
+
+def parse_units(filepath:str) -> Tuple[str, dict]:
+    """
+    Split an annotated SQL file into named units
+    - '-- @unit <name>' starts a unit, '-- @depends_on <name>[, <name>...]' declares its dependencies
+    - Returns the setup SQL found before the first unit (run once, before any unit is scheduled:
+      schema-level DDL only, session settings there would not reach the unit connections)
+      and {name: {"sql", "depends_on"}} in file order
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    setup, units, current = [], {}, None
+    for line in lines:
+        unit = _UNIT_RE.match(line)
+        depends = _DEPENDS_RE.match(line)
+        if unit:
+            name = unit.group(1)
+            if name in units:
+                raise ValueError(f"Duplicate SQL unit '{name}' in {filepath}")
+            current = units[name] = {"sql": [], "depends_on": []}
+        elif depends and current is not None:
+            current["depends_on"].extend(d for d in re.split(r"[,\s]+", depends.group(1)) if d)
+        elif current is None:
+            setup.append(line)
+        else:
+            current["sql"].append(line)
+
+    for name, unit in units.items():
+        unit["sql"] = "\n".join(unit["sql"]).strip()
+        unknown = [d for d in unit["depends_on"] if d not in units]
+        if unknown:
+            raise ValueError(f"SQL unit '{name}' depends on unknown unit(s): {', '.join(unknown)}")
+    _topological_order(units)
+    return "\n".join(setup).strip(), units
+
+
+def _topological_order(units:dict) -> list:
+    """Return the unit names in dependency order (ValueError on a cycle)"""
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle between SQL units: {' -> '.join(path + [name])}")
+        state[name] = "visiting"
+        for dep in units[name]["depends_on"]:
+            visit(dep, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in units:
+        visit(name, [])
+    return order
+
+
+def critical_path(units:dict, timings:dict) -> Tuple[list, float]:
+    """Return the chain of dependent units with the largest total time, and that time"""
+    best = {}
+    for name in _topological_order(units):
+        before = max((best[d] for d in units[name]["depends_on"]), key=lambda b: b[1], default=([], 0.0))
+        best[name] = (before[0] + [name], before[1] + timings.get(name, 0.0))
+    return max(best.values(), key=lambda b: b[1], default=([], 0.0))
+
+
+def _run_unit(name:str, statement:str, connections:queue.Queue) -> float:
+    """Execute one unit in its own transaction on a pooled connection and return its seconds"""
+    conn = connections.get()
+    try:
+        start = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(statement)
+        conn.commit()
+        return time.perf_counter() - start
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+    finally:
+        connections.put(conn)
+
+
+def _collect(done, running:dict, pending:dict, timings:dict) -> Optional[tuple]:
+    """Record the time of the finished units, release their dependents and return the first failure"""
+    failed = None
+    for future in done:
+        name = running.pop(future)
+        try:
+            timings[name] = future.result()
+        except Exception as e: #pylint: disable=broad-exception-caught
+            failed = failed or (name, e)
+            continue
+        logger.info("SQL unit '%s' completed in %.2fs", name, timings[name])
+        for deps in pending.values():
+            deps.discard(name)
+    return failed
+
+
+def run_units(units:dict, connect:Callable, workers:int) -> dict:
+    """
+    Run SQL units on a pool of `workers` connections, each unit as soon as its dependencies are done
+    - connect() opens a psycopg2 connection (closed when the run ends)
+    - A failing unit stops the scheduling of new units; the running ones are awaited
+    - Returns {name: seconds} and logs each unit time and the critical path
+    """
+    pending = {name: set(unit["depends_on"]) for name, unit in units.items()}
+    connections, opened = queue.Queue(), []
+    timings, running, failed = {}, {}, None
+    start = time.perf_counter()
+    try:
+        for _ in range(min(workers, len(units)) or 1):
+            conn = connect()
+            opened.append(conn)
+            connections.put(conn)
+
+        with ThreadPoolExecutor(max_workers=len(opened)) as pool:
+            while pending or running:
+                if failed is None:
+                    for name in [n for n, deps in pending.items() if not deps]:
+                        del pending[name]
+                        running[pool.submit(_run_unit, name, units[name]["sql"], connections)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                failure = _collect(done, running, pending, timings)
+                failed = failed or failure
+    finally:
+        for conn in opened:
+            conn.close()
+
+    if failed is not None:
+        name, error = failed
+        raise RuntimeError(f"SQL unit '{name}' failed: {error}") from error
+
+    elapsed = time.perf_counter() - start
+    path, path_seconds = critical_path(units, timings)
+    logger.info("Ran %d SQL units on %d connection(s) in %.2fs (%.2fs of unit time); "
+                "critical path %.2fs: %s", len(timings), len(opened), elapsed,
+                sum(timings.values()), path_seconds, " -> ".join(path))
+    return timings
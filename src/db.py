@@ -6,8 +6,6 @@ import os
 import logging
 from dotenv import load_dotenv
 import psycopg2
-from sqlalchemy import create_engine
-from sqlalchemy.exc import SQLAlchemyError
 
 
 logger = logging.getLogger(__name__)
@@ -17,8 +15,12 @@ load_dotenv()
 
 
 
-def get_engine():
-    """Create and return a SQLAlchemy engine using the environment-based connection string"""
+def get_engine(check:bool=False):
+    """
+    Create and return a SQLAlchemy engine using the environment-based connection string
+    - The engine connects on first use; check=True opens a test connection right away (fail fast)
+    - sqlalchemy is only imported here, steps that only use psycopg2 do not load it
+    """
     required_vars = [
         'POSTGRES_USER', 'POSTGRES_PASSWORD', 'POSTGRES_HOST', 'POSTGRES_PORT', 'POSTGRES_DB'
     ]
@@ -27,15 +29,18 @@ def get_engine():
     if missing_vars:
         raise ValueError(f"Missing environment variables: {', '.join(missing_vars)}")
 
+    from sqlalchemy import create_engine # pylint: disable=import-outside-toplevel
+    from sqlalchemy.exc import SQLAlchemyError # pylint: disable=import-outside-toplevel
+
     try:
         conn_string = (
             f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}"
             f"@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
         )
         engine = create_engine(conn_string)
-
-        with engine.connect() as _:
-            pass
+        if check:
+            with engine.connect() as _:
+                pass
         logger.info("SQLAlchemy engine created successfully")
         return engine
     except SQLAlchemyError as e:
@@ -87,3 +92,36 @@ def execute_sql_file(conn, filepath:str) -> None:
     except psycopg2.Error as e:
         conn.rollback()
         raise RuntimeError(f"Failed to execute SQL file {filepath}: {e}") from e
+
+
+def get_duckdb_connection(database:str=":memory:"):
+    """
+    Open an embedded DuckDB database (file path or ':memory:') for the duckdb engine
+    (duckdb is only imported here, the PostgreSQL engine does not need it)
+    """
+    try:
+        import duckdb # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise RuntimeError("The duckdb engine requires the 'duckdb' package (pip install duckdb)") from e
+
+    try:
+        con = duckdb.connect(database)
+        logger.info("DuckDB database '%s' opened successfully", database)
+        return con
+    except duckdb.Error as e:
+        raise RuntimeError(f"Failed to open DuckDB database '{database}': {e}") from e
+
+
+def execute_duckdb_sql_file(con, filepath:str) -> None:
+    """Execute a SQL file (several statements) against the given DuckDB connection"""
+    try:
+        with open(filepath, "r", encoding='utf-8') as f:
+            sql = f.read()
+    except Exception as e: #pylint: disable=broad-exception-caught
+        raise RuntimeError(f"Failed to read SQL file {filepath}: {e}") from e
+
+    try:
+        con.execute(sql)
+        logger.info("File successfully executed: '%s'", filepath)
+    except Exception as e: #pylint: disable=broad-exception-caught
+        raise RuntimeError(f"Failed to execute SQL file {filepath}: {e}") from e
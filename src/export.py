@@ -0,0 +1,227 @@
+"""
+Export silver and gold relations to Parquet datasets for downstream consumers
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Tuple
+import psycopg2
+from psycopg2 import sql
+
+if TYPE_CHECKING: # pragma: no cover
+    import pyarrow as pa
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+# Exportable relations: name -> schema
+EXPORTS = {
+    "dim_product":      "olap_silver",
+    "dim_store":        "olap_silver",
+    "dim_vendor":       "olap_silver",
+    "dim_date":         "olap_silver",
+    "fact_sales":       "olap_silver",
+    "fact_purchases":   "olap_silver",
+    "fact_inventory":   "olap_silver",
+    "pnl_cube":         "olap_gold",
+    "product_pnl":      "olap_gold",
+    "brand_pnl":        "olap_gold",
+    "vendor_pnl":       "olap_gold",
+    "store_pnl":        "olap_gold",
+    "monthly_pnl":      "olap_gold",
+}
+
+# Hive partitioning: name -> (partition column, SQL expression deriving it or None for an existing column)
+# - facts by month (one directory per month rather than per day), the cube by grain
+# - brand is not used: thousands of brands would give thousands of one-row files
+PARTITIONS = {
+    "fact_sales":       ("sales_month", "to_char(sales_date, 'YYYY-MM')"),
+    "fact_purchases":   ("receiving_month", "to_char(receiving_date, 'YYYY-MM')"),
+    "pnl_cube":         ("grain", None),
+}
+
+COMPRESSIONS = ("snappy", "zstd", "gzip", "lz4", "none")
+VERSION_FILE = "_gold_version.json"  # Gold build version of an export ('_' files are ignored by dataset readers)
+
+# PostgreSQL type OID -> Arrow type factory and arguments (anything else is exported as text)
+# - pyarrow is imported by the export functions only, so the CLI can read these settings without it
+_PG_TYPES = {
+    16: ("bool_",),
+    20: ("int64",),
+    21: ("int16",),
+    23: ("int32",),
+    700: ("float32",),
+    701: ("float64",),
+    1082: ("date32",),
+    1114: ("timestamp", "us"),
+    1184: ("timestamp", "us", "UTC"),
+}
+_PG_NUMERIC = 1700
+
+
+def _arrow_field(column) -> Tuple["pa.Field", Optional[Callable]]:
+    """
+    Return the Arrow field of a cursor column and the converter its Python values need (or None)
+    - NUMERIC(p, s) becomes decimal128(p, s); an unconstrained NUMERIC (aggregates) becomes float64
+    """
+    import pyarrow as pa # pylint: disable=import-outside-toplevel,redefined-outer-name
+    if column.type_code == _PG_NUMERIC:
+        if column.precision and column.precision <= 38:
+            return pa.field(column.name, pa.decimal128(column.precision, column.scale or 0)), None
+        return pa.field(column.name, pa.float64()), float
+    if column.type_code in _PG_TYPES:
+        factory, *args = _PG_TYPES[column.type_code]
+        return pa.field(column.name, getattr(pa, factory)(*args)), None
+    return pa.field(column.name, pa.string()), str
+
+
+def _to_record_batch(rows:list, schema:"pa.Schema", converters:list) -> "pa.RecordBatch":
+    """Build a RecordBatch from cursor rows, column by column"""
+    import pyarrow as pa # pylint: disable=import-outside-toplevel,redefined-outer-name
+    arrays = []
+    for i, (field, convert) in enumerate(zip(schema, converters)):
+        values = [row[i] for row in rows]
+        if convert is not None:
+            values = [None if v is None else convert(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_record_batches(conn, name:str, batch_size:int=50000) -> Tuple["pa.Schema", Iterator["pa.RecordBatch"]]:
+    """
+    Stream a relation as Arrow record batches from a server-side cursor
+    - The Arrow schema is derived from the PostgreSQL column types (known after the first fetch)
+    - The partition column of PARTITIONS is added to the rows when it is derived
+    - Returns the schema and an iterator over batches of at most `batch_size` rows
+    """
+    schema_name = EXPORTS[name]
+    partition, expression = PARTITIONS.get(name, (None, None))
+    select = sql.SQL("*")
+    if expression:
+        select = sql.SQL("*, {} AS {}").format(sql.SQL(expression), sql.Identifier(partition))
+
+    cur = conn.cursor(name=f"export_{name}")
+    cur.itersize = batch_size
+    cur.execute(sql.SQL("SELECT {} FROM {}.{}").format(select, sql.Identifier(schema_name), sql.Identifier(name)))
+    first = cur.fetchmany(batch_size)
+    fields, converters = zip(*(_arrow_field(column) for column in cur.description))
+    import pyarrow as pa # pylint: disable=import-outside-toplevel,redefined-outer-name
+    schema = pa.schema(fields)
+
+    def batches():
+        try:
+            rows = first
+            while rows:
+                yield _to_record_batch(rows, schema, converters)
+                rows = cur.fetchmany(batch_size)
+        finally:
+            cur.close()
+    return schema, batches()
+
+
+def _exported_version(target:str) -> Optional[dict]:
+    """Read the version file of an export (None when there is none or it is unreadable)"""
+    try:
+        with open(os.path.join(target, VERSION_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def export_relation(conn, name:str, export_dir:str, compression:str="snappy",
+                    row_group_size:int=100000, batch_size:int=50000, version:Optional[str]=None) -> dict:
+    """
+    Write one relation to '<export_dir>/<schema>/<name>/' as a (hive-partitioned) Parquet dataset
+    - Record batches are streamed to the writer, so the relation is never held in memory
+    - Row groups hold `row_group_size` rows (the last one of each file may be smaller)
+    - The previous export of the relation is replaced
+    - version: gold build version of the relation; the export is kept (not read again) when it
+      was written for the same version and options, and the version is recorded otherwise
+    - Returns {"rows", "files", "bytes", "seconds"} ("cached": True when the export was kept)
+    """
+    if name not in EXPORTS:
+        raise ValueError(f"Unknown export '{name}' (expected one of {', '.join(EXPORTS)})")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}' (expected one of {', '.join(COMPRESSIONS)})")
+
+    import pyarrow.dataset as ds # pylint: disable=import-outside-toplevel
+
+    start = time.perf_counter()
+    target = os.path.join(export_dir, EXPORTS[name], name)
+    key = {"version": version, "compression": compression, "row_group_size": row_group_size}
+    previous = _exported_version(target) if version else None
+    if previous is not None and previous.get("key") == key:
+        logger.info("Kept the export of %s.%s: unchanged since gold version %s", EXPORTS[name], name, version)
+        return {**previous["result"], "seconds": time.perf_counter() - start, "cached": True}
+
+    schema, batches = iter_record_batches(conn, name, batch_size)
+    partition = PARTITIONS.get(name, (None, None))[0]
+    written = {"rows": 0, "files": 0, "bytes": 0}
+
+    def visit(written_file):
+        written["files"] += 1
+        written["bytes"] += os.path.getsize(written_file.path)
+        written["rows"] += written_file.metadata.num_rows
+
+    shutil.rmtree(target, ignore_errors=True)
+    ds.write_dataset(
+        batches, target, schema=schema, format="parquet",
+        partitioning=[partition] if partition else None, partitioning_flavor="hive" if partition else None,
+        file_options=ds.ParquetFileFormat().make_write_options(
+            compression=None if compression == "none" else compression),
+        min_rows_per_group=row_group_size, max_rows_per_group=row_group_size,
+        basename_template="part-{i}.parquet", file_visitor=visit,
+    )
+    written["seconds"] = time.perf_counter() - start
+    if version:
+        with open(os.path.join(target, VERSION_FILE), "w", encoding="utf-8") as f:
+            json.dump({"key": key, "result": {k: written[k] for k in ("rows", "files", "bytes")}}, f)
+    logger.info("Exported %s.%s to '%s': %d rows, %d file(s), %.1f MiB in %.2fs", EXPORTS[name], name,
+                target, written["rows"], written["files"], written["bytes"] / 2**20, written["seconds"])
+    return written
+
+
+def _snapshot_gold_version(conn) -> Optional[str]:
+    """Return the gold build version seen by the current transaction (None when never recorded)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('olap_gold.build_version') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return None
+        cur.execute("SELECT version FROM olap_gold.build_version")
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def export_parquet(conn, export_dir:str="exports", names:Optional[list]=None,
+                   reuse:bool=False, **options) -> dict:
+    """
+    Export the chosen relations (all of EXPORTS by default) to Parquet
+    - All relations are read in one read-only REPEATABLE READ transaction (one consistent snapshot)
+    - reuse=True reads the gold build version in that snapshot; gold relations already exported
+      for it are not read again (silver relations are always exported)
+    - options: compression, row_group_size, batch_size (see export_relation)
+    - Returns {name: export_relation() result}
+    """
+    names = list(names or EXPORTS)
+    unknown = [n for n in names if n not in EXPORTS]
+    if unknown:
+        raise ValueError(f"Unknown export(s): {', '.join(unknown)} (expected some of {', '.join(EXPORTS)})")
+
+    results = {}
+    try:
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        gold_version = _snapshot_gold_version(conn) if reuse else None
+        for name in names:
+            version = gold_version if EXPORTS[name] == "olap_gold" else None
+            results[name] = export_relation(conn, name, export_dir, version=version, **options)
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Parquet export failed: {e}") from e
+    return results
@@ -0,0 +1,132 @@
+"""
+File-fingerprint manifest for incremental ingestion into 'olap_bronze'
+"""
+
+import os
+import hashlib
+import logging
+from typing import Optional, Tuple
+import psycopg2
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+MANIFEST_TABLE = "olap_bronze.ingest_manifest"
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def _hash_file(filepath:str) -> str:
+    """Return the SHA-256 of a file, read in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(filepath:str, content_hash:Optional[str]=None) -> dict:
+    """Return the manifest fingerprint (name, size, mtime, content hash) of a file"""
+    stat = os.stat(filepath)
+    return {
+        "file_path": os.path.basename(filepath),
+        "file_size": stat.st_size,
+        "file_mtime": stat.st_mtime,
+        "content_hash": content_hash or _hash_file(filepath),
+    }
+
+
+def classify_file(filepath:str, entry:Optional[dict]) -> Tuple[str, dict]:
+    """
+    Compare a file against its manifest entry
+    - 'unchanged': same size and mtime (the file is not hashed)
+    - 'touched': new mtime but same content hash (nothing to reload)
+    - 'changed' / 'new': the file has to be (re)loaded
+    - Returns the status and the fingerprint to record
+    """
+    stat = os.stat(filepath)
+    if entry and entry["file_size"] == stat.st_size and entry["file_mtime"] == stat.st_mtime:
+        return "unchanged", file_fingerprint(filepath, content_hash=entry["content_hash"])
+
+    fingerprint = file_fingerprint(filepath)
+    if entry is None:
+        return "new", fingerprint
+    if entry["content_hash"] == fingerprint["content_hash"]:
+        return "touched", fingerprint
+    return "changed", fingerprint
+
+
+def read_manifest(conn) -> dict:
+    """Return the manifest entries keyed by file path"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT file_path, table_name, file_size, file_mtime, content_hash, row_count "
+                f"FROM {MANIFEST_TABLE}"
+            )
+            columns = [c[0] for c in cur.description]
+            rows = cur.fetchall()
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to read ingest manifest: {e}") from e
+    return {row[0]: dict(zip(columns, row)) for row in rows}
+
+
+def record_file(conn, table:str, fingerprint:dict, row_count:int, commit:bool=True) -> None:
+    """
+    Insert or update the manifest entry of a loaded file
+    (commit=False leaves the transaction open, e.g. to commit it together with a table swap)
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO {MANIFEST_TABLE}
+                    (file_path, table_name, file_size, file_mtime, content_hash, row_count, loaded_at)
+                VALUES (%s, %s, %s, %s, %s, %s, now())
+                ON CONFLICT (file_path) DO UPDATE SET
+                    table_name = EXCLUDED.table_name,
+                    file_size = EXCLUDED.file_size,
+                    file_mtime = EXCLUDED.file_mtime,
+                    content_hash = EXCLUDED.content_hash,
+                    row_count = EXCLUDED.row_count,
+                    loaded_at = EXCLUDED.loaded_at
+                """,
+                (fingerprint["file_path"], table, fingerprint["file_size"],
+                 fingerprint["file_mtime"], fingerprint["content_hash"], row_count),
+            )
+        if commit:
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to record '{fingerprint['file_path']}' in ingest manifest: {e}") from e
+
+
+def clear_manifest(conn, commit:bool=True) -> None:
+    """Remove every manifest entry (before recording a full reload)"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DELETE FROM {MANIFEST_TABLE}")
+        if commit:
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to clear ingest manifest: {e}") from e
+
+
+def touch_file(conn, fingerprint:dict) -> None:
+    """Refresh the stored mtime of a file whose content did not change (loaded_at is kept)"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"UPDATE {MANIFEST_TABLE} SET file_mtime = %s WHERE file_path = %s",
+                (fingerprint["file_mtime"], fingerprint["file_path"]),
+            )
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to update '{fingerprint['file_path']}' in ingest manifest: {e}") from e
@@ -0,0 +1,137 @@
+"""
+Run metrics: wall/CPU time, rows, bytes and peak memory per pipeline stage, written as JSON
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+import psycopg2
+
+try:
+    import resource
+except ImportError: # pragma: no cover
+    resource = None
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+METRICS_VERSION = 1
+
+
+def cpu_seconds() -> float:
+    """User + system CPU seconds of this process and of its finished child processes (ingest workers)"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def peak_memory() -> Optional[int]:
+    """Peak resident memory in bytes of this process or its largest child so far (None when unknown)"""
+    if resource is None: # pragma: no cover
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak if sys.platform == "darwin" else peak * 1024 # kilobytes except on macOS
+
+
+def relation_stats(conn, schema:str) -> dict:
+    """
+    Return {relation: {"rows", "bytes"}} for the tables and materialized views of a schema
+    - rows are the planner estimates (exact right after ANALYZE), bytes include indexes and TOAST
+    - A partitioned table adds up its partitions
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT c.relname, SUM(GREATEST(p.reltuples, 0))::BIGINT, SUM(pg_total_relation_size(p.oid))::BIGINT "
+                "FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "CROSS JOIN LATERAL pg_partition_tree(c.oid) t JOIN pg_class p ON p.oid = t.relid "
+                "WHERE n.nspname = %s AND c.relkind IN ('r', 'p', 'm') AND NOT c.relispartition "
+                "GROUP BY c.relname ORDER BY c.relname",
+                (schema,),
+            )
+            stats = {name: {"rows": rows, "bytes": size} for name, rows, size in cur.fetchall()}
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to read relation sizes of '{schema}': {e}") from e
+    return stats
+
+
+class RunMetrics:
+    """
+    Collect the metrics of one pipeline run
+    - stage(name) measures a block and returns a dict the caller fills with rows, bytes and details
+    - write(path) dumps the run as JSON (one file per run, to compare nightly runs)
+    """
+
+    def __init__(self, options:Optional[dict]=None):
+        self.run_id = uuid.uuid4().hex
+        self.started_at = datetime.now(timezone.utc)
+        self.options = dict(options or {})
+        self.stages = {}
+        self._start = time.perf_counter()
+        self._cpu = cpu_seconds()
+
+    @contextmanager
+    def stage(self, name:str) -> Iterator[dict]:
+        """
+        Measure the wall and CPU time of a block and the peak memory reached at its end
+        - A stage that raises is recorded with status 'failed' and its error
+        """
+        stage = self.stages[name] = {"status": "running"}
+        start, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield stage
+            stage["status"] = "completed"
+        except BaseException as e:
+            stage.update(status="failed", error=str(e))
+            raise
+        finally:
+            stage["wall_seconds"] = round(time.perf_counter() - start, 3)
+            stage["cpu_seconds"] = round(cpu_seconds() - cpu, 3)
+            stage["peak_memory_bytes"] = peak_memory()
+            logger.info("Stage '%s' %s in %.2fs (%.2fs CPU)", name, stage["status"],
+                        stage["wall_seconds"], stage["cpu_seconds"])
+
+    def skip(self, name:str, reason:str) -> None:
+        """Record a stage that did not run"""
+        self.stages[name] = {"status": "skipped", "reason": reason}
+
+    def to_dict(self) -> dict:
+        """Return the run as a JSON-serializable dict"""
+        return {
+            "version": METRICS_VERSION,
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self._start, 3),
+            "cpu_seconds": round(cpu_seconds() - self._cpu, 3),
+            "peak_memory_bytes": peak_memory(),
+            "status": "failed" if any(s["status"] == "failed" for s in self.stages.values()) else "completed",
+            "python": sys.version.split()[0],
+            "options": self.options,
+            "stages": self.stages,
+        }
+
+    def write(self, path:str) -> str:
+        """
+        Write the run metrics as JSON
+        - A directory path gets one 'metrics_<UTC timestamp>_<run id>.json' file per run
+        - Returns the path of the written file
+        """
+        if os.path.isdir(path) or path.endswith(os.sep):
+            stamp = self.started_at.strftime("%Y%m%dT%H%M%SZ")
+            path = os.path.join(path, f"metrics_{stamp}_{self.run_id[:8]}.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        logger.info("Run metrics written to '%s'", path)
+        return path
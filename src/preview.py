@@ -0,0 +1,184 @@
+"""
+Approximate preview: silver and gold built from a sample of the bronze facts
+"""
+
+import os
+import re
+import json
+import time
+import logging
+from decimal import Decimal
+from typing import Optional
+import psycopg2
+from psycopg2 import sql
+
+from src.db import execute_sql_file
+from src.transform import GOLD_MATERIALIZED_VIEWS, SQL_DIR
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+PREVIEW_SCHEMA = "olap_preview"
+PREVIEW_REPORT_FILE = "liquor_distribution_reports_preview.xlsx"
+SAMPLE_METHODS = ("bernoulli", "system")
+
+# Bronze tables copied as a sample (rows are copied as they are: the gold cube scales its additive
+# measures by 100 / percent, see olap_gold.measure_scale)
+SAMPLED_TABLES = ("sales", "purchases", "beg_inventory")
+
+# Silver units reading the samples instead of the full bronze tables: the facts, the inferred
+# products and the date range. dim_store and dim_vendor read the full tables, so every store and
+# vendor of the sampled rows resolves as in a full build
+SAMPLED_UNITS = {
+    "dim_product":      ("sales", "purchases", "beg_inventory"),
+    "dim_date":         ("sales", "purchases"),
+    "fact_sales":       ("sales",),
+    "fact_purchases":   ("purchases",),
+}
+
+# Silver units the gold layer does not read, left out of the preview
+SKIPPED_UNITS = ("fact_inventory",)
+
+# The silver and gold objects share PREVIEW_SCHEMA (no name is used by both layers)
+_LAYER_SCHEMA_RE = re.compile(r"\bolap_(silver|gold)\b")
+_UNIT_RE = re.compile(r"^-- @unit (\w+)", re.MULTILINE)
+
+
+def preview_sql(filepath:str) -> str:
+    """
+    Return a silver or gold SQL file rewritten to build PREVIEW_SCHEMA
+    - olap_silver and olap_gold objects (and schema names in strings) move to PREVIEW_SCHEMA
+    - The SAMPLED_UNITS read their sampled bronze tables from PREVIEW_SCHEMA, everything else the
+      full bronze tables; the SKIPPED_UNITS are left out
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        text = f.read()
+    sections = []
+    for section in re.split(r"(?m)^(?=-- @unit )", text):
+        unit = _UNIT_RE.match(section)
+        name = unit.group(1) if unit else None
+        if name in SKIPPED_UNITS:
+            continue
+        if name in SAMPLED_UNITS:
+            section = re.sub(rf"\bolap_bronze\.({'|'.join(SAMPLED_UNITS[name])})\b", rf"{PREVIEW_SCHEMA}.\1", section)
+        sections.append(section)
+    return _LAYER_SCHEMA_RE.sub(PREVIEW_SCHEMA, "".join(sections))
+
+
+def sample_facts(conn, percent:float, method:str="bernoulli", seed:int=42) -> dict:
+    """
+    Copy a TABLESAMPLE of each of the SAMPLED_TABLES into an UNLOGGED table of PREVIEW_SCHEMA
+    - bernoulli picks each row with the probability `percent`, system each block of rows (faster,
+      but rows stored together are kept or skipped together)
+    - REPEATABLE (seed) returns the same sample while the bronze table is unchanged
+    - Rows are copied unchanged: scaling a measure here could overflow its NUMERIC(12,2) column,
+      the gold cube scales its sums instead (see run_preview)
+    - Returns {table: sampled rows}
+    """
+    if method not in SAMPLE_METHODS:
+        raise ValueError(f"Unknown sample method '{method}' (expected one of {', '.join(SAMPLE_METHODS)})")
+    if not 0 < percent <= 100:
+        raise ValueError(f"Sample percent must be in (0, 100], got {percent}")
+
+    rows = {}
+    with conn.cursor() as cur:
+        for table in SAMPLED_TABLES:
+            target = sql.Identifier(PREVIEW_SCHEMA, table)
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(target))
+            cur.execute(
+                sql.SQL("CREATE UNLOGGED TABLE {} AS SELECT * FROM {} TABLESAMPLE {} (%s) REPEATABLE (%s)").format(
+                    target, sql.Identifier("olap_bronze", table), sql.SQL(method.upper())),
+                (percent, seed),
+            )
+            rows[table] = cur.rowcount
+            logger.info("Sampled %d rows of olap_bronze.%s (%s %g%%, seed %d)", rows[table], table,
+                        method, percent, seed)
+    conn.commit()
+    return rows
+
+
+def run_preview(conn, percent:float, method:str="bernoulli", seed:int=42) -> dict:
+    """
+    Build the approximate silver and gold layers of PREVIEW_SCHEMA from a sample of the bronze facts
+    - Always a full build: the materialized views are dropped, the silver and gold SQL files run
+      as single scripts, then every materialized view is refreshed (olap_silver and olap_gold are
+      left untouched)
+    - The preview's measure_scale() returns 100 / percent, so the cube's totals estimate the full data
+    - Returns {"sampled_rows": {table: rows}, "units": {step: seconds}}
+    """
+    timings = {}
+    try:
+        execute_sql_file(conn, os.path.join(SQL_DIR, "create_olap_preview.sql"))
+        start = time.perf_counter()
+        sampled = sample_facts(conn, percent, method, seed)
+        timings["sample"] = time.perf_counter() - start
+
+        with conn.cursor() as cur:
+            # The silver SQL keeps the tables gold depends on: drop the previous views so that the gold
+            # SQL recreates them from its current definitions
+            for view in GOLD_MATERIALIZED_VIEWS:
+                cur.execute(sql.SQL("DROP MATERIALIZED VIEW IF EXISTS {} CASCADE").format(
+                    sql.Identifier(PREVIEW_SCHEMA, view)))
+            for unit in SKIPPED_UNITS: # Built by earlier previews
+                cur.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(sql.Identifier(PREVIEW_SCHEMA, unit)))
+            for layer in ("silver", "gold"):
+                start = time.perf_counter()
+                cur.execute(preview_sql(os.path.join(SQL_DIR, f"create_olap_{layer}.sql")))
+                conn.commit()
+                timings[layer] = time.perf_counter() - start
+            cur.execute(sql.SQL("CREATE OR REPLACE FUNCTION {}() RETURNS NUMERIC LANGUAGE sql STABLE "
+                                "AS $$ SELECT {}::NUMERIC $$").format(
+                sql.Identifier(PREVIEW_SCHEMA, "measure_scale"), sql.Literal(Decimal(100) / Decimal(str(percent)))))
+            for view in GOLD_MATERIALIZED_VIEWS:
+                start = time.perf_counter()
+                cur.execute(sql.SQL("REFRESH MATERIALIZED VIEW {}").format(sql.Identifier(PREVIEW_SCHEMA, view)))
+                conn.commit()
+                timings[f"refresh:{view}"] = time.perf_counter() - start
+            cur.execute(
+                "INSERT INTO olap_preview.sample_info (id, percent, method, seed, scale_factor, sampled_rows) "
+                "VALUES (TRUE, %s, %s, %s, 100 / %s::NUMERIC, %s) ON CONFLICT (id) DO UPDATE SET "
+                "percent = EXCLUDED.percent, method = EXCLUDED.method, seed = EXCLUDED.seed, "
+                "scale_factor = EXCLUDED.scale_factor, sampled_rows = EXCLUDED.sampled_rows, built_at = now()",
+                (percent, method, seed, percent, json.dumps(sampled)),
+            )
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Preview build failed: {e}") from e
+    logger.info("Preview layers built in '%s' from a %g%% sample in %.2fs", PREVIEW_SCHEMA, percent,
+                sum(timings.values()))
+    return {"sampled_rows": sampled, "units": timings}
+
+
+def sample_note(conn) -> Optional[list]:
+    """
+    Return the lines tagging a report read from PREVIEW_SCHEMA as approximate
+    (None when no preview was built yet)
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('olap_preview.sample_info') IS NOT NULL")
+            row = None
+            if cur.fetchone()[0]:
+                cur.execute("SELECT percent, method, seed, scale_factor, built_at FROM olap_preview.sample_info")
+                row = cur.fetchone()
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to read the preview sample: {e}") from e
+    if row is None:
+        return None
+    percent, method, seed, factor, built_at = row
+    return [
+        "APPROXIMATE PREVIEW: not computed from the full data",
+        f"Built on {built_at:%Y-%m-%d %H:%M} from a {method} sample of {float(percent):g}% of "
+        f"olap_bronze.{', olap_bronze.'.join(SAMPLED_TABLES[:-1])} and olap_bronze.{SAMPLED_TABLES[-1]} "
+        f"(seed {seed})",
+        f"Revenue, COGS, excise tax, gross profit and quantities are scaled by {float(factor):.4g}; "
+        "margins and average prices are sample estimates",
+        "Rankings and thresholds (e.g. minimum quantities) may differ from the full build, "
+        "and SKU counts are not scaled",
+    ]
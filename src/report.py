@@ -3,8 +3,18 @@ Generate Excel reports from the 'olap_gold' views
 """
 
 import os
+import time
+import queue
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from psycopg2 import sql
+
+from src.cache import ReportCache
 
 
 logger = logging.getLogger(__name__)
@@ -21,6 +31,13 @@ VIEW_MAPPING = {
     "vw_drop_candidates_brands":    "Drop Candidates (Brands)",
 }
 
+REPORT_FILE = "liquor_distribution_reports.xlsx"
+NOTE_SHEET = "Approximate"      # First sheet of a workbook written with a note (preview reports)
+WIDTH_SAMPLE_ROWS = 1000    # Rows of text columns measured for the column widths
+MAX_COLUMN_WIDTH = 60
+REPORT_PREFETCH_BATCHES = 4 # Batches fetched ahead of the workbook writer per view (concurrent mode)
+_EXTRACT_DONE = object()
+
 
 def _ensure_reports_dir(path: str) -> None:
     """Create the reports directory if it does not exist"""
@@ -28,28 +45,302 @@ def _ensure_reports_dir(path: str) -> None:
         os.makedirs(path, exist_ok=True)  # pragma: no cover
 
 
-def export_views_to_excel(engine, reports_dir:str ="reports",
-                          excel_name:str="liquor_distribution_reports.xlsx") -> None:
-    """Export each view to a sheet in an Excel workbook"""
-    _ensure_reports_dir(reports_dir)
-    out_path = os.path.join(reports_dir, excel_name)
+def column_widths(df:pd.DataFrame, sample_rows:int=WIDTH_SAMPLE_ROWS) -> list:
+    """
+    Return the display width of each column (header included, capped at MAX_COLUMN_WIDTH)
+    - Numeric columns are measured from their min/max only
+    - Other columns from the string length of their first `sample_rows` values
+    """
+    widths = []
+    for col in df.columns:
+        values = df[col].dropna()
+        if values.empty:
+            longest = 0
+        elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            longest = max(len(str(values.min())), len(str(values.max())))
+        else:
+            longest = int(values.head(sample_rows).astype(str).str.len().max())
+        widths.append(min(max(longest, len(str(col))) + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+
+def _set_column_widths(worksheet, widths:list) -> None:
+    """Apply column widths to a worksheet (any number of columns)"""
+    for i, width in enumerate(widths, start=1):
+        worksheet.column_dimensions[get_column_letter(i)].width = width
+
+
+def _iter_view(raw_conn, view:str, batch_size:int, stats:dict, schema:str="olap_gold") -> Iterator:
+    """
+    Read a view of `schema` through a server-side cursor
+    - Yields its column names first, then batches of at most `batch_size` rows
+    - Time spent fetching is added to stats["fetch_seconds"]
+    """
+    with raw_conn.cursor(name=f"report_{view}") as cur:
+        cur.itersize = batch_size
+        mark = time.perf_counter()
+        cur.execute(sql.SQL("SELECT * FROM {}.{}").format(sql.Identifier(schema), sql.Identifier(view)))
+        batch = cur.fetchmany(batch_size)
+        stats["fetch_seconds"] += time.perf_counter() - mark
+        yield [desc[0] for desc in cur.description]
+        while batch:
+            yield batch
+            mark = time.perf_counter()
+            batch = cur.fetchmany(batch_size)
+            stats["fetch_seconds"] += time.perf_counter() - mark
+
+
+def _append_view(worksheet, items:Iterator, stats:dict) -> None:
+    """
+    Append the column names and row batches of a view to a write-only worksheet
+    - Column widths are sampled from the first batch (they must be set before the first row)
+    """
+    columns = next(items)
+    batch = next(items, [])
+    mark = time.perf_counter()
+    sample = pd.DataFrame.from_records(batch[:WIDTH_SAMPLE_ROWS], columns=columns)
+    _set_column_widths(worksheet, column_widths(sample))
+    worksheet.append(columns)
+    while batch:
+        for row in batch:
+            worksheet.append(row)
+        stats["rows"] += len(batch)
+        stats["write_seconds"] += time.perf_counter() - mark
+        batch = next(items, None)
+        mark = time.perf_counter()
+
+
+def _to_frame(items:Iterator) -> pd.DataFrame:
+    """Collect the column names and row batches of a view into a DataFrame"""
+    columns = next(items)
+    return pd.DataFrame.from_records([row for batch in items for row in batch], columns=columns)
+
+
+def _iter_frame(df:pd.DataFrame, batch_size:int) -> Iterator:
+    """Yield the column names of a DataFrame, then its rows in batches of at most `batch_size`"""
+    yield list(df.columns)
+    rows = list(df.itertuples(index=False, name=None))
+    for i in range(0, len(rows), batch_size):
+        yield rows[i:i + batch_size]
+
+
+def _put(out:queue.Queue, item, stop:threading.Event) -> bool:
+    """Queue an item for the workbook writer unless it stopped (returns False in that case)"""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _extract_view(engine, view:str, snapshot:Optional[str], batch_size:int,
+                  out:queue.Queue, stop:threading.Event, stats:dict, schema:str="olap_gold") -> None:
+    """
+    Extraction worker: read a view on a pooled connection, in the exported snapshot,
+    and queue its column names and row batches (then _EXTRACT_DONE, or the error)
+    """
+    raw_conn = None
+    try:
+        raw_conn = engine.raw_connection()
+        with raw_conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            if snapshot:
+                cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+        for item in _iter_view(raw_conn, view, batch_size, stats, schema):
+            if not _put(out, item, stop):
+                return
+        _put(out, _EXTRACT_DONE, stop)
+    except Exception as e: #pylint: disable=broad-exception-caught
+        _put(out, e, stop)
+    finally:
+        if raw_conn is not None:
+            raw_conn.rollback()
+            raw_conn.close()
+
 
+def _drain(out:queue.Queue) -> Iterator:
+    """Yield the items queued by an extraction worker, re-raising its error"""
+    while True:
+        item = out.get()
+        if item is _EXTRACT_DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def _export_snapshot(raw_conn) -> Optional[str]:
+    """Open a REPEATABLE READ transaction and export its snapshot (None when it cannot be exported)"""
+    try:
+        with raw_conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cur.execute("SELECT pg_export_snapshot()")
+            return cur.fetchone()[0]
+    except Exception as e: #pylint: disable=broad-exception-caught
+        raw_conn.rollback()
+        logger.warning("Could not export a snapshot, views are read independently: %s", e)
+        return None
+
+
+def _write_workbook(out_path:str, read, stats:dict, streaming:bool,
+                    cache:Optional[ReportCache]=None, note:Optional[list]=None) -> None:
+    """
+    Write one sheet per view, in VIEW_MAPPING order
+    - note: lines written to a first NOTE_SHEET sheet (e.g. the sample of an approximate report)
+    - streaming=True: read(view) yields the column names then row batches, appended to a
+      write-only workbook
+    - streaming=False: read(view) returns a DataFrame, written through pandas (and stored in `cache`)
+    - A view that cannot be read gets an 'error' sheet (or trailing error rows once streaming started)
+    """
+    if streaming:
+        _write_streaming_workbook(out_path, read, stats, note)
+    else:
+        _write_pandas_workbook(out_path, read, stats, cache, note)
+
+
+def _write_streaming_workbook(out_path:str, read, stats:dict, note:Optional[list]) -> None:
+    """Append the row batches of every view to a write-only workbook (see _write_workbook)"""
+    workbook = Workbook(write_only=True)
+    if note:
+        worksheet = workbook.create_sheet(title=NOTE_SHEET)
+        _set_column_widths(worksheet, [MAX_COLUMN_WIDTH * 2])
+        for line in ["note", *note]:
+            worksheet.append([line])
+    for view, name in VIEW_MAPPING.items():
+        worksheet = workbook.create_sheet(title=name)
+        try:
+            _append_view(worksheet, read(view), stats[view])
+        except Exception as e: #pylint: disable=broad-exception-caught
+            logger.warning("Failed to read view %s: %s (skipping)", view, e, exc_info=True)
+            worksheet.append(["error"])
+            worksheet.append([str(e)])
+    workbook.save(out_path)
+
+
+def _write_pandas_workbook(out_path:str, read, stats:dict, cache:Optional[ReportCache],
+                           note:Optional[list]) -> None:
+    """Write the DataFrame of every view through pandas, storing it in `cache` (see _write_workbook)"""
     with pd.ExcelWriter(out_path, engine='openpyxl') as writer: # pylint: disable=abstract-class-instantiated
+        if note:
+            pd.DataFrame({"note": note}).to_excel(writer, sheet_name=NOTE_SHEET, index=False)
+            _set_column_widths(writer.sheets[NOTE_SHEET], [MAX_COLUMN_WIDTH * 2])
         for view, name in VIEW_MAPPING.items():
             try:
-                df = pd.read_sql(f"SELECT * FROM olap_gold.{view}", con=engine)
+                df = read(view)
             except Exception as e: #pylint: disable=broad-exception-caught
                 logger.warning("Failed to read view %s: %s (skipping)", view, e, exc_info=True)
                 pd.DataFrame({"error": [str(e)]}).to_excel(writer, sheet_name=name, index=False)
                 continue
+            if cache is not None:
+                cache.store(view, df)
+            mark = time.perf_counter()
             df.to_excel(writer, sheet_name=name, index=False)
+            _set_column_widths(writer.sheets[name], column_widths(df))
+            stats[view]["rows"] = len(df)
+            stats[view]["write_seconds"] += time.perf_counter() - mark
+
+
+def export_views_concurrently(engine, out_path:str, stats:dict, workers:int,
+                              batch_size:int=5000, streaming:bool=False,
+                              cache:Optional[ReportCache]=None, schema:str="olap_gold",
+                              note:Optional[list]=None) -> None:
+    """
+    Fetch every view at the same time while the workbook is being written
+    - Up to `workers` views are read concurrently, each on its own pooled connection
+      (the engine pool), all in one snapshot exported by a coordinating transaction
+    - Each view queues at most REPORT_PREFETCH_BATCHES batches ahead of the writer,
+      which takes the views in sheet order
+    """
+    coordinator = engine.raw_connection()
+    stop = threading.Event()
+    queues = {view: queue.Queue(maxsize=REPORT_PREFETCH_BATCHES) for view in VIEW_MAPPING}
+    try:
+        snapshot = _export_snapshot(coordinator)
+        with ThreadPoolExecutor(max_workers=min(workers, len(VIEW_MAPPING))) as pool:
+            for view, out in queues.items():
+                pool.submit(_extract_view, engine, view, snapshot, batch_size, out, stop, stats[view], schema)
+            try:
+                if streaming:
+                    _write_workbook(out_path, lambda view: _drain(queues[view]), stats, streaming=True, note=note)
+                else:
+                    _write_workbook(out_path, lambda view: _to_frame(_drain(queues[view])), stats,
+                                    streaming=False, cache=cache, note=note)
+            finally:
+                stop.set()
+    finally:
+        coordinator.rollback()
+        coordinator.close()
+
+
+def _write_streamed(engine, out_path:str, stats:dict, batch_size:int, schema:str,
+                   note:Optional[list]) -> None:
+    """Stream every view, one after the other, from server-side cursors on one connection"""
+    raw_conn = engine.raw_connection()
+
+    def read(view):
+        try:
+            yield from _iter_view(raw_conn, view, batch_size, stats[view], schema)
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+    try:
+        _write_workbook(out_path, read, stats, streaming=True, note=note)
+    finally:
+        raw_conn.close()
+
+
+def export_views_to_excel(engine, reports_dir:str ="reports",
+                          excel_name:str=REPORT_FILE,
+                          streaming:bool=False, batch_size:int=5000, workers:int=1,
+                          reader=None, cache:Optional[ReportCache]=None,
+                          schema:str="olap_gold", note:Optional[list]=None) -> dict:
+    """
+    Export each view to a sheet in an Excel workbook
+    - streaming=True streams rows in `batch_size` batches from server-side cursors into a
+      write-only workbook, so neither the view nor the sheet is ever held in memory
+    - workers > 1 fetches the views concurrently (see export_views_concurrently)
+    - reader(query) -> DataFrame replaces pd.read_sql on the engine (e.g. an embedded DuckDB
+      connection, engine is then unused); it implies the pandas mode
+    - cache: when it holds every view for the current gold version, the workbook is written from
+      it without querying the database; otherwise the views read in pandas mode are stored in it
+      (streaming mode never holds a whole view, so it only reads from the cache)
+    - schema: schema of the views (olap_gold, or the approximate preview schema)
+    - note: lines of a first 'Approximate' sheet describing how the data was built
+    - Returns {view: {"rows", "fetch_seconds", "write_seconds"}}
+    """
+    _ensure_reports_dir(reports_dir)
+    out_path = os.path.join(reports_dir, excel_name)
+    stats = {view: {"rows": 0, "fetch_seconds": 0.0, "write_seconds": 0.0} for view in VIEW_MAPPING}
 
-            worksheet = writer.sheets[name]
-            for i, col in enumerate(df.columns):
-                column_len = max(
-                    df[col].astype(str).map(len).max(),
-                    len(str(col))
-                ) + 2
-                worksheet.column_dimensions[chr(65 + i)].width = column_len
+    mark = time.perf_counter()
+    cached = cache.load(VIEW_MAPPING) if cache is not None else None
+    if cached is not None:
+        logger.info("Report views served from the cache (gold version %s)", cache.version)
+        for view_stats in stats.values():
+            view_stats["fetch_seconds"] = (time.perf_counter() - mark) / len(stats)
+        if streaming:
+            _write_workbook(out_path, lambda view: _iter_frame(cached[view], batch_size), stats,
+                            streaming=True, note=note)
+        else:
+            _write_workbook(out_path, cached.get, stats, streaming=False, note=note)
+    elif reader is None and workers > 1:
+        export_views_concurrently(engine, out_path, stats, workers, batch_size, streaming, cache, schema, note)
+    elif reader is None and streaming:
+        _write_streamed(engine, out_path, stats, batch_size, schema, note)
+    else:
+        fetch = reader or (lambda query: pd.read_sql(query, con=engine))
+        def read(view):
+            mark = time.perf_counter()
+            df = fetch(f"SELECT * FROM {schema}.{view}")
+            stats[view]["fetch_seconds"] += time.perf_counter() - mark
+            return df
+        _write_workbook(out_path, read, stats, streaming=False, cache=cache, note=note)
 
+    for view, view_stats in stats.items():
+        logger.info("View %s: %d rows, fetched in %.2fs, written in %.2fs", view,
+                    view_stats["rows"], view_stats["fetch_seconds"], view_stats["write_seconds"])
     logger.info("Excel file written to '%s'", out_path)
+    return stats
@@ -0,0 +1,151 @@
+"""
+Bronze column types derived from 'create_olap_bronze.sql', used for typed CSV parsing
+"""
+
+import os
+import re
+import logging
+from functools import lru_cache
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+SQL_DIR = os.path.join(os.path.dirname(__file__), "..", "sql")
+
+BRONZE_DDL = os.path.join(SQL_DIR, "create_olap_bronze.sql")
+
+# High-cardinality text columns are kept as plain strings, other TEXT columns are dictionary-encoded
+PLAIN_TEXT_COLUMNS = {"inventory_id", "source_file"}
+
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y"]
+
+_TABLE_RE = re.compile(r"CREATE TABLE (\w+)\.(\w+) \((.*?)\n\);", re.DOTALL)
+_COLUMN_RE = re.compile(r"^\s*(\w+)\s+(DOUBLE PRECISION|[A-Z]+)", re.MULTILINE)
+_FULL_COLUMN_RE = re.compile(r"^\s*(\w+)\s+(DOUBLE PRECISION|[A-Z]+(?:\(\d+,\s*\d+\))?)", re.MULTILINE)
+
+
+def parse_ddl(filepath:str=BRONZE_DDL, schema:str="olap_bronze", full_types:bool=False) -> dict:
+    """
+    Return {table: {column: base SQL type}} for every CREATE TABLE of the schema in a DDL file
+    (full_types=True keeps the precision and scale, e.g. 'NUMERIC(12,2)')
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        ddl = f.read()
+
+    column_re = _FULL_COLUMN_RE if full_types else _COLUMN_RE
+    tables = {}
+    for table_schema, table, body in _TABLE_RE.findall(ddl):
+        if table_schema == schema:
+            tables[table] = dict(column_re.findall(body))
+    return tables
+
+
+@lru_cache(maxsize=None)
+def bronze_schema() -> dict:
+    """Cached column types of the bronze tables"""
+    return parse_ddl()
+
+
+def column_types(table:str, columns:dict) -> dict:
+    """Map raw CSV header names to the SQL types of their bronze columns (columns: raw -> normalized)"""
+    types = bronze_schema().get(table, {})
+    return {raw: types[column] for raw, column in columns.items() if column in types}
+
+
+def parse_dates(values:pd.Series) -> pd.Series:
+    """Parse a column of date strings trying each of DATE_FORMATS (unparseable values become NaT)"""
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for date_format in DATE_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(values, format=date_format, errors="coerce"))
+    return parsed
+
+
+def pandas_read_options(types:dict, columns:dict) -> dict:
+    """
+    Return pd.read_csv keyword arguments for raw column types
+    (DATE columns are read as strings and listed under 'parse_dates' for parse_dates())
+    """
+    dtype, parse_dates = {}, []
+    for raw, sql_type in types.items():
+        if sql_type in ("INTEGER", "BIGINT"):
+            dtype[raw] = "Int64"
+        elif sql_type in ("NUMERIC", "DOUBLE PRECISION"):
+            dtype[raw] = "float64"
+        elif sql_type == "DATE":
+            dtype[raw] = "object"
+            parse_dates.append(raw)
+        elif columns[raw] in PLAIN_TEXT_COLUMNS:
+            dtype[raw] = "object"
+        else:
+            dtype[raw] = "category"
+    return {"dtype": dtype, "parse_dates": parse_dates}
+
+
+def arrow_convert_options(types:dict, columns:dict) -> pa_csv.ConvertOptions:
+    """
+    Return pyarrow CSV conversion options for raw column types
+    (columns without a bronze type are read as plain strings so every block parses alike)
+    """
+    arrow_types = {}
+    for raw in columns:
+        sql_type = types.get(raw, "TEXT")
+        if sql_type in ("INTEGER", "BIGINT"):
+            arrow_types[raw] = pa.int64()
+        elif sql_type in ("NUMERIC", "DOUBLE PRECISION"):
+            arrow_types[raw] = pa.float64()
+        elif sql_type == "DATE":
+            arrow_types[raw] = pa.timestamp("s")
+        elif raw not in types or columns[raw] in PLAIN_TEXT_COLUMNS:
+            arrow_types[raw] = pa.string()
+        else:
+            arrow_types[raw] = pa.dictionary(pa.int32(), pa.string())
+    return pa_csv.ConvertOptions(
+        column_types=arrow_types,
+        timestamp_parsers=[pa_csv.ISO8601] + DATE_FORMATS[1:],
+        strings_can_be_null=True,
+    )
+
+
+def _invalid_mask(values:pd.Series, sql_type:str) -> pd.Series:
+    """Return a mask of non-null raw values that cannot be parsed as sql_type"""
+    present = values.notna() & values.str.strip().ne("")
+    if sql_type in ("INTEGER", "BIGINT"):
+        parsed = pd.to_numeric(values, errors="coerce")
+        return present & (parsed.isna() | parsed.mod(1).ne(0))
+    if sql_type in ("NUMERIC", "DOUBLE PRECISION"):
+        return present & pd.to_numeric(values, errors="coerce").isna()
+    if sql_type == "DATE":
+        return present & parse_dates(values).isna()
+    return pd.Series(False, index=values.index)
+
+
+def find_type_mismatches(filepath:str, types:dict, chunksize:int=100000) -> dict:
+    """
+    Scan a CSV as raw strings and report, per typed column, the values that do not parse
+    - Returns {raw column: {"type", "count", "sample"}} for columns with at least one mismatch
+    """
+    mismatches = {}
+    with pd.read_csv(filepath, dtype=str, usecols=list(types), chunksize=chunksize) as reader:
+        for chunk in reader:
+            for raw, sql_type in types.items():
+                invalid = chunk[raw][_invalid_mask(chunk[raw], sql_type)]
+                if invalid.empty:
+                    continue
+                entry = mismatches.setdefault(raw, {"type": sql_type, "count": 0, "sample": invalid.iloc[0]})
+                entry["count"] += len(invalid)
+    return mismatches
+
+
+def format_mismatches(filename:str, mismatches:dict) -> str:
+    """Render a per-column type mismatch report as a single message"""
+    details = "; ".join(
+        f"column '{raw}' ({m['type']}): {m['count']} invalid value(s), e.g. '{m['sample']}'"
+        for raw, m in mismatches.items()
+    )
+    return f"Type mismatches in '{filename}': {details}"
@@ -0,0 +1,143 @@
+"""
+UNLOGGED staging tables swapped into 'olap_bronze' in a single transaction
+- The bulk load skips the WAL; finalize_staging makes the table LOGGED again (one sequential
+  rewrite) before its indexes are built, so the swapped-in live tables are crash-safe
+"""
+
+import logging
+import psycopg2
+from psycopg2 import sql
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+STAGING_SUFFIX = "__staging"
+OLD_SUFFIX = "__old"
+
+
+def staging_name(table:str) -> str:
+    """Return the name of the staging table of a live table"""
+    return f"{table}{STAGING_SUFFIX}"
+
+
+def cleanup_staging(conn, schema:str='olap_bronze') -> list:
+    """Drop staging and old tables left behind by previous (failed) runs"""
+    try:
+        with conn.cursor() as cur:
+            # right() rather than LIKE: '_' of the suffixes would be a LIKE wildcard
+            cur.execute(
+                "SELECT tablename FROM pg_tables WHERE schemaname = %s "
+                "AND (right(tablename, %s) = %s OR right(tablename, %s) = %s)",
+                (schema, len(STAGING_SUFFIX), STAGING_SUFFIX, len(OLD_SUFFIX), OLD_SUFFIX),
+            )
+            leftovers = [row[0] for row in cur.fetchall()]
+            for table in leftovers:
+                cur.execute(sql.SQL("DROP TABLE IF EXISTS {}.{} CASCADE").format(
+                    sql.Identifier(schema), sql.Identifier(table)))
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to clean up staging tables: {e}") from e
+    if leftovers:
+        logger.info("Dropped leftover staging tables: %s", ", ".join(leftovers))
+    return leftovers
+
+
+def create_staging_table(conn, table:str, schema:str='olap_bronze') -> str:
+    """
+    Create an empty UNLOGGED copy of a live table (columns and defaults only:
+    constraints and indexes are added by finalize_staging after the bulk load,
+    which also makes it LOGGED)
+    """
+    staging = staging_name(table)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS {schema}.{staging} CASCADE; "
+                                "CREATE UNLOGGED TABLE {schema}.{staging} "
+                                "(LIKE {schema}.{table} INCLUDING DEFAULTS)").format(
+                schema=sql.Identifier(schema), staging=sql.Identifier(staging),
+                table=sql.Identifier(table)))
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to create staging table for '{schema}.{table}': {e}") from e
+    return staging
+
+
+def _live_definitions(cur, table:str, schema:str) -> tuple:
+    """Return the (name, definition) pairs of the constraints and standalone indexes of a live table"""
+    cur.execute(
+        "SELECT c.conname, pg_get_constraintdef(c.oid) FROM pg_constraint c "
+        "WHERE c.conrelid = %s::regclass ORDER BY c.contype = 'f', c.conname",
+        (f"{schema}.{table}",),
+    )
+    constraints = cur.fetchall()
+    cur.execute(
+        "SELECT i.indexname, i.indexdef FROM pg_indexes i "
+        "WHERE i.schemaname = %s AND i.tablename = %s AND NOT EXISTS "
+        "(SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname "
+        "AND c.conrelid = %s::regclass)",
+        (schema, table, f"{schema}.{table}"),
+    )
+    return constraints, cur.fetchall()
+
+
+def finalize_staging(conn, table:str, schema:str='olap_bronze') -> None:
+    """
+    Make a loaded staging table LOGGED, add the live table's constraints and indexes, then ANALYZE it
+    (SET LOGGED comes first, so it rewrites the table without indexes to rebuild)
+    """
+    staging = staging_name(table)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("ALTER TABLE {}.{} SET LOGGED").format(
+                sql.Identifier(schema), sql.Identifier(staging)))
+            constraints, indexes = _live_definitions(cur, table, schema)
+            for name, definition in constraints:
+                cur.execute(sql.SQL("ALTER TABLE {}.{} ADD CONSTRAINT {} ").format(
+                    sql.Identifier(schema), sql.Identifier(staging),
+                    sql.Identifier(staging_name(name))) + sql.SQL(definition))
+            for name, definition in indexes:
+                live_target = f" ON {schema}.{table} "
+                cur.execute(definition
+                            .replace(f"INDEX {name} ", f"INDEX {staging_name(name)} ", 1)
+                            .replace(live_target, f" ON {schema}.{staging} ", 1))
+            cur.execute(sql.SQL("ANALYZE {}.{}").format(sql.Identifier(schema), sql.Identifier(staging)))
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to finalize staging table for '{schema}.{table}': {e}") from e
+    logger.info("Staging table '%s.%s' finalized (%d constraints, %d indexes)",
+                schema, staging, len(constraints), len(indexes))
+
+
+def swap_in(conn, tables:list, schema:str='olap_bronze') -> None:
+    """
+    Replace every live table by its staging table with renames in one transaction
+    (the replaced tables are dropped; nothing is committed if any rename fails)
+    """
+    try:
+        with conn.cursor() as cur:
+            for table in tables:
+                staging, old = staging_name(table), f"{table}{OLD_SUFFIX}"
+                constraints, indexes = _live_definitions(cur, table, schema)
+                cur.execute(sql.SQL("ALTER TABLE {schema}.{table} RENAME TO {old}; "
+                                    "ALTER TABLE {schema}.{staging} RENAME TO {table}; "
+                                    "DROP TABLE {schema}.{old} CASCADE").format(
+                    schema=sql.Identifier(schema), table=sql.Identifier(table),
+                    old=sql.Identifier(old), staging=sql.Identifier(staging)))
+                for name, _ in constraints:
+                    cur.execute(sql.SQL("ALTER TABLE {}.{} RENAME CONSTRAINT {} TO {}").format(
+                        sql.Identifier(schema), sql.Identifier(table),
+                        sql.Identifier(staging_name(name)), sql.Identifier(name)))
+                for name, _ in indexes:
+                    cur.execute(sql.SQL("ALTER INDEX {}.{} RENAME TO {}").format(
+                        sql.Identifier(schema), sql.Identifier(staging_name(name)), sql.Identifier(name)))
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to swap staging tables into '{schema}': {e}") from e
+    logger.info("Swapped %d staging table(s) into '%s': %s", len(tables), schema, ", ".join(tables))
@@ -0,0 +1,305 @@
+"""
+Deterministic synthetic input data: the six CSV files of the pipeline at a chosen scale factor
+"""
+
+import os
+import time
+import logging
+import argparse
+from typing import Iterator
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+# Scale factor 1: the dimension cardinalities of the 2016 dataset and about a tenth of its facts
+# - Facts grow linearly with the scale factor, dimensions keep their size from 1x up
+#   (they shrink proportionally below 1x, for tests)
+SCALE_1X = {
+    "brands":           11000,
+    "stores":           80,
+    "vendors":          130,
+    "sales":            100000,
+    "purchases":        225000,
+    "lines_per_po":     400,
+    "stock_ratio":      0.22,   # Share of the products stocked by a store (inventory rows)
+}
+
+FILES = {
+    "sales":            "SalesFINAL12312016.csv",
+    "beg_inventory":    "BegInvFINAL12312016.csv",
+    "end_inventory":    "EndInvFINAL12312016.csv",
+    "purchases":        "PurchasesFINAL12312016.csv",
+    "invoice_purchases": "InvoicePurchases12312016.csv",
+    "purchase_prices":  "2017PurchasePricesDec.csv",
+}
+
+CHUNK_ROWS = 250000         # Fact rows generated and written at a time (bounds memory at any scale)
+SALES_SKEW = 1.15           # Zipf exponent of product popularity (a few products sell most)
+_SIZES = np.array(["750mL", "1.75L", "1L", "375mL", "50mL", "750mL 2 Pk", "4/355mL"])
+_VOLUMES = np.array([750, 1750, 1000, 375, 50, 750, 355])
+_SIZE_WEIGHTS = np.array([0.45, 0.15, 0.12, 0.12, 0.08, 0.04, 0.04])
+_WORDS = ["OAK", "RIVER", "STONE", "GOLD", "SILVER", "CROWN", "BARREL", "PEAK", "VALLEY", "NORTH",
+          "SMOKE", "HONEY", "CEDAR", "RIDGE", "HARBOR", "FIELD", "MOON", "STAR", "ROYAL", "WILD"]
+_KINDS = ["Vodka", "Bourbon", "Gin", "Rum", "Tequila", "Chardonnay", "Cabernet", "Merlot", "Whiskey", "Brandy"]
+_APPROVERS = ["Frank Delahunt", "Mary Jones", "Tom Rudolph"]
+
+
+def scaled_sizes(scale:float) -> dict:
+    """Return the row counts and cardinalities of a scale factor (see SCALE_1X)"""
+    if scale <= 0:
+        raise ValueError(f"Scale factor must be positive, got {scale}")
+    dims = min(scale, 1.0)
+    return {
+        "brands":       max(20, round(SCALE_1X["brands"] * dims)),
+        "stores":       max(3, round(SCALE_1X["stores"] * dims)),
+        "vendors":      max(3, round(SCALE_1X["vendors"] * dims)),
+        "sales":        max(10, round(SCALE_1X["sales"] * scale)),
+        "purchases":    max(10, round(SCALE_1X["purchases"] * scale)),
+        "lines_per_po": SCALE_1X["lines_per_po"] if scale >= 1 else 4,
+        "stock_ratio":  SCALE_1X["stock_ratio"],
+    }
+
+
+def _names(rng:np.random.Generator, count:int, words:int) -> np.ndarray:
+    """Random upper-case names made of `words` words (deterministic for a generator state)"""
+    picks = rng.integers(0, len(_WORDS), size=(count, words))
+    return np.array([" ".join(_WORDS[i] for i in row) for row in picks])
+
+
+def _products(rng:np.random.Generator, sizes:dict) -> pd.DataFrame:
+    """
+    Price list: one row per product (a brand in one or two sizes)
+    - Each product is sold by one vendor; vendor shares are skewed (a few large distributors)
+    """
+    brands = np.arange(1, sizes["brands"] + 1) * 7 + 58
+    per_brand = np.where(rng.random(len(brands)) < 0.1, 2, 1)
+    brand = np.repeat(brands, per_brand)
+    count = len(brand)
+    size_index = rng.choice(len(_SIZES), size=count, p=_SIZE_WEIGHTS)
+    vendor_weights = 1 / np.arange(1, sizes["vendors"] + 1) ** 0.9
+    vendor = rng.choice(sizes["vendors"], size=count, p=vendor_weights / vendor_weights.sum())
+    kinds = rng.integers(0, len(_KINDS), size=count)
+    price = np.round(np.exp(rng.normal(2.8, 0.7, size=count)) + 0.99, 2)
+    return pd.DataFrame({
+        "Brand": brand,
+        "Description": [f"{name.title()} {_KINDS[k]}" for name, k in zip(_names(rng, count, 2), kinds)],
+        "Price": price,
+        "Size": _SIZES[size_index],
+        "Volume": _VOLUMES[size_index],
+        "Classification": np.where(kinds >= 5, 2, 1),
+        "PurchasePrice": np.round(price * rng.uniform(0.6, 0.8, size=count), 2),
+        "VendorNumber": 1000 + vendor * 37,
+        "vendor_index": vendor,
+    })
+
+
+def _stores(rng:np.random.Generator, sizes:dict) -> pd.DataFrame:
+    """Stores with their city and a skewed size (large stores sell and buy more)"""
+    count = sizes["stores"]
+    weights = rng.lognormal(0, 0.8, size=count)
+    return pd.DataFrame({"Store": np.arange(1, count + 1), "City": _names(rng, count, 1),
+                         "weight": weights / weights.sum()})
+
+
+def _inventory_id(stores:pd.DataFrame, products:pd.DataFrame, store_index, product_index) -> np.ndarray:
+    """The '<store>_<CITY>_<brand>' inventory id of the dataset"""
+    return (pd.Series(stores["Store"].to_numpy()[store_index]).astype(str) + "_"
+            + pd.Series(stores["City"].to_numpy()[store_index]) + "_"
+            + pd.Series(products["Brand"].to_numpy()[product_index]).astype(str)).to_numpy()
+
+
+def _chunks(total:int) -> Iterator[int]:
+    """Sizes of the chunks of a fact table"""
+    for start in range(0, total, CHUNK_ROWS):
+        yield min(CHUNK_ROWS, total - start)
+
+
+def _write(frames:Iterator[pd.DataFrame], path:str) -> int:
+    """Write a stream of frames as one CSV file (pyarrow CSV writer) and return its row count"""
+    rows, writer = 0, None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pa_csv.CSVWriter(path, table.schema, write_options=pa_csv.WriteOptions(quoting_style="needed"))
+            writer.write_table(table)
+            rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _sales(rng, sizes, products, vendors, stores, popularity) -> Iterator[pd.DataFrame]:
+    """Sales of January and February 2016 (dates as m/d/Y, like the source extract)"""
+    days = np.array([f"{d.month}/{d.day}/{d.year}" for d in pd.date_range("2016-01-01", "2016-02-29")])
+    for rows in _chunks(sizes["sales"]):
+        p = rng.choice(len(products), size=rows, p=popularity)
+        s = rng.choice(len(stores), size=rows, p=stores["weight"])
+        qty = rng.geometric(0.45, size=rows)
+        price = products["Price"].to_numpy()[p]
+        volume = products["Volume"].to_numpy()[p]
+        yield pd.DataFrame({
+            "InventoryId": _inventory_id(stores, products, s, p),
+            "Store": stores["Store"].to_numpy()[s],
+            "Brand": products["Brand"].to_numpy()[p],
+            "Description": products["Description"].to_numpy()[p],
+            "Size": products["Size"].to_numpy()[p],
+            "SalesQuantity": qty,
+            "SalesDollars": np.round(qty * price, 2),
+            "SalesPrice": price,
+            "SalesDate": days[rng.integers(0, len(days), size=rows)],
+            "Volume": volume,
+            "Classification": products["Classification"].to_numpy()[p],
+            "ExciseTax": np.round(qty * volume / 1000 * 1.05, 2),
+            "VendorNo": products["VendorNumber"].to_numpy()[p],
+            "VendorName": vendors[products["vendor_index"].to_numpy()[p]],
+        })
+
+
+def _purchases(rng, sizes, products, vendors, stores, popularity, invoices:dict) -> Iterator[pd.DataFrame]:
+    """
+    Purchase order lines of 2016 from the vendor of each product; a vendor's lines are spread
+    over its POs in date order, and the quantity and dollars of each PO are added up in `invoices`
+    """
+    per_vendor = max(1, sizes["purchases"] // sizes["lines_per_po"] // sizes["vendors"])
+    pos = sizes["vendors"] * per_vendor
+    po_date = pd.Timestamp("2015-12-20") + pd.to_timedelta(
+        np.sort(rng.integers(0, 365, size=(sizes["vendors"], per_vendor))).ravel(), unit="D")
+    receiving = po_date + pd.to_timedelta(rng.integers(3, 15, size=pos), unit="D")
+    invoice = receiving + pd.to_timedelta(rng.integers(1, 6, size=pos), unit="D")
+    pay = invoice + pd.to_timedelta(rng.integers(30, 46, size=pos), unit="D")
+    invoices.update(po_date=po_date, invoice=invoice, pay=pay,
+                    quantity=np.zeros(pos, dtype=np.int64), dollars=np.zeros(pos))
+
+    start = 0
+    for rows in _chunks(sizes["purchases"]):
+        p = rng.choice(len(products), size=rows, p=popularity)
+        s = rng.choice(len(stores), size=rows, p=stores["weight"])
+        vendor = products["vendor_index"].to_numpy()[p]
+        po = vendor * per_vendor + (np.arange(start, start + rows) * per_vendor) // sizes["purchases"]
+        start += rows
+        qty = rng.geometric(0.75, size=rows)
+        cost = products["PurchasePrice"].to_numpy()[p]
+        dollars = np.round(qty * cost, 2)
+        invoices["quantity"] += np.bincount(po, weights=qty, minlength=pos).astype(np.int64)
+        invoices["dollars"] += np.bincount(po, weights=dollars, minlength=pos)
+        yield pd.DataFrame({
+            "InventoryId": _inventory_id(stores, products, s, p),
+            "Store": stores["Store"].to_numpy()[s],
+            "Brand": products["Brand"].to_numpy()[p],
+            "Description": products["Description"].to_numpy()[p],
+            "Size": products["Size"].to_numpy()[p],
+            "VendorNumber": products["VendorNumber"].to_numpy()[p],
+            "VendorName": vendors[vendor],
+            "PONumber": 8000 + po,
+            "PODate": po_date[po].strftime("%Y-%m-%d"),
+            "ReceivingDate": receiving[po].strftime("%Y-%m-%d"),
+            "InvoiceDate": invoice[po].strftime("%Y-%m-%d"),
+            "PayDate": pay[po].strftime("%Y-%m-%d"),
+            "PurchasePrice": cost,
+            "Quantity": qty,
+            "Dollars": dollars,
+            "Classification": products["Classification"].to_numpy()[p],
+        })
+
+
+def _inventory(rng, sizes, products, stores, on_date:str, date_column:str) -> pd.DataFrame:
+    """Stock of every store: a random share of the products with their on-hand quantity"""
+    stocked = max(1, round(len(products) * sizes["stock_ratio"]))
+    s = np.repeat(np.arange(len(stores)), stocked)
+    p = np.concatenate([rng.choice(len(products), size=stocked, replace=False) for _ in range(len(stores))])
+    return pd.DataFrame({
+        "InventoryId": _inventory_id(stores, products, s, p),
+        "Store": stores["Store"].to_numpy()[s],
+        "City": stores["City"].to_numpy()[s],
+        "Brand": products["Brand"].to_numpy()[p],
+        "Description": products["Description"].to_numpy()[p],
+        "Size": products["Size"].to_numpy()[p],
+        "onHand": rng.poisson(18, size=len(s)),
+        "Price": products["Price"].to_numpy()[p],
+        date_column: on_date,
+    })
+
+
+def generate_dataset(out_dir:str, scale:float=1.0, seed:int=42) -> dict:
+    """
+    Write the six CSV files expected by ingest_all into out_dir
+    - The same scale and seed always give byte-identical files
+    - Sales and purchases follow a Zipf popularity over the products (SALES_SKEW) and a
+      skewed store size; vendor names keep the trailing spaces of the source extract
+    - Returns {table: rows written}
+    """
+    sizes = scaled_sizes(scale)
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    products = _products(rng, sizes)
+    vendors = np.array([f"{name} SPIRITS" if i % 3 else f"{name} WINE CO"
+                        for i, name in enumerate(_names(rng, sizes["vendors"], 2))])
+    vendors = np.char.add(vendors, np.where(rng.random(sizes["vendors"]) < 0.3, "  ", ""))
+    stores = _stores(rng, sizes)
+    popularity = 1 / (rng.permutation(len(products)) + 1) ** SALES_SKEW
+    popularity /= popularity.sum()
+    # Purchases follow the sales only in part: some products are overstocked (drop candidates)
+    overstock = 1 / (rng.permutation(len(products)) + 1) ** SALES_SKEW
+    buying = 0.6 * popularity + 0.4 * overstock / overstock.sum()
+
+    rows = {}
+    prices = products.drop(columns="vendor_index").assign(VendorName=vendors[products["vendor_index"]])
+    prices = prices[["Brand", "Description", "Price", "Size", "Volume", "Classification",
+                     "PurchasePrice", "VendorNumber", "VendorName"]]
+    rows["purchase_prices"] = _write(iter([prices]), os.path.join(out_dir, FILES["purchase_prices"]))
+    rows["sales"] = _write(_sales(rng, sizes, products, vendors, stores, popularity),
+                           os.path.join(out_dir, FILES["sales"]))
+
+    invoices = {}
+    rows["purchases"] = _write(_purchases(rng, sizes, products, vendors, stores, buying, invoices),
+                               os.path.join(out_dir, FILES["purchases"]))
+    po = np.flatnonzero(invoices["quantity"])  # POs that received lines
+    vendor = po // (len(invoices["quantity"]) // sizes["vendors"])
+    invoice_frame = pd.DataFrame({
+        "VendorNumber": 1000 + vendor * 37,
+        "VendorName": vendors[vendor],
+        "InvoiceDate": invoices["invoice"][po].strftime("%Y-%m-%d"),
+        "PONumber": 8000 + po,
+        "PODate": invoices["po_date"][po].strftime("%Y-%m-%d"),
+        "PayDate": invoices["pay"][po].strftime("%Y-%m-%d"),
+        "Quantity": invoices["quantity"][po],
+        "Dollars": np.round(invoices["dollars"][po], 2),
+        "Freight": np.round(invoices["dollars"][po] * 0.005, 2),
+        "Approval": np.where(rng.random(len(po)) < 0.9, "None", rng.choice(_APPROVERS, size=len(po))),
+    })
+    rows["invoice_purchases"] = _write(iter([invoice_frame]), os.path.join(out_dir, FILES["invoice_purchases"]))
+
+    beg = _inventory(rng, sizes, products, stores, "2016-01-01", "startDate")
+    rows["beg_inventory"] = _write(iter([beg]), os.path.join(out_dir, FILES["beg_inventory"]))
+    end = _inventory(rng, sizes, products, stores, "2016-12-31", "endDate")
+    rows["end_inventory"] = _write(iter([end]), os.path.join(out_dir, FILES["end_inventory"]))
+
+    logger.info("Synthetic dataset (scale %g, seed %d) written to '%s' in %.2fs: %s", scale, seed, out_dir,
+                time.perf_counter() - start, ", ".join(f"{table} {count}" for table, count in rows.items()))
+    return rows
+
+
+def main() -> None:
+    """Command line: python -m src.synthetic --scale 10 --out-dir data/synthetic_10x"""
+    parser = argparse.ArgumentParser(description="Generate the synthetic pipeline CSV files")
+    parser.add_argument("--scale", type=float, default=1.0, help="Scale factor (1 by default, see SCALE_1X)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same files)")
+    parser.add_argument("--out-dir", default="./data/synthetic", help="Directory of the generated CSV files")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    generate_dataset(args.out_dir, args.scale, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,15 @@ Run silver and gold SQL transformations
 """
 
 import os
+import time
+import hashlib
 import logging
+import psycopg2
+from psycopg2 import sql
+from typing import Optional
 
-from src.db import execute_sql_file
+from src.db import execute_duckdb_sql_file, execute_sql_file, get_psycopg2_connection
+from src.dag import parse_units, run_units
 
 
 logger = logging.getLogger(__name__)
@@ -14,21 +20,299 @@ logger = logging.getLogger(__name__)
 
 
 SQL_DIR = os.path.join(os.path.dirname(__file__), "..", "sql")
+DUCKDB_SQL_DIR = os.path.join(SQL_DIR, "duckdb")
 
+# Materialized gold views in refresh order, with the silver units (olap_silver.load_watermark) they read
+_CUBE_UPSTREAM = ("fact_sales", "fact_purchases", "dim_product")
+_REPORT_UPSTREAM = _CUBE_UPSTREAM + ("dim_vendor",)
+GOLD_MATERIALIZED_VIEWS = {
+    "pnl_cube":                     _CUBE_UPSTREAM,
+    "mv_top_10_products_profit":    _REPORT_UPSTREAM,
+    "mv_top_10_products_margin":    _REPORT_UPSTREAM,
+    "mv_top_10_brands_profit":      _REPORT_UPSTREAM,
+    "mv_top_10_brands_margin":      _REPORT_UPSTREAM,
+    "mv_drop_candidates_products":  _REPORT_UPSTREAM,
+    "mv_drop_candidates_brands":    _REPORT_UPSTREAM,
+}
 
-def run_silver(conn) -> None:
-    """Execute the Silver layer transformations for the star schema"""
+
+def run_sql_dag(conn, filepath:str, workers:int) -> dict:
+    """
+    Run an annotated SQL file as a DAG of units on a pool of `workers` connections
+    - The setup SQL (before the first unit) runs once on conn, in its own transaction,
+      before any unit starts
+    - Returns {unit: seconds}
+    """
+    setup, units = parse_units(filepath)
+    if setup:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(setup)
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+    return run_units(units, get_psycopg2_connection, workers)
+
+
+def _silver_ready(conn) -> bool:
+    """Check that a full silver build with per-file lineage, watermarks and partitioning exists"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT to_regclass('olap_silver.load_watermark') IS NOT NULL "
+                "AND to_regclass('olap_silver.file_partitions') IS NOT NULL "
+                "AND to_regproc('olap_silver.delete_file_rows') IS NOT NULL AND EXISTS ("
+                "SELECT 1 FROM information_schema.columns WHERE table_schema = 'olap_silver' "
+                "AND table_name = 'fact_sales' AND column_name = 'source_file')"
+            )
+            ready = cur.fetchone()[0]
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to inspect the silver layer: {e}") from e
+    return bool(ready)
+
+
+def _run_sql(conn, filepath:str, workers:int, per_unit:bool) -> dict:
+    """
+    Run a SQL file as a DAG of units (workers > 1 or per_unit) or as a single script
+    - Returns {unit: seconds}, or {file name: seconds} for a single script
+    """
+    if workers > 1 or per_unit:
+        return run_sql_dag(conn, filepath, workers)
+    start = time.perf_counter()
+    execute_sql_file(conn, filepath)
+    return {os.path.basename(filepath): time.perf_counter() - start}
+
+
+def run_silver(conn, workers:int=1, incremental:bool=False, per_unit:bool=False) -> dict:
+    """
+    Execute the Silver layer transformations for the star schema
+    - workers > 1 builds independent dimensions and facts concurrently
+    - incremental=True upserts dimensions and merges facts only for the bronze files
+      loaded since the last build (ingest manifest load time vs silver watermarks)
+    - per_unit=True runs the SQL unit by unit even with one worker, so each unit is timed
+    - Returns {unit: seconds}
+    """
+    filepath = os.path.join(SQL_DIR, "create_olap_silver.sql")
     try:
-        execute_sql_file(conn, os.path.join(SQL_DIR, "create_olap_silver.sql"))
+        if incremental and _silver_ready(conn):
+            filepath = os.path.join(SQL_DIR, "refresh_olap_silver.sql")
+        elif incremental:
+            logger.info("Silver layer missing or built without watermarks: running a full build")
+        timings = _run_sql(conn, filepath, workers, per_unit)
         logger.info("Silver layer transformations completed successfully")
     except Exception as e:
         raise RuntimeError(f"Silver layer transformation failed: {e}") from e
+    return timings
 
 
-def run_gold(conn) -> None:
-    """Execute the Gold layer transformations for profit and margin analytics"""
+def matview_hashes(filepath:str) -> dict:
+    """
+    Return {materialized view: definition hash} for the GOLD_MATERIALIZED_VIEWS of a gold SQL file
+    - md5 of the view's SQL unit and of the hashes of the units it depends on, so editing e.g.
+      pnl_cube also changes the hash of the reports built from it
+    """
+    _, units = parse_units(filepath)
+    digests = {}
+
+    def digest(name):
+        if name not in digests:
+            text = units[name]["sql"] + "".join(digest(dep) for dep in units[name]["depends_on"])
+            digests[name] = hashlib.md5(text.encode("utf-8")).hexdigest()
+        return digests[name]
+    return {view: digest(view) for view in GOLD_MATERIALIZED_VIEWS}
+
+
+def drop_redefined_views(conn, hashes:dict) -> list:
+    """
+    Drop the materialized gold views whose SQL unit changed since they were last refreshed
+    - CREATE MATERIALIZED VIEW IF NOT EXISTS keeps an existing view as it is: a view whose recorded
+      definition hash (olap_gold.refresh_state) differs or is unknown is dropped with its dependent
+      views (CASCADE), and the gold SQL then recreates them
+    - Returns the dropped views
+    """
+    dropped = []
     try:
-        execute_sql_file(conn, os.path.join(SQL_DIR, "create_olap_gold.sql"))
+        with conn.cursor() as cur:
+            cur.execute("SELECT matviewname FROM pg_matviews WHERE schemaname = 'olap_gold'")
+            existing = {row[0] for row in cur.fetchall()}
+            cur.execute("SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema = 'olap_gold' "
+                        "AND table_name = 'refresh_state' AND column_name = 'definition_hash')")
+            recorded = {}
+            if cur.fetchone()[0]:
+                cur.execute("SELECT view_name, definition_hash FROM olap_gold.refresh_state")
+                recorded = dict(cur.fetchall())
+            for view, digest in hashes.items():
+                if view in existing and recorded.get(view) != digest:
+                    cur.execute(sql.SQL("DROP MATERIALIZED VIEW IF EXISTS olap_gold.{} CASCADE").format(
+                        sql.Identifier(view)))
+                    dropped.append(view)
+        conn.commit()
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+    if dropped:
+        logger.info("Materialized view(s) redefined, dropped to be recreated: %s", ", ".join(dropped))
+    return dropped
+
+
+def refresh_gold_views(conn, hashes:Optional[dict]=None) -> dict:
+    """
+    Refresh the materialized gold views whose upstream silver data changed
+    - A view never populated (just created) gets a plain REFRESH: nobody can read it yet
+    - A populated view is refreshed CONCURRENTLY, so readers keep the previous rows meanwhile,
+      and only when a silver unit it reads was rewritten after its last refresh
+    - hashes: {view: definition hash} recorded with each refresh (see drop_redefined_views)
+    - Returns {view: seconds} for the refreshed views
+    """
+    hashes = hashes or {}
+    timings = {}
+    try:
+        with conn.cursor() as cur:
+            for view, upstream in GOLD_MATERIALIZED_VIEWS.items():
+                cur.execute(
+                    "SELECT m.ispopulated, r.upstream_at, (SELECT MAX(w.refreshed_at) FROM olap_silver.load_watermark w "
+                    "WHERE w.unit_name = ANY(%s)) FROM pg_matviews m LEFT JOIN olap_gold.refresh_state r "
+                    "ON r.view_name = m.matviewname WHERE m.schemaname = 'olap_gold' AND m.matviewname = %s",
+                    (list(upstream), view),
+                )
+                populated, refreshed_for, upstream_at = cur.fetchone()
+                if populated and None not in (refreshed_for, upstream_at) and upstream_at <= refreshed_for:
+                    logger.info("Materialized view '%s' is up to date", view)
+                    continue
+
+                start = time.perf_counter()
+                cur.execute(sql.SQL("REFRESH MATERIALIZED VIEW {}olap_gold.{}").format(
+                    sql.SQL("CONCURRENTLY " if populated else ""), sql.Identifier(view)))
+                cur.execute(
+                    "INSERT INTO olap_gold.refresh_state (view_name, upstream_at, definition_hash) VALUES (%s, %s, %s) "
+                    "ON CONFLICT (view_name) DO UPDATE SET upstream_at = EXCLUDED.upstream_at, refreshed_at = now(), "
+                    "definition_hash = COALESCE(EXCLUDED.definition_hash, refresh_state.definition_hash)",
+                    (view, upstream_at, hashes.get(view)),
+                )
+                conn.commit()
+                timings[view] = time.perf_counter() - start
+                logger.info("Materialized view '%s' refreshed%s in %.2fs",
+                            view, " concurrently" if populated else "", timings[view])
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+    return timings
+
+
+def explain_gold_views(conn) -> dict:
+    """
+    Capture EXPLAIN (ANALYZE, BUFFERS) of the query behind each materialized gold view
+    - The query is executed once more (in a transaction rolled back afterwards)
+    - Returns {view: {"execution_ms", "planning_ms", "shared_hit_blocks", "shared_read_blocks", "plan"}}
+    """
+    plans = {}
+    try:
+        with conn.cursor() as cur:
+            for view in GOLD_MATERIALIZED_VIEWS:
+                cur.execute("SELECT pg_get_viewdef(%s::regclass)", (f"olap_gold.{view}",))
+                query = cur.fetchone()[0].rstrip().rstrip(";")
+                cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+                explained = cur.fetchone()[0][0]
+                plan = explained["Plan"]
+                plans[view] = {
+                    "execution_ms": explained.get("Execution Time"),
+                    "planning_ms": explained.get("Planning Time"),
+                    "shared_hit_blocks": plan.get("Shared Hit Blocks"),
+                    "shared_read_blocks": plan.get("Shared Read Blocks"),
+                    "plan": plan,
+                }
+                logger.info("EXPLAIN ANALYZE '%s': %.1f ms, %s shared blocks hit, %s read", view,
+                            plans[view]["execution_ms"] or 0.0, plans[view]["shared_hit_blocks"],
+                            plans[view]["shared_read_blocks"])
+    finally:
+        conn.rollback()
+    return plans
+
+
+def record_gold_version(conn, filepath:str) -> str:
+    """
+    Record the version of the gold build in olap_gold.build_version and return it
+    - md5 of the gold SQL file and of the refresh time of every materialized view, so it only
+      changes when a view was refreshed or redefined (built_at keeps the time it last changed)
+    """
+    with open(filepath, "rb") as f:
+        sql_hash = hashlib.md5(f.read()).hexdigest()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO olap_gold.build_version (id, version) "
+                "SELECT TRUE, md5(%s || COALESCE(string_agg(view_name || '@' || refreshed_at::TEXT, ',' "
+                "ORDER BY view_name), '')) FROM olap_gold.refresh_state "
+                "ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, built_at = CASE "
+                "WHEN build_version.version = EXCLUDED.version THEN build_version.built_at ELSE now() END "
+                "RETURNING version",
+                (sql_hash,),
+            )
+            version = cur.fetchone()[0]
+        conn.commit()
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+    logger.info("Gold build version: %s", version)
+    return version
+
+
+def gold_version(conn) -> Optional[str]:
+    """Return the recorded gold build version (None when gold was never built with one)"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('olap_gold.build_version') IS NOT NULL")
+            version = None
+            if cur.fetchone()[0]:
+                cur.execute("SELECT version FROM olap_gold.build_version")
+                row = cur.fetchone()
+                version = row[0] if row else None
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(f"Failed to read the gold build version: {e}") from e
+    return version
+
+
+def run_gold(conn, workers:int=1, per_unit:bool=False) -> dict:
+    """
+    Execute the Gold layer transformations for profit and margin analytics
+    - Drops the materialized views whose definition changed (see drop_redefined_views), creates
+      the missing ones (empty) and the views, then refreshes the stale ones
+    - workers > 1 creates them concurrently, following their dependencies
+    - per_unit=True runs the SQL unit by unit even with one worker, so each unit is timed
+    - Records the gold build version afterwards (see record_gold_version)
+    - Returns {unit: seconds} with the refreshes as 'refresh:<view>'
+    """
+    filepath = os.path.join(SQL_DIR, "create_olap_gold.sql")
+    try:
+        hashes = matview_hashes(filepath)
+        drop_redefined_views(conn, hashes)
+        timings = _run_sql(conn, filepath, workers, per_unit)
+        timings.update({f"refresh:{view}": secs for view, secs in refresh_gold_views(conn, hashes).items()})
+        record_gold_version(conn, filepath)
         logger.info("Gold layer transformations completed successfully")
     except Exception as e:
         raise RuntimeError(f"Gold layer transformation failed: {e}") from e
+    return timings
+
+
+def run_duckdb_layers(con) -> dict:
+    """
+    Build the Silver and Gold layers in an embedded DuckDB database (--engine duckdb)
+    - Runs the DuckDB dialect files of sql/duckdb/, always as a full rebuild
+    - Returns {layer: seconds}
+    """
+    timings = {}
+    for layer in ("silver", "gold"):
+        start = time.perf_counter()
+        try:
+            execute_duckdb_sql_file(con, os.path.join(DUCKDB_SQL_DIR, f"create_olap_{layer}.sql"))
+        except RuntimeError as e:
+            raise RuntimeError(f"{layer.capitalize()} layer transformation failed (DuckDB): {e}") from e
+        timings[layer] = time.perf_counter() - start
+        logger.info("%s layer built in DuckDB in %.2fs", layer.capitalize(), timings[layer])
+    return timings
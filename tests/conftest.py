@@ -0,0 +1,141 @@
+"""
+Shared test fixtures
+- make_conn: mocked psycopg2 connections
+- pg_conn: a real PostgreSQL connection for the tests marked 'db'
+- silver_db: that connection with a small bronze dataset and a full silver build
+"""
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+import pytest
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+
+
+@pytest.fixture
+def make_conn():
+    """
+    Return a factory of mocked psycopg2 connections, returning (conn, cursor)
+    - rows: what cursor.fetchall() returns (fetchall: a side effect instead, e.g. a callable)
+    - description / rowcount: attributes of the cursor
+    - error: raised by cursor.execute()
+    """
+    def factory(rows=None, fetchall=None, description=None, rowcount=1, error=None):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        if fetchall is not None:
+            cursor.fetchall.side_effect = fetchall
+        else:
+            cursor.fetchall.return_value = rows or []
+        cursor.description = description or []
+        cursor.rowcount = rowcount
+        if error is not None:
+            cursor.execute.side_effect = error
+        return conn, cursor
+    return factory
+
+
+def _connect():
+    """Open a connection to the POSTGRES_* database (pytest.skip when the DB tests are not enabled)"""
+    if os.getenv("PIPELINE_DB_TESTS") != "1":
+        pytest.skip("DB-backed test: set PIPELINE_DB_TESTS=1 with POSTGRES_* pointing at a disposable database")
+    try:
+        return psycopg2.connect(
+            host=os.getenv("POSTGRES_HOST", "localhost"),
+            port=os.getenv("POSTGRES_PORT", "5432"),
+            dbname=os.getenv("POSTGRES_DB"),
+            user=os.getenv("POSTGRES_USER"),
+            password=os.getenv("POSTGRES_PASSWORD"),
+            connect_timeout=5,
+        )
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not reachable: {e}")
+    return None # pragma: no cover
+
+
+@pytest.fixture
+def pg_conn():
+    """
+    psycopg2 connection to the test database (the test is skipped unless PIPELINE_DB_TESTS=1)
+    - The DB-backed tests create and drop the olap_* schemas: never point them at real data
+    """
+    conn = _connect()
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture
+def pg_connect():
+    """Factory of extra test database connections (e.g. a concurrent session), closed after the test"""
+    opened = []
+
+    def factory():
+        conn = _connect()
+        opened.append(conn)
+        return conn
+    yield factory
+    for conn in opened:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def bronze_db(pg_conn):
+    """Test database connection with a freshly created (empty) bronze schema and checkpoint table"""
+    from src.db import execute_sql_file # pylint: disable=import-outside-toplevel
+    sql_dir = Path(__file__).parent.parent / "sql"
+    with pg_conn.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS olap_bronze CASCADE")
+    pg_conn.commit()
+    execute_sql_file(pg_conn, str(sql_dir / "create_olap_bronze.sql"))
+    execute_sql_file(pg_conn, str(sql_dir / "create_olap_meta.sql"))
+    return pg_conn
+
+
+BRONZE_ROWS = """
+INSERT INTO olap_bronze.purchase_prices VALUES
+    (1004, 'Jim Beam', 16.49, '750mL', '750', 1, 12.00, 12546, 'JIM BEAM', 'prices.csv'),
+    (58, 'Gekkeikan', 12.99, '750mL', '750', 1, 9.28, 8320, 'SAKE', 'prices.csv');
+INSERT INTO olap_bronze.beg_inventory VALUES
+    ('1_A_1004', 1, 'HARDERSFIELD', 1004, 'Jim Beam', '750mL', 8, 16.49, '2016-01-01', 'beg.csv');
+INSERT INTO olap_bronze.purchases VALUES
+    ('1_A_1004', 1, 1004, 'Jim Beam', '750mL', 12546, 'JIM BEAM', 8124, '2015-12-21', '2016-01-02',
+     '2016-01-04', '2016-02-16', 12.00, 100, 1200.00, 1, 'purchases.csv');
+INSERT INTO olap_bronze.sales VALUES
+    ('1_A_1004', 1, 1004, 'Jim Beam', '750mL', 10, 164.90, 16.49, '2016-01-05', 750, 1, 0.79, 12546,
+     'JIM BEAM', 'sales_a.csv'),
+    ('1_A_1004', 1, 1004, 'Jim Beam', '750mL', 5, 82.45, 16.49, '2016-02-05', 750, 1, 0.40, 12546,
+     'JIM BEAM', 'sales_a.csv'),
+    ('1_A_58', 1, 58, 'Gekkeikan', '750mL', 2, 25.98, 12.99, '2016-03-07', 750, 1, 0.16, 8320,
+     'SAKE', 'sales_b.csv');
+INSERT INTO olap_bronze.ingest_manifest (file_path, table_name, file_size, file_mtime, content_hash, row_count)
+SELECT source_file, table_name, 1, 0, md5(source_file), COUNT(*)
+FROM (
+    SELECT source_file, 'purchase_prices' AS table_name FROM olap_bronze.purchase_prices
+    UNION ALL SELECT source_file, 'beg_inventory' FROM olap_bronze.beg_inventory
+    UNION ALL SELECT source_file, 'purchases' FROM olap_bronze.purchases
+    UNION ALL SELECT source_file, 'sales' FROM olap_bronze.sales
+) files
+GROUP BY 1, 2;
+"""
+
+
+@pytest.fixture
+def silver_db(bronze_db):
+    """
+    Test database connection with a few bronze rows (two sales files: 'sales_a.csv' over
+    January-February 2016 and 'sales_b.csv' in March 2016) and a full silver build
+    """
+    from src.db import execute_sql_file # pylint: disable=import-outside-toplevel
+    with bronze_db.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS olap_gold CASCADE; DROP SCHEMA IF EXISTS olap_silver CASCADE")
+        cur.execute(BRONZE_ROWS)
+    bronze_db.commit()
+    execute_sql_file(bronze_db, str(Path(__file__).parent.parent / "sql" / "create_olap_silver.sql"))
+    return bronze_db
@@ -0,0 +1,50 @@
+"""
+Tests for batching.py
+"""
+
+import sys
+from pathlib import Path
+import pytest
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.batching import BatchSizer, MAX_BATCH_SIZE, MIN_BATCH_SIZE # pylint: disable=wrong-import-position
+from src.ingest import read_csv_chunks # pylint: disable=wrong-import-position
+
+
+
+
+def test_sizer_fits_in_flight_batches_in_budget():
+    """Test that the next size keeps in_flight batches of the measured width under the budget"""
+    chunk = pd.DataFrame({"a": range(1000), "b": [1.0] * 1000})
+    sizer = BatchSizer(memory_budget=160_000, initial=1000, in_flight=2)
+    assert sizer.observe(chunk) == 5000
+    assert sizer.stats()["batch_sizes"] == [1000, 5000]
+    assert sizer.stats()["bytes_per_row"] == 16.0
+    assert sizer.peak_memory == 2 * 16_000
+
+def test_sizer_stays_within_bounds():
+    """Test that the batch size is clamped for very narrow and very wide rows"""
+    narrow = BatchSizer(memory_budget=2**40, initial=10)
+    assert narrow.size == MIN_BATCH_SIZE
+    assert narrow.observe(pd.DataFrame({"a": [1] * 10})) == MAX_BATCH_SIZE
+    wide = BatchSizer(memory_budget=1_000)
+    assert wide.observe(pd.DataFrame({"a": ["x" * 1000] * 10})) == MIN_BATCH_SIZE
+
+def test_sizer_rejects_empty_budget():
+    """Test that a budget must be positive"""
+    with pytest.raises(ValueError, match="positive"):
+        BatchSizer(memory_budget=0)
+
+@pytest.mark.parametrize("csv_engine", ["pyarrow", "c"])
+def test_read_csv_chunks_follows_the_sizer(tmp_path, csv_engine):
+    """Test that chunks are resized while the file is streamed"""
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("ColA\n" + "".join(f"{i}\n" for i in range(1000)))
+    sizer = BatchSizer(memory_budget=10**9, initial=100)
+
+    sizes = []
+    for chunk in read_csv_chunks(str(csv_file), csv_engine=csv_engine, sizer=sizer):
+        sizes.append(len(chunk))
+        sizer.size = 300
+    assert sizes == [100, 300, 300, 300]
@@ -0,0 +1,55 @@
+"""
+Tests for benchmark.py
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.benchmark import ( # pylint: disable=wrong-import-position
+    compare_to_baseline, ensure_dataset, measure_startup, run_benchmark, BENCHMARK_STEPS
+)
+
+
+
+
+def test_compare_flags_regressions_improvements_and_new_steps():
+    """Test that each step is compared to its baseline wall time within the tolerance"""
+    baseline = {"sf1": {"ingest": {"wall_seconds": 10.0}, "transform": {"wall_seconds": 10.0},
+                        "report": {"wall_seconds": 0.01}}}
+    results = {"sf1": {"ingest": {"wall_seconds": 13.0}, "transform": {"wall_seconds": 7.0},
+                       "report": {"wall_seconds": 0.03}},
+               "sf10": {"ingest": {"wall_seconds": 90.0}}}
+    statuses = {(r["scale"], r["step"]): r["status"] for r in compare_to_baseline(results, baseline, 0.2)}
+    assert statuses == {("sf1", "ingest"): "regressed", ("sf1", "transform"): "improved",
+                        ("sf1", "report"): "ok", ("sf10", "ingest"): "new"}
+
+def test_dataset_is_generated_once_per_scale_and_seed(tmp_path):
+    """Test that a complete dataset is reused instead of being generated again"""
+    def generate(out_dir, *_):
+        Path(out_dir).mkdir(parents=True)
+        return {"sales": 1}
+    with patch("src.benchmark.generate_dataset", side_effect=generate) as mock_generate:
+        first = ensure_dataset(str(tmp_path), 0.5, seed=3)
+        second = ensure_dataset(str(tmp_path), 0.5, seed=3)
+    assert first == second and first.endswith("sf0.5_seed3")
+    mock_generate.assert_called_once_with(first, 0.5, 3)
+
+def test_duckdb_benchmark_times_every_step(tmp_path):
+    """Test a small end-to-end benchmark on the embedded engine"""
+    pytest.importorskip("duckdb")
+    results = run_benchmark([0.002], str(tmp_path), engine="duckdb", repeats=2)
+    steps = results["sf0.002"]
+    assert list(steps) == list(BENCHMARK_STEPS)
+    assert steps["ingest"]["rows"] > 0 and all(s["wall_seconds"] > 0 for s in steps.values())
+    with pytest.raises(ValueError, match="Unknown engine"):
+        run_benchmark([1], str(tmp_path), engine="sqlite")
+
+def test_cli_and_transform_start_without_heavy_imports():
+    """Test that the CLI and the transform step import none of pandas, pyarrow, SQLAlchemy, openpyxl"""
+    startup = measure_startup(repeats=1, steps=["cli", "transform", "report"])["startup"]
+    assert startup["cli"]["heavy_modules"] == []
+    assert startup["transform"]["heavy_modules"] == []
+    assert "openpyxl" in startup["report"]["heavy_modules"]
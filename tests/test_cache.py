@@ -0,0 +1,48 @@
+"""
+Tests for cache.py
+"""
+
+import sys
+from pathlib import Path
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.cache import ReportCache # pylint: disable=wrong-import-position
+
+
+
+
+OLD, NEW = "a" * 32, "b" * 32
+
+
+def test_cache_returns_views_only_when_all_are_stored(tmp_path):
+    """Test that load returns every view once all are stored, and None while one is missing"""
+    cache = ReportCache(str(tmp_path), NEW)
+    df = pd.DataFrame({"brand": [1, 2], "gross_profit": [10.5, None]})
+    cache.store("vw_a", df)
+    assert cache.load(["vw_a", "vw_b"]) is None
+
+    cache.store("vw_b", df.head(1))
+    frames = ReportCache(str(tmp_path), NEW).load(["vw_a", "vw_b"])
+    pd.testing.assert_frame_equal(frames["vw_a"], df)
+    assert len(frames["vw_b"]) == 1
+    assert not list(tmp_path.glob("**/*.tmp"))
+
+def test_new_gold_version_evicts_older_versions(tmp_path):
+    """Test that storing a view for a new version removes the cache of every other version"""
+    df = pd.DataFrame({"brand": [1]})
+    ReportCache(str(tmp_path), OLD).store("vw_a", df)
+    (tmp_path / "notes").mkdir()
+
+    new = ReportCache(str(tmp_path), NEW)
+    assert new.load(["vw_a"]) is None
+    new.store("vw_a", df)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [NEW, "notes"]
+    assert ReportCache(str(tmp_path), OLD).load(["vw_a"]) is None
+
+def test_cache_rejects_invalid_versions(tmp_path):
+    """Test that a version that is not an md5 digest cannot address the cache (e.g. '..')"""
+    with pytest.raises(ValueError, match="Invalid gold build version"):
+        ReportCache(str(tmp_path), "..")
@@ -0,0 +1,94 @@
+"""
+Tests for checkpoint.py
+"""
+
+import sys
+from pathlib import Path
+import pytest
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.checkpoint import ( # pylint: disable=wrong-import-position
+    CheckpointConflict, FileCheckpoint, load_checkpoints, mark_completed, reset_checkpoints
+)
+
+
+
+
+# Tests for FileCheckpoint
+def test_advance_is_guarded_by_the_committed_offset(make_conn):
+    """Test that advance() only moves the offset from its expected value"""
+    _, cursor = make_conn()
+    checkpoint = FileCheckpoint("Sales.csv", "abc", offset=20)
+    checkpoint.advance(cursor, 10)
+    assert cursor.execute.call_args[0][1] == (10, "Sales.csv", 20)
+
+    checkpoint.committed(10)
+    assert checkpoint.offset == 30
+
+def test_advance_raises_on_conflict(make_conn):
+    """Test that advance() raises CheckpointConflict when the stored offset moved"""
+    _, cursor = make_conn(rowcount=0)
+    with pytest.raises(CheckpointConflict, match="no longer at row 0"):
+        FileCheckpoint("Sales.csv", "abc").advance(cursor, 10)
+
+def test_first_chunk_runs_until_a_chunk_is_committed(make_conn):
+    """Test that prepare() runs first_chunk in every attempt until a chunk was committed"""
+    _, cursor = make_conn()
+    calls = []
+    checkpoint = FileCheckpoint("Sales.csv", "abc", first_chunk=calls.append)
+    checkpoint.prepare(cursor)
+    checkpoint.prepare(cursor)
+    checkpoint.committed(10)
+    checkpoint.prepare(cursor)
+    assert calls == [cursor, cursor]
+
+def test_start_rolls_back_on_error(make_conn):
+    """Test that start() rolls back and raises RuntimeError when the upsert fails"""
+    conn, _ = make_conn(error=psycopg2.Error("boom"))
+    with pytest.raises(RuntimeError, match="Failed to checkpoint file 'Sales.csv'"):
+        FileCheckpoint("Sales.csv", "abc").start(conn)
+    conn.rollback.assert_called_once()
+
+
+# Tests for checkpoint reads and writes
+def test_load_checkpoints_returns_entries_by_name(make_conn):
+    """Test that load_checkpoints keys the stored checkpoints by name"""
+    conn, _ = make_conn(rows=[("Sales.csv", "abc", 30, False)])
+    assert load_checkpoints(conn, "file") == {
+        "Sales.csv": {"content_hash": "abc", "rows_committed": 30, "completed": False}
+    }
+
+def test_reset_and_mark_roll_back_on_error(make_conn):
+    """Test that reset_checkpoints and mark_completed roll back and raise RuntimeError"""
+    conn, _ = make_conn(error=psycopg2.Error("boom"))
+    with pytest.raises(RuntimeError, match="Failed to reset checkpoints"):
+        reset_checkpoints(conn)
+    with pytest.raises(RuntimeError, match="Failed to checkpoint step 'silver'"):
+        mark_completed(conn, "step", "silver")
+    assert conn.rollback.call_count == 2
+
+@pytest.mark.db
+def test_concurrent_advance_conflicts_on_postgres(bronze_db, pg_connect):
+    """Test on PostgreSQL that two sessions cannot both advance a file checkpoint from the same offset"""
+    reset_checkpoints(bronze_db)
+    first = FileCheckpoint("Sales.csv", "abc")
+    first.start(bronze_db)
+    second = FileCheckpoint("Sales.csv", "abc")
+    other = pg_connect()
+
+    with bronze_db.cursor() as cur:
+        first.advance(cur, 10)
+    bronze_db.commit()
+    first.committed(10)
+    with other.cursor() as cur, pytest.raises(CheckpointConflict, match="no longer at row 0"):
+        second.advance(cur, 5)
+    other.rollback()
+
+    mark_completed(bronze_db, "file", "Sales.csv", rows=first.offset)
+    mark_completed(bronze_db, "step", "ingest")
+    assert load_checkpoints(bronze_db, "file") == {
+        "Sales.csv": {"content_hash": "abc", "rows_committed": 10, "completed": True}}
+    reset_checkpoints(bronze_db, scopes=("file",))
+    assert load_checkpoints(bronze_db, "file") == {}
+    assert load_checkpoints(bronze_db, "step")["ingest"]["completed"]
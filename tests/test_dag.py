@@ -0,0 +1,112 @@
+"""
+Tests for dag.py
+"""
+
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+import pytest
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.dag import critical_path, parse_units, run_units # pylint: disable=wrong-import-position
+
+
+
+
+SQL_DIR = Path(__file__).parent.parent / "sql"
+
+ANNOTATED_SQL = """CREATE SCHEMA IF NOT EXISTS s;
+
+-- @unit a
+CREATE TABLE s.a AS SELECT 1;
+
+-- @unit b
+-- @depends_on a
+CREATE TABLE s.b AS SELECT * FROM s.a;
+
+-- @unit c
+-- @depends_on a, b
+CREATE VIEW s.c AS SELECT * FROM s.b;
+"""
+
+
+def _units(tmp_path, text=ANNOTATED_SQL):
+    sql_file = tmp_path / "units.sql"
+    sql_file.write_text(text)
+    return parse_units(str(sql_file))
+
+
+# Tests for parse_units
+def test_parse_units_splits_setup_and_dependencies(tmp_path):
+    """Test that units, their SQL and their declared dependencies are parsed in file order"""
+    setup, units = _units(tmp_path)
+    assert setup == "CREATE SCHEMA IF NOT EXISTS s;"
+    assert list(units) == ["a", "b", "c"]
+    assert units["c"]["depends_on"] == ["a", "b"]
+    assert units["b"]["sql"] == "CREATE TABLE s.b AS SELECT * FROM s.a;"
+
+def test_parse_units_rejects_unknown_dependencies_and_cycles(tmp_path):
+    """Test that unknown dependencies and cycles are reported as ValueError"""
+    with pytest.raises(ValueError, match="unknown unit"):
+        _units(tmp_path, "-- @unit a\n-- @depends_on z\nSELECT 1;\n")
+    with pytest.raises(ValueError, match="cycle"):
+        _units(tmp_path, "-- @unit a\n-- @depends_on b\nSELECT 1;\n-- @unit b\n-- @depends_on a\nSELECT 2;\n")
+
+def test_pipeline_sql_files_declare_gold_dependencies():
+    """Test that the shipped SQL files parse and the gold grains wait for the cube"""
+    _, silver = parse_units(str(SQL_DIR / "create_olap_silver.sql"))
+    _, gold = parse_units(str(SQL_DIR / "create_olap_gold.sql"))
+    assert {"dim_product", "dim_store", "dim_vendor", "dim_date",
+            "fact_sales", "fact_purchases", "fact_inventory"} <= set(silver)
+    _, refresh = parse_units(str(SQL_DIR / "refresh_olap_silver.sql"))
+    assert set(refresh) == set(silver)
+    assert gold["product_pnl"]["depends_on"] == ["pnl_cube"]
+    assert gold["brand_pnl"]["depends_on"] == ["pnl_cube"]
+    assert gold["mv_top_10_brands_profit"]["depends_on"] == ["brand_pnl"]
+    assert gold["vw_top_10_brands_profit"]["depends_on"] == ["mv_top_10_brands_profit"]
+
+
+# Tests for critical_path
+def test_critical_path_follows_the_slowest_chain(tmp_path):
+    """Test that the critical path is the dependency chain with the largest total time"""
+    _, units = _units(tmp_path)
+    path, seconds = critical_path(units, {"a": 1.0, "b": 2.0, "c": 0.5})
+    assert path == ["a", "b", "c"]
+    assert seconds == 3.5
+
+
+# Tests for run_units
+def test_run_units_respects_dependencies_on_a_pool(tmp_path):
+    """Test that every unit runs after its dependencies and each pooled connection is closed"""
+    _, units = _units(tmp_path)
+    executed, lock, connections = [], threading.Lock(), []
+
+    def connect():
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        def execute(statement):
+            with lock:
+                executed.append(statement)
+        cursor.execute.side_effect = execute
+        connections.append(conn)
+        return conn
+
+    timings = run_units(units, connect, workers=2)
+    assert set(timings) == {"a", "b", "c"}
+    assert executed == [units[name]["sql"] for name in ("a", "b", "c")]
+    assert len(connections) == 2
+    assert all(conn.close.called for conn in connections)
+
+def test_run_units_stops_after_a_failure(tmp_path, make_conn):
+    """Test that a failing unit is rolled back and its dependents are never run"""
+    _, units = _units(tmp_path)
+    conn, cursor = make_conn()
+    cursor.execute.side_effect = psycopg2.Error("relation does not exist")
+
+    with pytest.raises(RuntimeError, match="SQL unit 'a' failed"):
+        run_units(units, lambda: conn, workers=4)
+    assert cursor.execute.call_count == 1
+    conn.rollback.assert_called_once()
+    assert conn.close.call_count == 3
@@ -10,7 +10,9 @@ import psycopg2
 from sqlalchemy.exc import SQLAlchemyError
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-from src.db import get_engine, get_psycopg2_connection, execute_sql_file # pylint: disable=wrong-import-position
+from src.db import ( # pylint: disable=wrong-import-position
+    get_engine, get_psycopg2_connection, execute_sql_file, get_duckdb_connection, execute_duckdb_sql_file
+)
 
 
 
@@ -41,18 +43,23 @@ def test_raises_when_env_var_missing(monkeypatch):
 
 # Tests for get_engine
 def test_returns_engine_when_env_vars_present():
-    """Test that get_engine returns an engine when all env vars are set"""
+    """Test that get_engine returns an engine without connecting, unless check=True"""
     mock_engine = MagicMock()
     mock_engine.connect.return_value.__enter__ = MagicMock(return_value=MagicMock())
     mock_engine.connect.return_value.__exit__ = MagicMock(return_value=False)
 
-    with patch("src.db.create_engine", return_value=mock_engine):
+    with patch("sqlalchemy.create_engine", return_value=mock_engine):
         engine = get_engine()
         assert engine is mock_engine
+    mock_engine.connect.assert_not_called()
+
+    with patch("sqlalchemy.create_engine", return_value=mock_engine):
+        get_engine(check=True)
+    mock_engine.connect.assert_called_once()
 
 def test_raises_runtime_error_on_sqlalchemy_error():
     """Test that get_engine raises RuntimeError when SQLAlchemyError occurs"""
-    with patch("src.db.create_engine", side_effect=SQLAlchemyError("conn failed")):
+    with patch("sqlalchemy.create_engine", side_effect=SQLAlchemyError("conn failed")):
         with pytest.raises(RuntimeError, match="Failed to create database engine"):
             get_engine()
 
@@ -116,3 +123,15 @@ def test_rolls_back_and_raises_on_psycopg2_error(tmp_path):
         execute_sql_file(mock_conn, str(sql_file))
     mock_conn.rollback.assert_called_once()
     mock_conn.commit.assert_not_called()
+
+def test_duckdb_sql_file_runs_statements_and_wraps_errors(tmp_path):
+    """Test that a DuckDB SQL file runs all its statements and that failures raise RuntimeError"""
+    pytest.importorskip("duckdb")
+    good, bad = tmp_path / "good.sql", tmp_path / "bad.sql"
+    good.write_text("CREATE SCHEMA s; CREATE TABLE s.t AS SELECT 42 AS x;")
+    bad.write_text("SELECT * FROM s.missing;")
+    con = get_duckdb_connection()
+    execute_duckdb_sql_file(con, str(good))
+    assert con.execute("SELECT x FROM s.t").fetchone() == (42,)
+    with pytest.raises(RuntimeError, match="Failed to execute SQL file"):
+        execute_duckdb_sql_file(con, str(bad))
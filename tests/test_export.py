@@ -0,0 +1,113 @@
+"""
+Tests for export.py
+"""
+
+import sys
+import datetime
+from decimal import Decimal
+from collections import namedtuple
+from pathlib import Path
+from unittest.mock import MagicMock
+import pytest
+import psycopg2
+import pyarrow.dataset as ds
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.export import export_parquet, export_relation # pylint: disable=wrong-import-position
+
+
+
+
+Column = namedtuple("Column", "name type_code precision scale")
+
+
+def _make_conn(description, rows):
+    """Connection whose server-side cursor returns the rows in fetchmany-sized batches"""
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    cursor.description = description
+    pending = list(rows)
+
+    def fetchmany(size):
+        batch = pending[:size]
+        del pending[:size]
+        return batch
+    cursor.fetchmany.side_effect = fetchmany
+    return conn, cursor
+
+
+def test_export_partitions_facts_by_month(tmp_path):
+    """Test that fact_sales is streamed in batches into a month-partitioned dataset with typed columns"""
+    description = [Column("sale_id", 20, None, None), Column("sales_date", 1082, None, None),
+                   Column("sales_dollars", 1700, 12, 2), Column("source_file", 25, None, None),
+                   Column("sales_month", 25, None, None)]
+    rows = [(i, datetime.date(2016, 1 + i % 2, 1), Decimal("1.50"), "a.csv", f"2016-0{1 + i % 2}")
+            for i in range(5)]
+    conn, cursor = _make_conn(description, rows)
+
+    result = export_relation(conn, "fact_sales", str(tmp_path), compression="zstd", batch_size=2)
+
+    assert result["rows"] == 5 and result["files"] == 2
+    assert conn.cursor.call_args[1]["name"] == "export_fact_sales"
+    assert "to_char" in repr(cursor.execute.call_args[0][0])
+    table = ds.dataset(tmp_path / "olap_silver" / "fact_sales", partitioning="hive").to_table()
+    assert sorted(table["sale_id"].to_pylist()) == [0, 1, 2, 3, 4]
+    assert str(table.schema.field("sales_dollars").type) == "decimal128(12, 2)"
+    assert sorted(p.name for p in (tmp_path / "olap_silver" / "fact_sales").iterdir()) == [
+        "sales_month=2016-01", "sales_month=2016-02"]
+
+def test_export_converts_unconstrained_numerics_and_unknown_types(tmp_path):
+    """Test that aggregated NUMERICs become float64 and unmapped types are exported as text"""
+    description = [Column("brand", 23, None, None), Column("gross_profit", 1700, None, None),
+                   Column("tags", 1009, None, None)]
+    conn, _ = _make_conn(description, [(1, Decimal("10.25"), ["a"]), (2, None, None)])
+
+    export_relation(conn, "brand_pnl", str(tmp_path), compression="none")
+
+    table = ds.dataset(tmp_path / "olap_gold" / "brand_pnl").to_table()
+    assert table["gross_profit"].to_pylist() == [10.25, None]
+    assert table["tags"].to_pylist() == ["['a']", None]
+
+def test_export_rejects_unknown_relations_and_compressions(tmp_path):
+    """Test that unknown relation names and compressions raise ValueError"""
+    with pytest.raises(ValueError, match="Unknown export"):
+        export_parquet(MagicMock(), str(tmp_path), names=["secrets"])
+    with pytest.raises(ValueError, match="Unknown compression"):
+        export_relation(MagicMock(), "dim_store", str(tmp_path), compression="brotli9")
+
+def test_export_rolls_back_on_database_error(tmp_path):
+    """Test that a database error rolls back the export transaction and raises RuntimeError"""
+    conn = MagicMock()
+    conn.cursor.return_value.execute.side_effect = psycopg2.Error("relation does not exist")
+    with pytest.raises(RuntimeError, match="Parquet export failed"):
+        export_parquet(conn, str(tmp_path), names=["pnl_cube"])
+    conn.rollback.assert_called_once()
+    conn.set_session.assert_called_once_with(isolation_level="REPEATABLE READ", readonly=True)
+
+def test_gold_export_is_kept_for_the_same_version(tmp_path):
+    """Test that a gold relation exported for a version is not read again until the version or options change"""
+    description = [Column("brand", 23, None, None), Column("gross_profit", 1700, 12, 2)]
+    conn, cursor = _make_conn(description, [(1, Decimal("10.25"))])
+    first = export_relation(conn, "brand_pnl", str(tmp_path), version="v1")
+
+    kept = export_relation(MagicMock(), "brand_pnl", str(tmp_path), version="v1")
+    assert kept["cached"] and kept["rows"] == first["rows"] == 1
+
+    conn, cursor = _make_conn(description, [(1, Decimal("10.25")), (2, None)])
+    assert export_relation(conn, "brand_pnl", str(tmp_path), version="v2")["rows"] == 2
+    cursor.execute.assert_called_once()
+    assert ds.dataset(tmp_path / "olap_gold" / "brand_pnl").count_rows() == 2
+
+def test_export_reads_the_gold_version_in_its_snapshot(tmp_path):
+    """Test that reuse reads the gold build version after the snapshot starts, without committing first"""
+    description = [Column("brand", 23, None, None), Column("gross_profit", 1700, 12, 2)]
+    conn, cursor = _make_conn(description, [(1, Decimal("10.25"))])
+    export_relation(conn, "brand_pnl", str(tmp_path), version="v1")
+
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchone.side_effect = [(True,), ("v1",)]
+    results = export_parquet(conn, str(tmp_path), names=["brand_pnl"], reuse=True)
+    assert results["brand_pnl"]["cached"]
+    assert [c[0] for c in conn.method_calls if c[0] in ("set_session", "commit")] == ["set_session", "commit"]
+    assert "olap_gold.build_version" in cursor.execute.call_args_list[-1][0][0]
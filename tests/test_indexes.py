@@ -0,0 +1,63 @@
+"""
+Tests for indexes.py
+"""
+
+import sys
+from pathlib import Path
+import pytest
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.indexes import INDEXES, build_indexes, index_name # pylint: disable=wrong-import-position
+
+
+
+
+def test_build_indexes_creates_declared_indexes_then_analyzes(make_conn):
+    """Test that every declared index is created and timed before each table is analyzed"""
+    conn, cursor = make_conn(rows=[("fact_sales",), ("dim_date",)])
+    timings = build_indexes(conn, "olap_silver")
+
+    names = [index_name(*spec) for spec in INDEXES["olap_silver"]]
+    assert list(timings) == [f"index {n}" for n in names] + ["analyze fact_sales", "analyze dim_date"]
+    statements = [c[0][0] for c in cursor.execute.call_args_list]
+    assert "USING" in repr(statements[0]) and "brin" in repr(statements[1])
+    assert conn.commit.call_count == len(names) + 2
+
+def test_index_names_are_unique_and_fit_identifiers():
+    """Test that declared index names are unique per schema and at most 63 characters long"""
+    for specs in INDEXES.values():
+        names = [index_name(*spec) for spec in specs]
+        assert len(set(names)) == len(names)
+        assert all(len(name) <= 63 for name in names)
+
+def test_build_indexes_rolls_back_on_error(make_conn):
+    """Test that a failing index rolls back and raises RuntimeError"""
+    conn, _ = make_conn(error=psycopg2.Error("out of disk"))
+    with pytest.raises(RuntimeError, match="Failed to index 'olap_gold'"):
+        build_indexes(conn, "olap_gold")
+    conn.rollback.assert_called_once()
+
+@pytest.mark.db
+def test_full_silver_build_drops_the_secondary_indexes_rebuilt_after_the_load_on_postgres(silver_db):
+    """Test on PostgreSQL that a full silver build reloads without secondary indexes and build_indexes restores them"""
+    from src.db import execute_sql_file # pylint: disable=import-outside-toplevel
+
+    def silver_indexes():
+        cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = 'olap_silver' AND tablename = ANY(%s)",
+                    (["fact_sales", "dim_product"],))
+        return {row[0] for row in cur.fetchall()}
+
+    build_indexes(silver_db, "olap_silver")
+    declared = {index_name(*spec) for spec in INDEXES["olap_silver"] if spec[0] == "fact_sales"}
+    with silver_db.cursor() as cur:
+        built = silver_indexes()
+        assert declared < built and {"dim_product_pkey", "dim_product_natural_key"} < built
+    execute_sql_file(silver_db, str(Path(__file__).parent.parent / "sql" / "create_olap_silver.sql"))
+    with silver_db.cursor() as cur:
+        assert silver_indexes() == built - declared
+        cur.execute("SELECT COUNT(*) FROM olap_silver.fact_sales")
+        assert cur.fetchone() == (3,)
+    build_indexes(silver_db, "olap_silver")
+    with silver_db.cursor() as cur:
+        assert silver_indexes() == built
@@ -8,10 +8,16 @@ import logging
 from unittest.mock import patch, MagicMock
 import pytest
 import pandas as pd
+import psycopg2
 from sqlalchemy.exc import SQLAlchemyError
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-from src.ingest import load_table, ingest_all # pylint: disable=wrong-import-position
+from src.ingest import ( # pylint: disable=wrong-import-position
+    load_table, ingest_all, ingest_file, read_csv_chunks, discover_files, ingest_duckdb
+)
+from src.manifest import file_fingerprint # pylint: disable=wrong-import-position
+from src.batching import BatchSizer # pylint: disable=wrong-import-position
+from src.checkpoint import FileCheckpoint # pylint: disable=wrong-import-position
 
 
 pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
@@ -64,6 +70,105 @@ def test_raises_runtime_error_on_sqlalchemy_error():
             with pytest.raises(RuntimeError, match="Failed to load table"):
                 load_table(df, "table", engine)
 
+def test_copy_loader_streams_chunks_and_reports_throughput(make_conn):
+    """Test that the copy loader issues one COPY per batch, commits each one and returns stats"""
+    conn, cursor = make_conn()
+    df = pd.DataFrame({"a": range(25), "b": [1.0] * 25})
+    with patch("src.ingest.inspect", return_value=_make_inspector()):
+        stats = load_table(df, "table", MagicMock(), batch_size=10, loader="copy", conn=conn)
+    assert cursor.copy_expert.call_count == 3
+    assert conn.commit.call_count == 3
+    buffer = cursor.copy_expert.call_args_list[0][0][1]
+    assert buffer.getvalue().splitlines()[0] == "0,1"
+    assert stats["rows"] == 25
+    assert "rows_per_sec" in stats
+
+def test_copy_loader_rolls_back_on_psycopg2_error(make_conn):
+    """Test that the copy loader rolls back and raises RuntimeError when COPY fails"""
+    conn, cursor = make_conn()
+    cursor.copy_expert.side_effect = psycopg2.Error("copy failed")
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    with patch("src.ingest.inspect", return_value=_make_inspector()):
+        with pytest.raises(RuntimeError, match="Failed to load table"):
+            load_table(df, "table", MagicMock(), loader="copy", conn=conn)
+    conn.rollback.assert_called_once()
+
+def test_pipelined_copy_overlaps_stages_and_reports_timings(make_conn):
+    """Test that the pipelined loader writes every batch in order and reports per-stage timings"""
+    conn, cursor = make_conn()
+    df = pd.DataFrame({"a": range(50)})
+    with patch("src.ingest.inspect", return_value=_make_inspector()):
+        stats = load_table(df, "table", MagicMock(), batch_size=10, loader="copy",
+                           conn=conn, pipeline_depth=2)
+    first_values = [c[0][1].getvalue().splitlines()[0] for c in cursor.copy_expert.call_args_list]
+    assert first_values == ["0", "10", "20", "30", "40"]
+    assert stats["rows"] == 50
+    assert set(stats["stages"]) == {"parse", "write"}
+    assert set(stats["stages"]["write"]) == {"busy", "idle"}
+
+def test_pipelined_loader_propagates_parser_errors():
+    """Test that an error raised while parsing in the background reaches the caller"""
+    def broken_chunks():
+        yield pd.DataFrame({"a": [1]})
+        raise ValueError("Type mismatches in 'x.csv'")
+
+    with patch("src.ingest.inspect", return_value=_make_inspector()):
+        with patch.object(pd.DataFrame, "to_sql") as mock_to_sql:
+            with pytest.raises(ValueError, match="Type mismatches"):
+                load_table(broken_chunks(), "table", MagicMock(), pipeline_depth=1)
+    assert mock_to_sql.call_count == 1
+
+def test_pipelined_loader_stops_parser_when_writer_fails(make_conn):
+    """Test that a failing write stops the parser thread and raises RuntimeError"""
+    conn, cursor = make_conn()
+    cursor.copy_expert.side_effect = psycopg2.Error("copy failed")
+    df = pd.DataFrame({"a": range(100)})
+    with patch("src.ingest.inspect", return_value=_make_inspector()):
+        with pytest.raises(RuntimeError, match="Failed to load table"):
+            load_table(df, "table", MagicMock(), batch_size=1, loader="copy",
+                       conn=conn, pipeline_depth=1)
+    assert cursor.copy_expert.call_count == 1
+
+def test_raises_on_invalid_loader_configuration():
+    """Test that load_table rejects unknown loaders and the copy loader without a connection"""
+    df = pd.DataFrame({"a": [1]})
+    with pytest.raises(ValueError, match="Unknown loader"):
+        load_table(df, "table", MagicMock(), loader="bulk")
+    with pytest.raises(ValueError, match="requires a psycopg2 connection"):
+        load_table(df, "table", MagicMock(), loader="copy")
+
+def test_loads_stream_of_chunks_without_known_length():
+    """Test that load_table accepts an iterator of chunks and counts the rows as they stream"""
+    chunks = (pd.DataFrame({"a": range(i, i + 5)}) for i in range(0, 15, 5))
+    with patch("src.ingest.inspect", return_value=_make_inspector()):
+        with patch.object(pd.DataFrame, "to_sql") as mock_to_sql:
+            stats = load_table(chunks, "table", MagicMock())
+    assert mock_to_sql.call_count == 3
+    assert stats["rows"] == 15
+    assert stats["stages"]["write"]["idle"] == 0.0 and stats["stages"]["parse"]["busy"] >= 0
+
+def test_sizer_resizes_dataframe_batches_and_reports_them():
+    """Test that load_table slices by the adapted batch size and returns the chosen sizes"""
+    df = pd.DataFrame({"a": range(1000)})
+    sizer = BatchSizer(memory_budget=4000, initial=100, in_flight=2)
+    with patch("src.ingest.inspect", return_value=_make_inspector()):
+        with patch.object(pd.DataFrame, "to_sql") as mock_to_sql:
+            stats = load_table(df, "table", MagicMock(), sizer=sizer)
+    assert mock_to_sql.call_count == 5
+    assert stats["batch_sizes"] == [100, 250]
+    assert stats["peak_memory"] == 2 * 2000
+
+
+# Tests for read_csv_chunks
+def test_read_csv_chunks_yields_bounded_snake_case_chunks(tmp_path):
+    """Test that read_csv_chunks streams bounded chunks with normalized column names"""
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("InventoryId,SalesQuantity\n" + "".join(f"id{i},{i}\n" for i in range(7)))
+
+    chunks = list(read_csv_chunks(str(csv_file), chunksize=3))
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    assert all(list(c.columns) == ["inventory_id", "sales_quantity"] for c in chunks)
+
 
 # Tests for ingest_all
 def test_raises_if_bronze_sql_fails(tmp_path):
@@ -92,3 +197,249 @@ def test_raises_if_csv_not_exists(tmp_path):
     with patch("src.ingest.execute_sql_file"):
         with pytest.raises(RuntimeError, match="CSV file not found"):
             ingest_all(MagicMock(), data_dir, MagicMock())
+
+def test_failed_file_does_not_hide_other_results(tmp_path):
+    """Test that ingest_all loads every file, then reports the failures with per-file results"""
+    for name in REQUIRED_FILES:
+        (tmp_path / name).write_text("ColA\n1\n")
+
+    def fake_load(_chunks, table, *_args, **_kwargs):
+        if table == "purchases":
+            raise RuntimeError("bad row")
+        return {"rows": 1, "seconds": 0.1, "rows_per_sec": 10.0}
+
+    with patch("src.ingest.execute_sql_file"):
+        with patch("src.ingest.load_table", side_effect=fake_load) as mock_load:
+            with pytest.raises(RuntimeError, match="1 of 6 file.*PurchasesFINAL12312016.csv.*bad row"):
+                ingest_all(MagicMock(), tmp_path, MagicMock())
+    assert mock_load.call_count == len(REQUIRED_FILES)
+
+
+# Tests for discover_files
+def test_discover_files_matches_every_file_per_table(tmp_path):
+    """Test that discover_files maps monthly extracts to their tables without cross-matching"""
+    for name in REQUIRED_FILES + ["SalesFINAL01312017.csv"]:
+        (tmp_path / name).write_text("ColA\n1\n")
+
+    files = discover_files(str(tmp_path))
+    tables = {}
+    for path, table in files:
+        tables.setdefault(table, []).append(Path(path).name)
+    assert sorted(tables["sales"]) == ["SalesFINAL01312017.csv", "SalesFINAL12312016.csv"]
+    assert tables["purchases"] == ["PurchasesFINAL12312016.csv"]
+    assert tables["invoice_purchases"] == ["InvoicePurchases12312016.csv"]
+
+def test_incremental_skips_unchanged_and_replaces_changed_files(tmp_path, make_conn):
+    """Test that incremental ingest only reloads changed files, deleting their previous rows with the first chunk"""
+    for name in REQUIRED_FILES:
+        (tmp_path / name).write_text("ColA\n1\n")
+    manifest = {}
+    for name in REQUIRED_FILES:
+        fingerprint = file_fingerprint(str(tmp_path / name))
+        manifest[name] = {**fingerprint, "table_name": "t", "row_count": 1}
+    (tmp_path / "SalesFINAL12312016.csv").write_text("ColA\n1\n2\n")
+
+    with patch("src.ingest._bronze_ready", return_value=True), \
+         patch("src.ingest.execute_sql_file") as mock_ddl, \
+         patch("src.ingest.read_manifest", return_value=manifest), \
+         patch("src.ingest.record_file") as mock_record, \
+         patch("src.ingest.FileCheckpoint") as mock_checkpoint, \
+         patch("src.ingest.load_table", return_value={"rows": 2, "seconds": 0.1,
+                                                       "rows_per_sec": 20.0}) as mock_load:
+        results = ingest_all(MagicMock(), tmp_path, MagicMock(), incremental=True)
+
+    mock_ddl.assert_not_called()
+    assert mock_load.call_count == 1
+    _, cursor = make_conn()
+    mock_checkpoint.call_args.kwargs["first_chunk"](cursor)
+    assert "DELETE" in repr(cursor.execute.call_args[0][0])
+    assert cursor.execute.call_args[0][1] == ("SalesFINAL12312016.csv",)
+    mock_record.assert_called_once()
+    assert results["SalesFINAL12312016.csv"]["status"] == "loaded"
+    assert sum(r["status"] == "skipped" for r in results.values()) == len(REQUIRED_FILES) - 1
+
+def test_replaced_file_chunks_are_tagged_with_source_file(tmp_path, make_conn):
+    """Test that a replaced file has its old rows deleted with its first chunk and every chunk tagged"""
+    csv_file = tmp_path / "SalesFINAL12312016.csv"
+    csv_file.write_text("ColA\n1\n2\n")
+    seen = []
+
+    def fake_load(chunks, *_args, checkpoint, **_kwargs):
+        for chunk in chunks:
+            seen.append(chunk["source_file"].unique().tolist())
+            checkpoint.prepare(cursor)
+            checkpoint.advance(cursor, len(chunk))
+            checkpoint.committed(len(chunk))
+        return {"rows": 2, "seconds": 0.1, "rows_per_sec": 20.0}
+
+    conn, cursor = make_conn()
+    with patch("src.ingest.load_table", side_effect=fake_load), patch("src.ingest.record_file"):
+        result = ingest_file(str(csv_file), "sales", conn, MagicMock(), replace=True, batch_size=1)
+    assert result["error"] is None
+    assert seen == [["SalesFINAL12312016.csv"]] * 2
+    # checkpoint start, then the delete in the transaction of the first chunk only
+    params = [c[0][1] for c in cursor.execute.call_args_list[1:4]]
+    assert params == [("SalesFINAL12312016.csv",), (1, "SalesFINAL12312016.csv", 0),
+                      (1, "SalesFINAL12312016.csv", 1)]
+
+def test_swap_strategy_loads_staging_tables_then_swaps(tmp_path):
+    """Test that the swap strategy writes to staging tables and swaps them in with the manifest"""
+    for name in REQUIRED_FILES:
+        (tmp_path / name).write_text("ColA\n1\n")
+    targets = []
+
+    def fake_load(_chunks, target, *_args, **_kwargs):
+        targets.append(target)
+        return {"rows": 1, "seconds": 0.1, "rows_per_sec": 10.0}
+
+    with patch("src.ingest._bronze_ready", return_value=True), \
+         patch("src.ingest.execute_sql_file") as mock_ddl, \
+         patch("src.ingest.cleanup_staging"), \
+         patch("src.ingest.create_staging_table", side_effect=lambda _conn, t: f"{t}__staging"), \
+         patch("src.ingest.finalize_staging") as mock_finalize, \
+         patch("src.ingest.swap_in") as mock_swap, \
+         patch("src.ingest.clear_manifest"), \
+         patch("src.ingest.record_file") as mock_record, \
+         patch("src.ingest.load_table", side_effect=fake_load):
+        ingest_all(MagicMock(), tmp_path, MagicMock(), strategy="swap")
+
+    mock_ddl.assert_not_called()
+    assert all(target.endswith("__staging") for target in targets)
+    assert mock_finalize.call_count == 6
+    assert mock_record.call_count == len(REQUIRED_FILES)
+    assert all(c.kwargs["commit"] is False for c in mock_record.call_args_list)
+    mock_swap.assert_called_once()
+
+def test_swap_strategy_keeps_live_tables_when_a_file_fails(tmp_path):
+    """Test that a failed file drops the staging tables and never swaps"""
+    for name in REQUIRED_FILES:
+        (tmp_path / name).write_text("ColA\n1\n")
+
+    with patch("src.ingest._bronze_ready", return_value=True), \
+         patch("src.ingest.cleanup_staging") as mock_cleanup, \
+         patch("src.ingest.create_staging_table", side_effect=lambda _conn, t: f"{t}__staging"), \
+         patch("src.ingest.swap_in") as mock_swap, \
+         patch("src.ingest.load_table", side_effect=RuntimeError("bad row")):
+        with pytest.raises(RuntimeError, match="Failed to ingest 6 of 6"):
+            ingest_all(MagicMock(), tmp_path, MagicMock(), strategy="swap")
+    mock_swap.assert_not_called()
+    assert mock_cleanup.call_count == 2
+
+def test_swap_strategy_rejects_incremental(tmp_path):
+    """Test that the swap strategy cannot be combined with incremental ingestion"""
+    with pytest.raises(ValueError, match="cannot be combined with incremental"):
+        ingest_all(MagicMock(), tmp_path, MagicMock(), strategy="swap", incremental=True)
+
+def test_resume_skips_completed_files_and_continues_partial_ones(tmp_path):
+    """Test that a resumed ingest skips completed files and restarts partial files at their offset"""
+    for name in REQUIRED_FILES:
+        (tmp_path / name).write_text("ColA\n1\n2\n3\n")
+    content_hash = file_fingerprint(str(tmp_path / "SalesFINAL12312016.csv"))["content_hash"]
+    checkpoints = {name: {"content_hash": content_hash, "rows_committed": 3, "completed": True}
+                   for name in REQUIRED_FILES}
+    checkpoints["SalesFINAL12312016.csv"] = {"content_hash": content_hash,
+                                             "rows_committed": 2, "completed": False}
+    loaded = []
+
+    def fake_load(chunks, *_args, **_kwargs):
+        loaded.extend(chunk["col_a"].tolist() for chunk in chunks)
+        return {"rows": 1, "seconds": 0.1, "rows_per_sec": 10.0}
+
+    with patch("src.ingest._bronze_ready", return_value=True), \
+         patch("src.ingest.execute_sql_file") as mock_ddl, \
+         patch("src.ingest.load_checkpoints", return_value=checkpoints), \
+         patch("src.ingest.reset_checkpoints") as mock_reset, \
+         patch("src.ingest.FileCheckpoint") as mock_checkpoint, \
+         patch("src.ingest.record_file"), \
+         patch("src.ingest.load_table", side_effect=fake_load):
+        results = ingest_all(MagicMock(), tmp_path, MagicMock(), resume=True)
+
+    mock_ddl.assert_not_called()
+    mock_reset.assert_not_called()
+    mock_checkpoint.assert_called_once_with("SalesFINAL12312016.csv", content_hash, 2, first_chunk=None)
+    assert loaded == [["3"]]
+    assert sum(r["status"] == "skipped" for r in results.values()) == len(REQUIRED_FILES) - 1
+
+def test_resume_replaces_partial_rows_of_changed_files(tmp_path):
+    """Test that a file changed since the failed run is reloaded from its first row"""
+    for name in REQUIRED_FILES:
+        (tmp_path / name).write_text("ColA\n1\n")
+    checkpoints = {"SalesFINAL12312016.csv": {"content_hash": "old", "rows_committed": 5, "completed": False}}
+
+    with patch("src.ingest._bronze_ready", return_value=True), \
+         patch("src.ingest.load_checkpoints", return_value=checkpoints), \
+         patch("src.ingest.FileCheckpoint") as mock_checkpoint, \
+         patch("src.ingest.record_file"), \
+         patch("src.ingest.load_table", return_value={"rows": 1, "seconds": 0.1, "rows_per_sec": 10.0}):
+        ingest_all(MagicMock(), tmp_path, MagicMock(), resume=True)
+
+    replaced = {c[0][0]: c.kwargs["first_chunk"] is not None for c in mock_checkpoint.call_args_list}
+    assert replaced["SalesFINAL12312016.csv"]
+    assert sum(replaced.values()) == 1
+
+def test_ingest_duckdb_casts_columns_to_the_bronze_types(tmp_path):
+    """Test that the DuckDB loader maps headers, parses both date formats and records the source file"""
+    duckdb = pytest.importorskip("duckdb")
+    for name in REQUIRED_FILES:
+        (tmp_path / name).write_text("ColA\n")
+    (tmp_path / "SalesFINAL12312016.csv").write_text(
+        "InventoryId,Store,Brand,SalesQuantity,SalesDollars,SalesDate,VendorNo\n"
+        "1_A_1004,1,1004,2,32.98,1/1/2016,12546\n"
+        "1_A_1005,1,1005,1,34.99,2016-01-02,\n"
+    )
+    con = duckdb.connect()
+    results = ingest_duckdb(con, str(tmp_path))
+
+    assert results["sales"]["rows"] == 2 and results["beg_inventory"]["rows"] == 0
+    rows = con.execute(
+        "SELECT store, sales_dollars, CAST(sales_date AS TEXT), vendor_no, description, source_file "
+        "FROM olap_bronze.sales ORDER BY inventory_id").fetchall()
+    assert [row[2] for row in rows] == ["2016-01-01", "2016-01-02"]
+    assert rows[0][0] == 1 and float(rows[0][1]) == 32.98 and rows[1][3] is None
+    assert rows[0][4] is None and rows[0][5] == "SalesFINAL12312016.csv"
+
+def _sales_csv(rows:int, quantity:int) -> str:
+    header = ("InventoryId,Store,Brand,Description,Size,SalesQuantity,SalesDollars,SalesPrice,"
+              "SalesDate,Volume,Classification,ExciseTax,VendorNo,VendorName\n")
+    return header + "".join(f"1_A_{i},1,{i},Item {i},750mL,{quantity},9.99,9.99,1/{i + 1}/2016,750,1,0.79,1,V\n"
+                            for i in range(rows))
+
+@pytest.mark.db
+@pytest.mark.parametrize("loader", ["copy", "insert"])
+def test_replaced_file_keeps_its_rows_until_the_first_chunk_commits(bronze_db, pg_connect, tmp_path, loader):
+    """Test on PostgreSQL that a replacement whose first chunk fails leaves the previous rows in place"""
+    from src.db import get_engine # pylint: disable=import-outside-toplevel
+    engine = get_engine()
+    csv_file = tmp_path / "SalesFINAL12312016.csv"
+    csv_file.write_text(_sales_csv(3, 1))
+    options = {"loader": loader, "progress": False, "record": False}
+    assert ingest_file(str(csv_file), "sales", bronze_db, engine, **options)["error"] is None
+
+    other = pg_connect()
+    start = FileCheckpoint.start
+    def start_then_move(checkpoint, conn):
+        start(checkpoint, conn)
+        with other.cursor() as cur:
+            cur.execute("UPDATE olap_meta.checkpoint SET rows_committed = 99 WHERE name = %s", (checkpoint.name,))
+        other.commit()
+
+    def file_rows():
+        with bronze_db.cursor() as cur:
+            cur.execute("SELECT COUNT(*), SUM(sales_quantity) FROM olap_bronze.sales WHERE source_file = %s",
+                        (csv_file.name,))
+            rows = cur.fetchone()
+        bronze_db.commit()
+        return rows
+
+    csv_file.write_text(_sales_csv(2, 5))
+    try:
+        with patch.object(FileCheckpoint, "start", start_then_move):
+            result = ingest_file(str(csv_file), "sales", bronze_db, engine, replace=True, **options)
+        assert "no longer at row 0" in result["error"]
+        assert file_rows() == (3, 3)
+
+        retry = ingest_file(str(csv_file), "sales", bronze_db, engine, replace=True, **options)
+        assert retry["error"] is None
+        assert file_rows() == (2, 10)
+    finally:
+        engine.dispose()
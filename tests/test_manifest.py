@@ -0,0 +1,95 @@
+"""
+Tests for manifest.py
+"""
+
+import os
+import sys
+from pathlib import Path
+import pytest
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.manifest import ( # pylint: disable=wrong-import-position
+    classify_file, clear_manifest, file_fingerprint, read_manifest, record_file, touch_file
+)
+
+
+
+
+# Tests for classify_file
+def test_classify_file_statuses(tmp_path):
+    """Test that classify_file detects new, unchanged, touched and changed files"""
+    csv_file = tmp_path / "Sales.csv"
+    csv_file.write_text("a\n1\n")
+
+    status, fingerprint = classify_file(str(csv_file), None)
+    assert status == "new"
+    assert fingerprint["file_path"] == "Sales.csv"
+    entry = {**fingerprint, "row_count": 1}
+
+    assert classify_file(str(csv_file), entry)[0] == "unchanged"
+
+    os.utime(csv_file, (entry["file_mtime"] + 10, entry["file_mtime"] + 10))
+    assert classify_file(str(csv_file), entry)[0] == "touched"
+
+    csv_file.write_text("a\n2\n")
+    assert classify_file(str(csv_file), entry)[0] == "changed"
+
+def test_unchanged_file_is_not_hashed(tmp_path):
+    """Test that a file with the stored size and mtime keeps the stored hash without re-reading it"""
+    csv_file = tmp_path / "Sales.csv"
+    csv_file.write_text("a\n1\n")
+    entry = {**file_fingerprint(str(csv_file), content_hash="stored"), "row_count": 1}
+
+    status, fingerprint = classify_file(str(csv_file), entry)
+    assert status == "unchanged"
+    assert fingerprint["content_hash"] == "stored"
+
+
+# Tests for manifest reads and writes
+def test_read_manifest_keys_entries_by_file_path(make_conn):
+    """Test that read_manifest returns one dict per file keyed by path"""
+    conn, _ = make_conn(
+        rows=[("Sales.csv", "sales", 10, 1.0, "abc", 3)],
+        description=[("file_path",), ("table_name",), ("file_size",),
+                     ("file_mtime",), ("content_hash",), ("row_count",)],
+    )
+    manifest = read_manifest(conn)
+    assert manifest["Sales.csv"]["row_count"] == 3
+    conn.commit.assert_called_once()
+
+def test_record_and_touch_roll_back_on_error(make_conn):
+    """Test that manifest writes roll back and raise RuntimeError on psycopg2 errors"""
+    fingerprint = {"file_path": "Sales.csv", "file_size": 1, "file_mtime": 1.0, "content_hash": "x"}
+    conn, _ = make_conn(error=psycopg2.Error("boom"))
+    with pytest.raises(RuntimeError, match="Failed to record 'Sales.csv'"):
+        record_file(conn, "sales", fingerprint, 1)
+    with pytest.raises(RuntimeError, match="Failed to update 'Sales.csv'"):
+        touch_file(conn, fingerprint)
+    with pytest.raises(RuntimeError, match="Failed to read ingest manifest"):
+        read_manifest(conn)
+    with pytest.raises(RuntimeError, match="Failed to clear ingest manifest"):
+        clear_manifest(conn)
+    assert conn.rollback.call_count == 4
+
+@pytest.mark.db
+def test_manifest_round_trip_on_postgres(bronze_db, tmp_path):
+    """Test record, read, touch and an uncommitted clear of the manifest against PostgreSQL"""
+    csv_file = tmp_path / "Sales.csv"
+    csv_file.write_text("a\n1\n")
+    fingerprint = file_fingerprint(str(csv_file))
+    record_file(bronze_db, "sales", fingerprint, 1)
+    record_file(bronze_db, "sales", {**fingerprint, "content_hash": "new"}, 2)
+
+    entry = read_manifest(bronze_db)["Sales.csv"]
+    assert (entry["table_name"], entry["content_hash"], entry["row_count"]) == ("sales", "new", 2)
+    assert entry["file_mtime"] == fingerprint["file_mtime"]
+
+    touch_file(bronze_db, {**fingerprint, "file_mtime": fingerprint["file_mtime"] + 10})
+    assert read_manifest(bronze_db)["Sales.csv"]["file_mtime"] == fingerprint["file_mtime"] + 10
+
+    clear_manifest(bronze_db, commit=False)
+    bronze_db.rollback()
+    assert list(read_manifest(bronze_db)) == ["Sales.csv"]
+    clear_manifest(bronze_db)
+    assert read_manifest(bronze_db) == {}
@@ -0,0 +1,63 @@
+"""
+Tests for metrics.py
+"""
+
+import sys
+import json
+from pathlib import Path
+import pytest
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.metrics import RunMetrics, relation_stats # pylint: disable=wrong-import-position
+
+
+
+
+def test_stage_records_times_memory_and_caller_values():
+    """Test that a stage records wall/CPU time, peak memory and the values filled in by the caller"""
+    metrics = RunMetrics({"step": "all"})
+    with metrics.stage("ingest") as stage:
+        stage["rows"] = 10
+        sum(range(100000))
+
+    recorded = metrics.stages["ingest"]
+    assert recorded["status"] == "completed" and recorded["rows"] == 10
+    assert recorded["wall_seconds"] >= 0 and recorded["cpu_seconds"] >= 0
+    assert recorded["peak_memory_bytes"] > 0
+
+def test_failed_stage_is_recorded_and_reraised():
+    """Test that an error inside a stage marks it (and the run) as failed without swallowing it"""
+    metrics = RunMetrics()
+    with pytest.raises(RuntimeError, match="boom"):
+        with metrics.stage("transform"):
+            raise RuntimeError("boom")
+    metrics.skip("report", "completed by the resumed run")
+
+    run = metrics.to_dict()
+    assert run["status"] == "failed"
+    assert run["stages"]["transform"]["error"] == "boom"
+    assert run["stages"]["report"]["status"] == "skipped"
+
+def test_write_creates_one_json_file_per_run_in_a_directory(tmp_path):
+    """Test that a directory path gets a new timestamped JSON file per run"""
+    first, second = RunMetrics({"step": "report"}), RunMetrics()
+    with first.stage("report") as stage:
+        stage["bytes"] = 2048
+    paths = {first.write(f"{tmp_path}/"), second.write(str(tmp_path))}
+
+    assert len(paths) == 2 and all(Path(p).parent == tmp_path for p in paths)
+    run = json.loads(Path(first.write(str(tmp_path / "run.json"))).read_text())
+    assert run["options"] == {"step": "report"} and run["stages"]["report"]["bytes"] == 2048
+
+def test_relation_stats_maps_rows_and_bytes_and_rolls_back_on_error(make_conn):
+    """Test that relation sizes are returned per relation and that catalog errors raise RuntimeError"""
+    conn, cursor = make_conn()
+    cursor.fetchall.return_value = [("fact_sales", 1200, 81920)]
+    assert relation_stats(conn, "olap_silver") == {"fact_sales": {"rows": 1200, "bytes": 81920}}
+    assert cursor.execute.call_args[0][1] == ("olap_silver",)
+
+    cursor.execute.side_effect = psycopg2.Error("no catalog")
+    with pytest.raises(RuntimeError, match="Failed to read relation sizes"):
+        relation_stats(conn, "olap_gold")
+    conn.rollback.assert_called_once()
@@ -0,0 +1,103 @@
+"""
+Tests for preview.py
+"""
+
+import os
+import sys
+import datetime
+from decimal import Decimal
+from pathlib import Path
+import pytest
+from psycopg2 import sql
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.preview import ( # pylint: disable=wrong-import-position
+    preview_sql, sample_facts, sample_note, run_preview, PREVIEW_SCHEMA
+)
+from src.transform import SQL_DIR # pylint: disable=wrong-import-position
+
+
+
+
+def _render(query) -> str:
+    """Render a psycopg2 sql object without a connection (identifiers quoted, literals as str)"""
+    if isinstance(query, sql.Composed):
+        return "".join(_render(part) for part in query.seq)
+    if isinstance(query, sql.Identifier):
+        return ".".join(f'"{name}"' for name in query.strings)
+    if isinstance(query, sql.Literal):
+        return str(query.wrapped)
+    return query.string if isinstance(query, sql.SQL) else str(query)
+
+
+def test_preview_sql_moves_both_layers_and_reads_the_samples():
+    """Test that silver/gold objects move to the preview schema and the facts, products and dates read the samples"""
+    silver = preview_sql(os.path.join(SQL_DIR, "create_olap_silver.sql"))
+    gold = preview_sql(os.path.join(SQL_DIR, "create_olap_gold.sql"))
+    assert "olap_silver" not in silver + gold and "olap_gold" not in silver + gold
+    assert f"CREATE MATERIALIZED VIEW IF NOT EXISTS {PREVIEW_SCHEMA}.pnl_cube" in gold
+    assert f"SUM(m.revenue), 0) * {PREVIEW_SCHEMA}.measure_scale()" in gold
+
+    units = dict(section.split("\n", 1) for section in silver.split("-- @unit ")[1:])
+    assert set(units) == {"dim_product", "dim_store", "dim_vendor", "dim_date", "fact_sales", "fact_purchases"}
+    assert f"FROM {PREVIEW_SCHEMA}.sales s" in units["fact_sales"]
+    assert f"FROM {PREVIEW_SCHEMA}.purchases pu" in units["fact_purchases"]
+    for table in ("sales", "purchases", "beg_inventory"):
+        assert f"FROM {PREVIEW_SCHEMA}.{table}\n" in units["dim_product"]
+    assert "olap_bronze.purchase_prices" in units["dim_product"]
+    assert "olap_bronze." not in units["dim_date"].split("load_watermark")[0]
+    assert "olap_bronze.purchases" in units["dim_vendor"] and f"{PREVIEW_SCHEMA}.purchases" not in units["dim_vendor"]
+    assert "olap_bronze.beg_inventory" in units["dim_store"]
+    assert "olap_bronze.ingest_manifest" in silver
+
+def test_sample_facts_copies_repeatable_samples_unscaled(make_conn):
+    """Test that each sampled table is copied as it is from a repeatable TABLESAMPLE"""
+    conn, cursor = make_conn()
+    cursor.rowcount = 250
+    assert sample_facts(conn, 25, "system", seed=7) == {"sales": 250, "purchases": 250, "beg_inventory": 250}
+
+    create, params = cursor.execute.call_args_list[1][0]
+    assert _render(create) == (f'CREATE UNLOGGED TABLE "{PREVIEW_SCHEMA}"."sales" AS SELECT * '
+                               'FROM "olap_bronze"."sales" TABLESAMPLE SYSTEM (%s) REPEATABLE (%s)')
+    assert params == (25, 7)
+    conn.commit.assert_called_once()
+
+    with pytest.raises(ValueError, match="Sample percent"):
+        sample_facts(conn, 0)
+    with pytest.raises(ValueError, match="Unknown sample method"):
+        sample_facts(conn, 10, "reservoir")
+
+def test_sample_note_describes_the_preview(make_conn):
+    """Test that the report note states the sample and scale factor, or is None before any preview"""
+    conn, cursor = make_conn()
+    cursor.fetchone.return_value = (False,)
+    assert sample_note(conn) is None
+
+    cursor.fetchone.side_effect = [(True,), (Decimal("5"), "bernoulli", 42, Decimal("20"),
+                                             datetime.datetime(2026, 10, 16, 9, 30))]
+    note = sample_note(conn)
+    assert note[0].startswith("APPROXIMATE PREVIEW")
+    assert ("bernoulli sample of 5% of olap_bronze.sales, olap_bronze.purchases and olap_bronze.beg_inventory "
+            "(seed 42)") in note[1]
+    assert "scaled by 20" in note[2]
+
+@pytest.mark.db
+def test_preview_scales_the_cube_without_overflowing_the_samples_on_postgres(silver_db):
+    """Test on PostgreSQL that the cube sums the unscaled samples times 100 / percent (no NUMERIC(12,2) overflow)"""
+    with silver_db.cursor() as cur:
+        cur.execute("INSERT INTO olap_bronze.sales (inventory_id, store, brand, description, size, sales_quantity, "
+                    "sales_dollars, sales_price, sales_date, excise_tax, source_file) VALUES ('1_A_1004', 1, 1004, "
+                    "'Jim Beam', '750mL', 1, 9999999999.99, 9999999999.99, '2016-01-09', 0, 'sales_a.csv')")
+    silver_db.commit()
+    result = run_preview(silver_db, 99.9, seed=3)
+    assert result["sampled_rows"]["sales"] >= 1
+
+    with silver_db.cursor() as cur:
+        cur.execute("SELECT ROUND(SUM(sales_dollars) * 100 / 99.9, 2), ROUND(SUM(sales_quantity) * 100 / 99.9) "
+                    "FROM olap_preview.sales")
+        expected = cur.fetchone()
+        cur.execute("SELECT SUM(total_revenue), SUM(total_qty_sold) FROM olap_preview.pnl_cube WHERE grain = 'month'")
+        revenue, quantity = cur.fetchone()
+        assert abs(revenue - expected[0]) <= Decimal("0.02") and abs(quantity - expected[1]) <= 2
+        cur.execute("SELECT to_regclass('olap_preview.fact_inventory'), olap_preview.measure_scale() > 1")
+        assert cur.fetchone() == (None, True)
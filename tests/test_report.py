@@ -6,9 +6,11 @@ import sys
 from pathlib import Path
 import pandas as pd
 from unittest.mock import patch, MagicMock
+import pytest
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-from src.report import export_views_to_excel, VIEW_MAPPING # pylint: disable=wrong-import-position
+from src.report import export_views_to_excel, column_widths, VIEW_MAPPING # pylint: disable=wrong-import-position
+from src.cache import ReportCache # pylint: disable=wrong-import-position
 
 
 
@@ -37,3 +39,114 @@ def test_all_views_fail(tmp_path):
     for sheet in excel_file.sheet_names:
         df = pd.read_excel(excel_file, sheet_name=sheet)
         assert "error" in df.columns
+
+def test_column_widths_handle_wide_frames():
+    """Test that widths are computed for more than 26 columns and capped"""
+    df = pd.DataFrame({f"col_{i}": [i * 1000, -5] for i in range(30)})
+    df["amount"] = [-123456789, 5]
+    df["text"] = ["x" * 200, "short"]
+    widths = column_widths(df)
+    assert len(widths) == 32
+    assert widths[1] == len("col_1") + 2 and widths[30] == len("-123456789") + 2
+    assert widths[-1] == 60
+
+def _make_streaming_engine(batches, columns):
+    engine = MagicMock()
+    raw = engine.raw_connection.return_value
+    cursor = raw.cursor.return_value.__enter__.return_value
+    cursor.description = [(c,) for c in columns]
+    cursor.fetchmany.side_effect = lambda size: batches.pop(0) if batches else []
+    return engine, raw
+
+def test_streaming_export_writes_every_batch(tmp_path):
+    """Test that streaming mode writes all batches of every view through server-side cursors"""
+    columns = [f"c{i}" for i in range(28)]
+    batches = [[tuple(range(28))] * 3, [tuple(range(28))] * 2]
+    engine, raw = _make_streaming_engine(batches, columns)
+    export_views_to_excel(engine, reports_dir=str(tmp_path), streaming=True, batch_size=3)
+
+    sheets = pd.read_excel(tmp_path / "liquor_distribution_reports.xlsx", sheet_name=None)
+    first = sheets[VIEW_MAPPING["vw_top_10_products_profit"]]
+    assert list(first.columns) == columns and len(first) == 5
+    assert raw.cursor.call_args_list[0][1]["name"] == "report_vw_top_10_products_profit"
+    raw.close.assert_called_once()
+
+def test_streaming_export_reports_failed_views(tmp_path):
+    """Test that a view failing in streaming mode gets an error sheet and is rolled back"""
+    engine = MagicMock()
+    raw = engine.raw_connection.return_value
+    raw.cursor.return_value.__enter__.return_value.execute.side_effect = Exception("missing view")
+    export_views_to_excel(engine, reports_dir=str(tmp_path), streaming=True)
+
+    sheets = pd.read_excel(tmp_path / "liquor_distribution_reports.xlsx", sheet_name=None)
+    assert all("error" in df.columns for df in sheets.values())
+    assert raw.rollback.call_count == len(VIEW_MAPPING)
+
+def _make_pooled_engine(snapshot="00000003-0000001B-1"):
+    """Engine whose pooled connections serve one row per view, named after the view"""
+    engine, executed = MagicMock(), []
+
+    def connect():
+        raw = MagicMock()
+        plain = raw.cursor.return_value.__enter__.return_value
+        plain.execute.side_effect = lambda query, params=None: executed.append((query, params))
+        plain.fetchone.return_value = (snapshot,)
+
+        def named_cursor(name=None):
+            if name is None:
+                return raw.cursor.return_value
+            cursor = MagicMock()
+            rows = [[(name.replace("report_", ""), 1.5)]]
+            cursor.__enter__.return_value = cursor
+            cursor.description = [("view",), ("value",)]
+            cursor.fetchmany.side_effect = lambda size: rows.pop(0) if rows else []
+            return cursor
+        raw.cursor.side_effect = named_cursor
+        return raw
+    engine.raw_connection.side_effect = connect
+    return engine, executed
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_concurrent_export_reads_every_view_in_one_snapshot(tmp_path, streaming):
+    """Test that workers > 1 fetches all views on pooled connections sharing the exported snapshot"""
+    engine, executed = _make_pooled_engine()
+    stats = export_views_to_excel(engine, reports_dir=str(tmp_path), streaming=streaming, workers=3)
+
+    sheets = pd.read_excel(tmp_path / "liquor_distribution_reports.xlsx", sheet_name=None)
+    assert list(sheets) == list(VIEW_MAPPING.values())
+    for view, name in VIEW_MAPPING.items():
+        assert sheets[name]["view"].tolist() == [view]
+        assert stats[view]["rows"] == 1 and stats[view]["fetch_seconds"] >= 0
+    imports = [params for query, params in executed if "SET TRANSACTION SNAPSHOT" in query]
+    assert imports == [("00000003-0000001B-1",)] * len(VIEW_MAPPING)
+    assert engine.raw_connection.call_count == len(VIEW_MAPPING) + 1
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_cached_views_are_served_without_the_database(tmp_path, streaming):
+    """Test that a first pandas run fills the cache and a repeat run is served from it without querying"""
+    cache = ReportCache(str(tmp_path / "cache"), "c" * 32)
+    df = pd.DataFrame({"product": ["Beer", "Wine"], "profit": [100.5, 200.25]})
+    with patch("src.report.pd.read_sql", return_value=df):
+        export_views_to_excel(MagicMock(), reports_dir=str(tmp_path), cache=cache)
+
+    engine = MagicMock()
+    with patch("src.report.pd.read_sql") as mock_read:
+        stats = export_views_to_excel(engine, reports_dir=str(tmp_path), streaming=streaming, cache=cache)
+    mock_read.assert_not_called()
+    engine.raw_connection.assert_not_called()
+    assert all(view["rows"] == 2 for view in stats.values())
+    sheet = pd.read_excel(tmp_path / "liquor_distribution_reports.xlsx",
+                          sheet_name=VIEW_MAPPING["vw_top_10_brands_profit"])
+    pd.testing.assert_frame_equal(sheet, df)
+
+def test_note_sheet_comes_first_and_views_are_read_from_the_schema(tmp_path):
+    """Test that a note gets the first sheet and the views are read from the given schema"""
+    df = pd.DataFrame({"product": ["Beer"], "profit": [1.5]})
+    with patch("src.report.pd.read_sql", return_value=df) as mock_read:
+        export_views_to_excel(MagicMock(), reports_dir=str(tmp_path), excel_name="preview.xlsx",
+                              schema="olap_preview", note=["APPROXIMATE", "5% sample"])
+    assert all("FROM olap_preview." in c[0][0] for c in mock_read.call_args_list)
+
+    excel_file = pd.ExcelFile(str(tmp_path / "preview.xlsx"))
+    assert excel_file.sheet_names[0] == "Approximate"
+    assert pd.read_excel(excel_file, sheet_name="Approximate")["note"].tolist() == ["APPROXIMATE", "5% sample"]
@@ -0,0 +1,72 @@
+"""
+Tests for schema.py
+"""
+
+import sys
+from pathlib import Path
+import pytest
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.schema import bronze_schema, find_type_mismatches # pylint: disable=wrong-import-position
+from src.ingest import read_csv_chunks # pylint: disable=wrong-import-position
+
+
+
+
+SALES_CSV = (
+    "InventoryId,Store,Brand,Description,Size,SalesQuantity,SalesDollars,SalesPrice,"
+    "SalesDate,Volume,Classification,ExciseTax,VendorNo,VendorName\n"
+    "1_HARDERSFIELD_1004,1,1004,Jim Beam w/2 Rocks Glasses,750mL,1,16.49,16.49,1/1/2016,750,1,0.79,"
+    "12546,JIM BEAM BRANDS COMPANY\n"
+    "1_HARDERSFIELD_1005,1,1005,Maker's Mark Combo Pack,375mL 2 Pk,2,69.98,34.99,2016-01-02,750,1,1.57,"
+    "12546,JIM BEAM BRANDS COMPANY\n"
+    "1_HARDERSFIELD_1006,1,1006,\"Jim Beam, Devil's Cut\",750mL,,,,,,,,,\n"
+)
+
+
+def test_bronze_schema_reads_types_from_ddl():
+    """Test that the bronze column types are parsed from create_olap_bronze.sql"""
+    schema = bronze_schema()
+    assert schema["sales"]["sales_quantity"] == "INTEGER"
+    assert schema["sales"]["excise_tax"] == "NUMERIC"
+    assert schema["purchases"]["receiving_date"] == "DATE"
+    assert schema["purchase_prices"]["volume"] == "TEXT"
+    assert "ingest_manifest" in schema
+
+@pytest.mark.parametrize("csv_engine", ["pyarrow", "c"])
+def test_typed_chunks_use_ddl_dtypes(tmp_path, csv_engine):
+    """Test that typed parsing yields nullable integers, floats, dates and categoricals"""
+    csv_file = tmp_path / "SalesFINAL12312016.csv"
+    csv_file.write_text(SALES_CSV)
+
+    chunks = list(read_csv_chunks(str(csv_file), chunksize=2, table="sales", csv_engine=csv_engine))
+    df = chunks[0]
+    assert [len(c) for c in chunks] == [2, 1]
+    assert str(df["sales_quantity"].dtype) == "Int64"
+    assert df["sales_dollars"].dtype == "float64"
+    assert df["sales_date"].dtype.kind == "M"
+    assert list(df["sales_date"].dt.day) == [1, 2]
+    assert isinstance(df["vendor_name"].dtype, pd.CategoricalDtype)
+    assert df["inventory_id"].dtype == object
+    assert chunks[1]["description"].iloc[0] == "Jim Beam, Devil's Cut"
+    assert chunks[1]["sales_quantity"].isna().all()
+
+@pytest.mark.parametrize("csv_engine", ["pyarrow", "c"])
+def test_type_mismatches_are_reported_per_column(tmp_path, csv_engine):
+    """Test that values that do not match the DDL types are reported with their column"""
+    csv_file = tmp_path / "SalesFINAL12312016.csv"
+    csv_file.write_text(SALES_CSV.replace(",2,69.98,", ",two,69.98,").replace("1/1/2016", "someday"))
+
+    with pytest.raises(ValueError, match="Type mismatches in 'SalesFINAL12312016.csv'.*SalesQuantity"):
+        list(read_csv_chunks(str(csv_file), chunksize=10, table="sales", csv_engine=csv_engine))
+
+def test_find_type_mismatches_counts_and_samples(tmp_path):
+    """Test that find_type_mismatches counts invalid values per column and keeps a sample"""
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("Store,Price,Day\nx,1.5,2016-01-01\n2,abc,01/02/2016\ny,,bad\n")
+
+    mismatches = find_type_mismatches(str(csv_file), {"Store": "INTEGER", "Price": "NUMERIC", "Day": "DATE"})
+    assert mismatches["Store"] == {"type": "INTEGER", "count": 2, "sample": "x"}
+    assert mismatches["Price"]["count"] == 1
+    assert mismatches["Day"]["sample"] == "bad"
@@ -0,0 +1,109 @@
+"""
+Tests for staging.py
+"""
+
+import sys
+from pathlib import Path
+import pytest
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.staging import ( # pylint: disable=wrong-import-position
+    cleanup_staging, create_staging_table, finalize_staging, staging_name, swap_in
+)
+
+
+
+
+def test_cleanup_drops_leftover_staging_and_old_tables(make_conn):
+    """Test that cleanup_staging drops every leftover staging/old table and commits"""
+    conn, cursor = make_conn(fetchall=lambda: [("sales__staging",), ("purchases__old",)])
+    assert cleanup_staging(conn) == ["sales__staging", "purchases__old"]
+    assert cursor.execute.call_count == 3
+    assert cursor.execute.call_args_list[0][0][1] == ("olap_bronze", 9, "__staging", 5, "__old")
+    conn.commit.assert_called_once()
+
+def test_create_staging_table_is_unlogged_copy_without_constraints(make_conn):
+    """Test that the staging table is an UNLOGGED LIKE copy (defaults only) of the live table"""
+    conn, cursor = make_conn()
+    assert create_staging_table(conn, "sales") == staging_name("sales") == "sales__staging"
+    statement = repr(cursor.execute.call_args[0][0])
+    assert "CREATE UNLOGGED TABLE" in statement
+    assert "INCLUDING DEFAULTS" in statement
+    conn.commit.assert_called_once()
+
+def test_finalize_recreates_live_indexes_on_staging_table(make_conn):
+    """Test that live indexes are rebuilt on the staging table under a temporary name"""
+    results = iter([
+        [],
+        [("sales_store_idx", "CREATE INDEX sales_store_idx ON olap_bronze.sales USING btree (store)")],
+    ])
+    conn, cursor = make_conn(fetchall=lambda: next(results))
+    finalize_staging(conn, "sales")
+    executed = [c[0][0] for c in cursor.execute.call_args_list if isinstance(c[0][0], str)]
+    assert ("CREATE INDEX sales_store_idx__staging ON olap_bronze.sales__staging USING btree (store)"
+            in executed)
+    assert "SET LOGGED" in repr(cursor.execute.call_args_list[0][0][0])
+    conn.commit.assert_called_once()
+
+def test_swap_in_commits_once_for_all_tables(make_conn):
+    """Test that every table is swapped in a single transaction"""
+    conn, _ = make_conn()
+    swap_in(conn, ["sales", "purchases"])
+    conn.commit.assert_called_once()
+    conn.rollback.assert_not_called()
+
+def test_staging_errors_roll_back(make_conn):
+    """Test that staging operations roll back and raise RuntimeError on psycopg2 errors"""
+    conn, _ = make_conn(error=psycopg2.Error("boom"))
+    with pytest.raises(RuntimeError, match="Failed to clean up staging tables"):
+        cleanup_staging(conn)
+    with pytest.raises(RuntimeError, match="Failed to create staging table"):
+        create_staging_table(conn, "sales")
+    with pytest.raises(RuntimeError, match="Failed to finalize staging table"):
+        finalize_staging(conn, "sales")
+    with pytest.raises(RuntimeError, match="Failed to swap staging tables"):
+        swap_in(conn, ["sales"])
+    assert conn.rollback.call_count == 4
+
+def _bronze_tables(conn) -> dict:
+    with conn.cursor() as cur:
+        cur.execute("SELECT relname, relpersistence FROM pg_class "
+                    "WHERE relnamespace = 'olap_bronze'::regnamespace AND relkind = 'r'")
+        tables = dict(cur.fetchall())
+    conn.commit()
+    return tables
+
+@pytest.mark.db
+def test_swap_in_replaces_live_tables_with_logged_copies_on_postgres(bronze_db):
+    """Test on PostgreSQL that swapped-in tables are LOGGED, keep their index names and replace the data"""
+    with bronze_db.cursor() as cur:
+        cur.execute("INSERT INTO olap_bronze.sales (inventory_id, source_file) VALUES ('old', 'a.csv')")
+    bronze_db.commit()
+    staging = create_staging_table(bronze_db, "sales")
+    assert _bronze_tables(bronze_db)[staging] == "u"
+    with bronze_db.cursor() as cur:
+        cur.execute(f"INSERT INTO olap_bronze.{staging} (inventory_id, source_file) "
+                    "VALUES ('new', 'b.csv'), ('new', 'c.csv')")
+    bronze_db.commit()
+    finalize_staging(bronze_db, "sales")
+    swap_in(bronze_db, ["sales"])
+
+    tables = _bronze_tables(bronze_db)
+    assert tables["sales"] == "p"
+    assert not [name for name in tables if name.endswith(("__staging", "__old"))]
+    with bronze_db.cursor() as cur:
+        cur.execute("SELECT inventory_id, COUNT(*) FROM olap_bronze.sales GROUP BY 1")
+        assert cur.fetchall() == [("new", 2)]
+        cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = 'olap_bronze' AND tablename = 'sales'")
+        assert [row[0] for row in cur.fetchall()] == ["sales_source_file_idx"]
+
+@pytest.mark.db
+def test_cleanup_only_drops_suffixed_tables_on_postgres(bronze_db):
+    """Test on PostgreSQL that '_' in the suffixes is not a wildcard (e.g. 'threshold' is kept)"""
+    with bronze_db.cursor() as cur:
+        cur.execute("CREATE TABLE olap_bronze.threshold (a INT); CREATE TABLE olap_bronze.x_staging (a INT); "
+                    "CREATE TABLE olap_bronze.sales__staging (a INT); CREATE TABLE olap_bronze.sales__old (a INT)")
+    bronze_db.commit()
+    assert sorted(cleanup_staging(bronze_db)) == ["sales__old", "sales__staging"]
+    assert {"threshold", "x_staging"} <= set(_bronze_tables(bronze_db))
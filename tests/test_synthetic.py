@@ -0,0 +1,51 @@
+"""
+Tests for synthetic.py
+"""
+
+import sys
+import hashlib
+from pathlib import Path
+import pytest
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from src.synthetic import generate_dataset, scaled_sizes, FILES # pylint: disable=wrong-import-position
+from src.ingest import discover_files, _snake # pylint: disable=wrong-import-position
+from src.schema import parse_ddl # pylint: disable=wrong-import-position
+
+
+
+
+def _digest(directory:Path) -> dict:
+    return {name: hashlib.sha256((directory / name).read_bytes()).hexdigest() for name in FILES.values()}
+
+def test_generates_every_file_ingest_expects_with_bronze_columns(tmp_path):
+    """Test that the six files are discovered by ingest and their headers map onto the bronze columns"""
+    rows = generate_dataset(str(tmp_path), scale=0.002)
+    assert sorted(table for _, table in discover_files(str(tmp_path))) == sorted(FILES)
+    assert rows["sales"] == scaled_sizes(0.002)["sales"]
+
+    bronze = parse_ddl()
+    for table, name in FILES.items():
+        header = pd.read_csv(tmp_path / name, nrows=0).columns
+        assert {_snake(column) for column in header} == set(bronze[table]) - {"source_file"}
+
+def test_same_seed_gives_identical_files_and_other_seeds_differ(tmp_path):
+    """Test that generation is deterministic for a scale and seed"""
+    generate_dataset(str(tmp_path / "a"), scale=0.002, seed=7)
+    generate_dataset(str(tmp_path / "b"), scale=0.002, seed=7)
+    generate_dataset(str(tmp_path / "c"), scale=0.002, seed=8)
+    assert _digest(tmp_path / "a") == _digest(tmp_path / "b")
+    assert _digest(tmp_path / "a") != _digest(tmp_path / "c")
+
+def test_sales_are_skewed_and_facts_scale_linearly(tmp_path):
+    """Test that a few products make most sales and that only the facts grow past 1x"""
+    generate_dataset(str(tmp_path), scale=0.05)
+    sales = pd.read_csv(tmp_path / FILES["sales"])
+    shares = sales["Brand"].value_counts(normalize=True)
+    assert shares.head(len(shares) // 10).sum() > 0.5
+
+    small, large = scaled_sizes(1), scaled_sizes(10)
+    assert large["sales"] == 10 * small["sales"] and large["brands"] == small["brands"]
+    with pytest.raises(ValueError, match="positive"):
+        scaled_sizes(0)